@@ -6,6 +6,7 @@ local log = require("lib.log")
 local shaderMod = require("lib.shader")
 local util = require("lib.util")
 local glm = require("lib.glm")
+local buffer = require("mane3d.buffer")
 
 -- Game constants
 local FIELD_WIDTH = 10
@@ -39,6 +40,8 @@ local pipeline = nil
 local vbuf = nil
 ---@type gfx.Buffer?
 local ibuf = nil
+-- Uniform block (mvp, model, color), reused for every draw
+local uniforms = buffer.f32(36)
 
 -- Shader with MVP matrix and color uniform
 local shader_source = [[
@@ -326,21 +329,20 @@ end
 
 -- Pack mat4 + mat4 + vec4 as uniforms
 local function pack_uniforms(mvp, model, color)
-    local data = {}
-    for i = 1, 16 do data[i] = mvp[i] end
-    for i = 1, 16 do data[16 + i] = model[i] end
-    data[33] = color.x
-    data[34] = color.y
-    data[35] = color.z
-    data[36] = 1.0
-    return util.pack_floats(data)
+    for i = 1, 16 do uniforms[i] = mvp[i] end
+    for i = 1, 16 do uniforms[16 + i] = model[i] end
+    uniforms[33] = color.x
+    uniforms[34] = color.y
+    uniforms[35] = color.z
+    uniforms[36] = 1.0
+    return uniforms
 end
 
 local function draw_cube(proj, view, pos, scale, color)
     local model = glm.translate(pos) * glm.scale(scale)
     local mvp = proj * view * model
 
-    gfx.apply_uniforms(0, gfx.Range(pack_uniforms(mvp, model, color)))
+    gfx.apply_uniforms(0, pack_uniforms(mvp, model, color))
     gfx.draw(0, 36, 1)
 end
 
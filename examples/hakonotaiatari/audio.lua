@@ -1,5 +1,5 @@
 -- hakonotaiatari audio module
--- Sound effects and BGM using sokol.audio
+-- Sound effects and BGM mixed natively by mane3d.mixer on top of sokol.audio_stream
 
 ---@type fun(path: string): string?
 ---@diagnostic disable-next-line: undefined-global
@@ -9,24 +9,19 @@ local log = require("lib.log")
 
 local M = {}
 
--- Try to load sokol.audio (try both naming conventions)
-local audio_ok, audio = pcall(require, "sokol.audio")
-if not audio_ok then
-    audio_ok, audio = pcall(require, "sokol_audio")
-end
-if not audio_ok then
-    log.warn("sokol.audio not available, audio disabled")
+-- The mixer runs in the audio callback of sokol.audio_stream; Lua only sends commands
+local audio_ok, audio = pcall(require, "sokol.audio_stream")
+local mixer_ok, mixer = pcall(require, "mane3d.mixer")
+local wav_ok, wav = pcall(require, "mane3d.wav")
+if not audio_ok or not mixer_ok or not wav_ok then
+    log.warn("sokol.audio_stream not available, audio disabled")
     ---@diagnostic disable-next-line: cast-local-type
     audio = nil
 end
 
 -- Audio state
 local initialized = false
-local sounds = {}        -- Loaded sound data (index -> {samples, sample_count, channels, sample_rate})
-local playing = {}       -- Currently playing sounds {sound_index, position, volume, loop}
-local bgm_index = nil
-local bgm_position = 0
-local bgm_playing = false
+local sounds = {}        -- Mixer sound handles (index -> handle)
 
 -- Sound file mapping (matches original app.cc order)
 local SOUND_FILES = {
@@ -51,8 +46,8 @@ local SOUND_FILES = {
 local SAMPLE_RATE = 44100
 local NUM_CHANNELS = 1
 local BUFFER_FRAMES = 2048
-local PACKET_FRAMES = 512  -- Max frames per push
-local MAX_PLAYING = 8
+local PACKET_FRAMES = 512
+local BGM_VOLUME = 0.5
 
 -- Read file contents (supports both native io.open and WASM fetch_file)
 local function read_file(filepath)
@@ -70,7 +65,8 @@ local function read_file(filepath)
     return data
 end
 
--- Simple WAV loader (mono/stereo, 16-bit PCM only)
+-- Decode a WAV file natively into mono f32 samples at the device rate,
+-- so the mixer plays it without resampling
 local function load_wav(filepath)
     local data = read_file(filepath)
     if not data then
@@ -78,154 +74,37 @@ local function load_wav(filepath)
         return nil
     end
 
-    if #data < 44 then
-        log.warn("WAV file too small: " .. filepath)
-        return nil
-    end
-
-    -- Check RIFF header
-    if data:sub(1, 4) ~= "RIFF" or data:sub(9, 12) ~= "WAVE" then
-        log.warn("Invalid WAV header: " .. filepath)
+    local samples, info = wav.load_from_memory(data, { mono = true, sample_rate = SAMPLE_RATE })
+    if not samples then
+        log.warn("Failed to decode " .. filepath .. ": " .. info)
         return nil
     end
-
-    -- Find fmt chunk
-    local pos = 13
-    local channels, sample_rate, bits_per_sample
-    while pos < #data - 8 do
-        local chunk_id = data:sub(pos, pos + 3)
-        local chunk_size = string.unpack("<I4", data, pos + 4)
-
-        if chunk_id == "fmt " then
-            local audio_format = string.unpack("<I2", data, pos + 8)
-            channels = string.unpack("<I2", data, pos + 10)
-            sample_rate = string.unpack("<I4", data, pos + 12)
-            bits_per_sample = string.unpack("<I2", data, pos + 22)
-
-            if audio_format ~= 1 then
-                log.warn("Only PCM WAV supported: " .. filepath)
-                return nil
-            end
-        elseif chunk_id == "data" then
-            if not channels then
-                log.warn("No fmt chunk before data: " .. filepath)
-                return nil
-            end
-
-            local audio_data = data:sub(pos + 8, pos + 7 + chunk_size)
-            local samples = {}
-
-            if bits_per_sample == 16 then
-                for i = 1, #audio_data - 1, 2 do
-                    local sample = string.unpack("<i2", audio_data, i)
-                    table.insert(samples, sample / 32768.0)  -- Normalize to -1..1
-                end
-            elseif bits_per_sample == 8 then
-                for i = 1, #audio_data do
-                    local sample = string.unpack("B", audio_data, i)
-                    table.insert(samples, (sample - 128) / 128.0)
-                end
-            else
-                log.warn("Unsupported bits per sample: " .. bits_per_sample)
-                return nil
-            end
-
-            -- Convert stereo to mono if needed
-            if channels == 2 then
-                local mono = {}
-                for i = 1, #samples - 1, 2 do
-                    table.insert(mono, (samples[i] + samples[i + 1]) / 2)
-                end
-                samples = mono
-            end
-
-            return {
-                samples = samples,
-                sample_count = #samples,
-                channels = 1,  -- Always mono after conversion
-                sample_rate = sample_rate,
-            }
-        end
-
-        pos = pos + 8 + chunk_size
-        if chunk_size % 2 == 1 then pos = pos + 1 end  -- Padding
-    end
-
-    log.warn("No data chunk found: " .. filepath)
-    return nil
+    return samples, info
 end
 
--- Audio buffer for mixing
-local mix_buffer = {}
-
--- Audio callback (called by sokol.audio)
-local function audio_callback()
-    if not initialized or not audio then return end
-
-    local num_frames = audio.expect()
-    if num_frames <= 0 then return end
-    -- Limit to packet size to avoid overflow
-    if num_frames > PACKET_FRAMES then
-        num_frames = PACKET_FRAMES
-    end
-
-    -- Clear mix buffer
-    for i = 1, num_frames do
-        mix_buffer[i] = 0
-    end
-
-    -- Mix BGM
-    if bgm_playing and bgm_index and sounds[bgm_index] then
-        local snd = sounds[bgm_index]
-        local rate_ratio = snd.sample_rate / SAMPLE_RATE
-
-        for i = 1, num_frames do
-            local src_pos = math.floor(bgm_position) + 1
-            if src_pos <= snd.sample_count then
-                mix_buffer[i] = mix_buffer[i] + (snd.samples[src_pos] or 0) * 0.5
-            end
-            bgm_position = bgm_position + rate_ratio
-
-            -- Loop BGM
-            if bgm_position >= snd.sample_count then
-                bgm_position = 0
-            end
-        end
+-- Load the sound bank baked by scripts/bake_sounds.py: every sound already
+-- at the device rate and layout, read with one file read. nil if there is
+-- no bank (or it was baked for another output format).
+local function load_bank(prefix)
+    local index_src = read_file(prefix .. ".lua")
+    if not index_src then
+        return nil
     end
-
-    -- Mix playing sounds
-    local still_playing = {}
-    for _, p in ipairs(playing) do
-        local snd = sounds[p.index]
-        if snd then
-            local rate_ratio = snd.sample_rate / SAMPLE_RATE
-
-            for i = 1, num_frames do
-                local src_pos = math.floor(p.position) + 1
-                if src_pos <= snd.sample_count then
-                    mix_buffer[i] = mix_buffer[i] + (snd.samples[src_pos] or 0) * p.volume
-                end
-                p.position = p.position + rate_ratio
-            end
-
-            if p.position < snd.sample_count then
-                table.insert(still_playing, p)
-            end
-        end
+    local chunk = load(index_src, "=" .. prefix .. ".lua", "t", {})
+    local ok, index = pcall(chunk or error)
+    if not ok or type(index) ~= "table" then
+        log.warn("Invalid sound bank index: " .. prefix .. ".lua")
+        return nil
     end
-    playing = still_playing
-
-    -- Clamp and pack to binary float data
-    local float_data = {}
-    for i = 1, num_frames do
-        local sample = mix_buffer[i]
-        if sample > 1 then sample = 1 elseif sample < -1 then sample = -1 end
-        table.insert(float_data, string.pack("f", sample))
+    if index.sample_rate ~= SAMPLE_RATE or index.channels ~= NUM_CHANNELS then
+        log.warn("Sound bank was baked for another output format, ignoring it")
+        return nil
     end
-
-    if #float_data > 0 then
-        audio.push(table.concat(float_data), num_frames)
+    local pcm = read_file(prefix .. ".pcm")
+    if not pcm then
+        return nil
     end
+    return index, pcm
 end
 
 -- Initialize audio system
@@ -239,36 +118,47 @@ function M.init()
 
     if not audio then
         initialized = false
-        log.info("Audio system disabled (sokol.audio not available)")
+        log.info("Audio system disabled (sokol.audio_stream not available)")
         return false
     end
 
-    -- Initialize sokol.audio from Lua
-    audio.setup(audio.Desc({
+    -- Start sokol_audio; the mixer plays into its stream callback
+    local ok = audio.setup({
         sample_rate = SAMPLE_RATE,
         num_channels = NUM_CHANNELS,
         buffer_frames = BUFFER_FRAMES,
         packet_frames = PACKET_FRAMES,
         num_packets = 4,
-    }))
+    })
 
-    if not audio.isvalid() then
+    if not ok then
         log.error("Failed to initialize audio")
         return false
     end
 
     -- Load sound files
     local base_path = "examples/hakonotaiatari/assets/sounds/"
+    local bank, pcm = load_bank(base_path .. "bank")
     local loaded_count = 0
     for index, filename in pairs(SOUND_FILES) do
-        local filepath = base_path .. filename
-        local snd = load_wav(filepath)
-        if snd then
-            sounds[index] = snd
-            log.info(string.format("Loaded sound %d: %s (%d samples)", index, filename, snd.sample_count))
+        local baked = bank and bank.sounds[filename:gsub("%.wav$", "")]
+        if baked then
+            local bytes = baked.frames * NUM_CHANNELS * 4
+            sounds[index] = mixer.load_pcm(pcm:sub(baked.offset + 1, baked.offset + bytes), { sample_rate = SAMPLE_RATE })
             loaded_count = loaded_count + 1
+        else
+            local filepath = base_path .. filename
+            local samples, info = load_wav(filepath)
+            if samples then
+                sounds[index] = mixer.load_pcm(samples, { sample_rate = info.sample_rate })
+                log.info(string.format("Loaded sound %d: %s (%d samples)", index, filename, info.frames))
+                loaded_count = loaded_count + 1
+            end
         end
     end
+    if bank then
+        log.info(string.format("Loaded %d sounds from the baked sound bank", loaded_count))
+    end
 
     -- If no sounds loaded (e.g., WASM without preloaded files), disable audio
     if loaded_count == 0 then
@@ -286,17 +176,16 @@ end
 function M.cleanup()
     if audio and initialized then
         audio.shutdown()
+        for _, handle in pairs(sounds) do
+            mixer.unload(handle)
+        end
     end
     initialized = false
     sounds = {}
-    playing = {}
 end
 
--- Update audio (call each frame)
+-- Update audio (call each frame). Mixing happens on the audio thread.
 function M.update()
-    if initialized then
-        audio_callback()
-    end
 end
 
 -- Play a sound effect
@@ -304,42 +193,27 @@ function M.play(index, volume)
     if not initialized then return end
     if not sounds[index] then return end
 
-    volume = volume or 0.7
-
-    -- Limit concurrent sounds
-    if #playing >= MAX_PLAYING then
-        table.remove(playing, 1)
-    end
-
-    table.insert(playing, {
-        index = index,
-        position = 0,
-        volume = volume,
-    })
+    mixer.play(sounds[index], { volume = volume or 0.7 })
 end
 
--- Play BGM
+-- Play BGM (restarting only if another track is playing)
 function M.play_bgm(index)
     if not initialized then return end
+    if not sounds[index] then return end
 
-    if bgm_index == index and bgm_playing then
-        return -- Already playing
-    end
-
-    bgm_index = index
-    bgm_position = 0
-    bgm_playing = true
+    mixer.set_bgm(sounds[index], { volume = BGM_VOLUME })
 end
 
 -- Stop BGM
 function M.stop_bgm()
-    bgm_playing = false
+    if not initialized then return end
+    mixer.set_bgm(nil)
 end
 
--- Stop all sounds
+-- Stop all sounds (BGM included)
 function M.stop_all()
-    M.stop_bgm()
-    playing = {}
+    if not initialized then return end
+    mixer.stop_all()
 end
 
 -- Check if audio is available
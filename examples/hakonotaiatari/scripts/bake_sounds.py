@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""Bake a directory of WAV files into one raw PCM bank for the mixer.
+
+Every sound is converted to the output rate and channel layout of the
+engine (polyphase resampling), optionally normalized, and appended to
+<out>.pcm as little-endian float32 interleaved samples, the format
+mane3d.mixer.load_pcm() takes as is. <out>.lua indexes the bank:
+
+    return {
+        sample_rate = 44100,
+        channels = 1,
+        sounds = {
+            ["hit1"] = { offset = 0, frames = 11440 },
+            ["ne4"] = { offset = 45760, frames = 5836478 },
+        },
+    }
+
+offset is in bytes, frames in output frames. Looping is chosen at play
+time (mane3d.mixer loops whole sounds), so the bank stores no loop points.
+"""
+
+import argparse
+import math
+import os
+import struct
+import sys
+
+import numpy as np
+
+
+def read_wav(path):
+    """Return (samples as float64 array of shape (frames, channels), sample rate)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < 12 or data[0:4] != b'RIFF' or data[8:12] != b'WAVE':
+        raise ValueError(f"{path}: not a RIFF/WAVE file")
+
+    fmt = None
+    pcm = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        size = min(struct.unpack('<I', data[pos + 4:pos + 8])[0], len(data) - pos - 8)
+        body = data[pos + 8:pos + 8 + size]
+        if chunk_id == b'fmt ':
+            if size < 16:
+                raise ValueError(f"{path}: fmt chunk too short")
+            fmt = struct.unpack('<HHIIHH', body[:16])
+            if fmt[0] == 0xFFFE and size >= 40:
+                # WAVE_FORMAT_EXTENSIBLE: the sub-format GUID starts with the format tag
+                fmt = (struct.unpack('<H', body[24:26])[0],) + fmt[1:]
+        elif chunk_id == b'data':
+            pcm = body
+        pos += 8 + size + (size & 1)
+
+    if fmt is None or pcm is None:
+        raise ValueError(f"{path}: missing fmt or data chunk")
+    audio_format, channels, sample_rate, _, block_align, bits = fmt
+    if channels == 0 or block_align == 0 or sample_rate == 0:
+        raise ValueError(f"{path}: invalid fmt chunk")
+    frames = len(pcm) // block_align
+    pcm = pcm[:frames * block_align]
+
+    if audio_format == 1 and bits == 8:
+        samples = (np.frombuffer(pcm, dtype=np.uint8).astype(np.float64) - 128.0) / 128.0
+    elif audio_format == 1 and bits == 16:
+        samples = np.frombuffer(pcm, dtype='<i2').astype(np.float64) / 32768.0
+    elif audio_format == 1 and bits == 24:
+        raw = np.frombuffer(pcm, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = (raw[:, 0] << 8) | (raw[:, 1] << 16) | (raw[:, 2] << 24)
+        samples = (ints >> 8).astype(np.float64) / 8388608.0
+    elif audio_format == 1 and bits == 32:
+        samples = np.frombuffer(pcm, dtype='<i4').astype(np.float64) / 2147483648.0
+    elif audio_format == 3 and bits in (32, 64):
+        samples = np.frombuffer(pcm, dtype='<f4' if bits == 32 else '<f8').astype(np.float64)
+    else:
+        raise ValueError(f"{path}: unsupported format {audio_format} with {bits} bits")
+    return samples.reshape(frames, channels), sample_rate
+
+
+def convert_channels(samples, channels):
+    """Downmix to mono, duplicate mono, or keep the layout"""
+    if samples.shape[1] == channels:
+        return samples
+    if channels == 1:
+        return samples.mean(axis=1, keepdims=True)
+    if samples.shape[1] == 1:
+        return np.repeat(samples, channels, axis=1)
+    raise ValueError(f"cannot convert {samples.shape[1]} channels to {channels}")
+
+
+def lowpass_filter(up, down, zero_crossings, beta):
+    """Kaiser windowed sinc for resampling by up/down, at the upsampled rate"""
+    cutoff = 1.0 / max(up, down)
+    half = zero_crossings * max(up, down)
+    n = np.arange(-half, half + 1, dtype=np.float64)
+    return up * cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), beta)
+
+
+def resample_poly(samples, up, down, zero_crossings=16, beta=8.0):
+    """Resample (frames, channels) samples by up/down with a polyphase FIR.
+
+    Equivalent to upsampling by zero stuffing, low-pass filtering and
+    keeping every down-th sample, but each output frame only evaluates the
+    taps of its own phase: len(h) / up multiply-adds instead of len(h).
+    """
+    if up == down:
+        return samples
+    h = lowpass_filter(up, down, zero_crossings, beta)
+    delay = (len(h) - 1) // 2
+    taps = -(-len(h) // up)
+    h = np.concatenate([h, np.zeros(taps * up - len(h))])
+    # phases[p, j] is the tap applied to input frame k0 - j for phase p
+    phases = h.reshape(taps, up).T
+
+    frames = samples.shape[0]
+    out_frames = -(-frames * up // down)
+    t = np.arange(out_frames, dtype=np.int64) * down + delay
+    k0 = t // up
+    phase = t % up
+
+    # Zero padding on both sides so every window k0 - j stays in range
+    padded = np.concatenate([np.zeros((taps, samples.shape[1])), samples, np.zeros((taps, samples.shape[1]))])
+    out = np.zeros((out_frames, samples.shape[1]))
+    for j in range(taps):
+        out += phases[phase, j][:, None] * padded[k0 - j + taps]
+    return out
+
+
+def gated_rms_db(samples, sample_rate, block_seconds=0.4, gate_db=-70.0):
+    """RMS level in dBFS over 400 ms blocks, ignoring blocks below the gate
+    (the absolute gate of ITU-R BS.1770, without its K-weighting)"""
+    block = max(1, int(sample_rate * block_seconds))
+    power = np.mean(samples ** 2, axis=1)
+    count = max(1, len(power) // block)
+    blocks = np.array([power[i * block:(i + 1) * block].mean() for i in range(count)]) if len(power) else np.zeros(1)
+    loud = blocks[blocks > 10.0 ** (gate_db / 10.0)]
+    if len(loud) == 0:
+        return None
+    return 10.0 * math.log10(loud.mean())
+
+
+def normalize(samples, sample_rate, mode, peak_db, loudness_db):
+    """Scale to the peak or gated RMS target; the peak ceiling always applies"""
+    peak = np.max(np.abs(samples)) if samples.size else 0.0
+    if mode == 'none' or peak == 0.0:
+        return samples, 1.0
+    ceiling = 10.0 ** (peak_db / 20.0)
+    gain = ceiling / peak
+    if mode == 'loudness':
+        level = gated_rms_db(samples, sample_rate)
+        if level is not None:
+            gain = min(gain, 10.0 ** ((loudness_db - level) / 20.0))
+    return samples * gain, gain
+
+
+def lua_string(s):
+    """Quote s as a Lua string literal, escaping quotes, backslashes and control characters"""
+    out = []
+    for c in s:
+        if c in '"\\':
+            out.append('\\' + c)
+        elif ord(c) < 0x20 or ord(c) == 0x7F:
+            out.append(f'\\{ord(c):03d}')
+        else:
+            out.append(c)
+    return '"' + ''.join(out) + '"'
+
+
+def bake(input_dir, out_prefix, sample_rate, channels, mode, peak_db, loudness_db):
+    names = sorted(f for f in os.listdir(input_dir) if f.lower().endswith('.wav'))
+    entries = []
+    offset = 0
+    with open(out_prefix + '.pcm', 'wb') as bank:
+        for filename in names:
+            name = os.path.splitext(filename)[0]
+            samples, rate = read_wav(os.path.join(input_dir, filename))
+            samples = convert_channels(samples, channels)
+            g = math.gcd(sample_rate, rate)
+            samples = resample_poly(samples, sample_rate // g, rate // g)
+            samples, gain = normalize(samples, sample_rate, mode, peak_db, loudness_db)
+            frames = samples.shape[0]
+            entries.append({'name': name, 'offset': offset, 'frames': frames})
+
+            data = np.clip(samples, -1.0, 1.0).astype('<f4').tobytes()
+            bank.write(data)
+            offset += len(data)
+            print(f"  {filename}: {rate} Hz -> {sample_rate} Hz, {frames} frames, gain {20.0 * math.log10(gain):+.1f} dB")
+
+    with open(out_prefix + '.lua', 'w', encoding='utf-8', newline='\n') as f:
+        f.write(f"-- Generated by bake_sounds.py from {os.path.basename(os.path.normpath(input_dir))}/, do not edit\n")
+        f.write("return {\n")
+        f.write(f"    sample_rate = {sample_rate},\n")
+        f.write(f"    channels = {channels},\n")
+        f.write("    sounds = {\n")
+        for e in entries:
+            f.write(f"        [{lua_string(e['name'])}] = {{ offset = {e['offset']}, frames = {e['frames']} }},\n")
+        f.write("    },\n")
+        f.write("}\n")
+    print(f"Wrote {len(entries)} sounds, {offset} bytes to {out_prefix}.pcm")
+
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    sounds_dir = os.path.join(script_dir, '..', 'assets', 'sounds')
+
+    parser = argparse.ArgumentParser(description='Bake WAV files into a raw PCM bank for mane3d.mixer')
+    parser.add_argument('input_dir', nargs='?', default=sounds_dir, help='Directory of .wav files')
+    parser.add_argument('-o', '--output', default=os.path.join(sounds_dir, 'bank'),
+                        help='Output prefix: writes <output>.pcm and <output>.lua')
+    parser.add_argument('--rate', type=int, default=44100, help='Output sample rate (the audio device rate)')
+    parser.add_argument('--channels', type=int, default=1, choices=(1, 2), help='Output channels')
+    parser.add_argument('--normalize', choices=('none', 'peak', 'loudness'), default='none',
+                        help='Scale every sound to --peak-db, or to --loudness-db gated RMS')
+    parser.add_argument('--peak-db', type=float, default=-1.0, help='Peak ceiling in dBFS')
+    parser.add_argument('--loudness-db', type=float, default=-16.0, help='Gated RMS target in dBFS')
+    args = parser.parse_args()
+
+    bake(args.input_dir, args.output, args.rate, args.channels, args.normalize,
+         args.peak_db, args.loudness_db)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
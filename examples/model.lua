@@ -7,6 +7,7 @@ local log = require("lib.log")
 local shaderMod = require("lib.shader")
 local texture = require("lib.texture")
 local util = require("lib.util")
+local mesh_file = require("lib.mesh")
 local glm = require("lib.glm")
 
 -- Camera
@@ -21,9 +22,9 @@ local ambient_color = glm.vec3(0.2, 0.2, 0.25)
 
 -- Graphics resources
 local shader = nil
----@type gfx.Pipeline
-local pipeline = nil
-local meshes = {}  -- { vbuf, index_count, diffuse_img, diffuse_smp, normal_img, normal_smp, material }
+---@type table<gfx.IndexType, gfx.Pipeline>
+local pipelines = {}  -- by index type
+local meshes = {}  -- { pipeline, vbuf, ibuf, vertex_count, diffuse_img, diffuse_smp, normal_img, normal_smp, material }
 ---@type table<string, {img: gpu.Image, view: gpu.View, smp: gpu.Sampler}>
 local textures_cache = {}
 
@@ -158,19 +159,18 @@ local function compute_tangent(p1, p2, p3, uv1, uv2, uv3)
     return tx, ty, tz
 end
 
--- Process mesh vertices and add tangents
--- Input: flat array of (x,y,z,nx,ny,nz,u,v) * N
--- Output: flat array of (x,y,z,nx,ny,nz,u,v,tx,ty,tz) * N
-local function add_tangents(vertices)
+-- Un-index mesh vertices and add tangents
+-- Input: flat array of (x,y,z,nx,ny,nz,u,v) * N, triangle list indices (0-based)
+-- Output: flat array of (x,y,z,nx,ny,nz,u,v,tx,ty,tz) * #indices
+local function add_tangents(vertices, indices)
     local result = {}
     local stride = 8  -- input stride
-    local vertex_count = #vertices / stride
 
-    -- Process triangles (assuming triangle list)
-    for i = 0, vertex_count - 1, 3 do
-        local base1 = i * stride
-        local base2 = (i + 1) * stride
-        local base3 = (i + 2) * stride
+    -- Process triangles
+    for i = 1, #indices - 2, 3 do
+        local base1 = indices[i] * stride
+        local base2 = indices[i + 1] * stride
+        local base3 = indices[i + 2] * stride
 
         if base3 + stride <= #vertices then
             local p1 = { vertices[base1 + 1], vertices[base1 + 2], vertices[base1 + 3] }
@@ -184,7 +184,7 @@ local function add_tangents(vertices)
 
             -- Add all 3 vertices with same tangent
             for j = 0, 2 do
-                local base = (i + j) * stride
+                local base = indices[i + j] * stride
                 for k = 1, 8 do
                     table.insert(result, vertices[base + k])
                 end
@@ -297,24 +297,6 @@ local function init_game()
         return
     end
 
-    -- Create pipeline
-    pipeline = gfx.make_pipeline(gfx.PipelineDesc({
-        shader = shader,
-        layout = {
-            attrs = {
-                { format = gfx.VertexFormat.FLOAT3 },  -- pos
-                { format = gfx.VertexFormat.FLOAT3 },  -- normal
-                { format = gfx.VertexFormat.FLOAT2 },  -- uv
-                { format = gfx.VertexFormat.FLOAT3 },  -- tangent
-            },
-        },
-        cull_mode = gfx.CullMode.FRONT,
-        depth = {
-            write_enabled = true,
-            compare = gfx.CompareFunc.LESS_EQUAL,
-        },
-    }))
-
     -- Load model
     log.info("Loading mill-scene...")
     local model_path = "mill-scene.lua"  -- same directory as exe
@@ -325,19 +307,67 @@ local function init_game()
     end
 
     local scene = model_func()
+
+    -- Geometry converted with egg2lua.py --binary or --stream lives in a mesh container
+    local geometry
+    if scene.mesh_file then
+        geometry, err = mesh_file.load(scene.mesh_file)
+        if not geometry then
+            log.error("Failed to load mesh data: " .. tostring(err))
+            return
+        end
+    end
+
+    -- Create pipelines on demand, one per index type
+    -- Meshes converted with egg2lua.py --tangents are drawn indexed
+    local function get_pipeline(index_type)
+        if not pipelines[index_type] then
+            pipelines[index_type] = gfx.make_pipeline(gfx.PipelineDesc({
+                shader = shader,
+                layout = {
+                    attrs = {
+                        { format = gfx.VertexFormat.FLOAT3 },  -- pos
+                        { format = gfx.VertexFormat.FLOAT3 },  -- normal
+                        { format = gfx.VertexFormat.FLOAT2 },  -- uv
+                        { format = gfx.VertexFormat.FLOAT3 },  -- tangent
+                    },
+                },
+                index_type = index_type,
+                cull_mode = gfx.CullMode.FRONT,
+                depth = {
+                    write_enabled = true,
+                    compare = gfx.CompareFunc.LESS_EQUAL,
+                },
+            }))
+        end
+        return pipelines[index_type]
+    end
+
     log.info("Model loaded, processing meshes...")
 
     -- Process each mesh
     local mesh_count = 0
     for name, mesh in pairs(scene.meshes) do
-        if mesh.vertices and #mesh.vertices > 0 then
-            -- Add tangent vectors
-            local verts_with_tangents = add_tangents(mesh.vertices)
+        local vertices, indices = mesh.vertices, mesh.indices
+        local index_type = gfx.IndexType.UINT32
+        if geometry then
+            -- Same layout as the tables, but as buffers with u16 or u32 indices
+            local m = geometry.meshes[name]
+            vertices, indices, index_type = m.vertices, m.indices, m.index_type
+        end
+        if vertices and #vertices > 0 then
+            -- Add tangent vectors, unless egg2lua.py --tangents did (then the vertices stay indexed)
+            local verts_with_tangents = scene.tangents and vertices or add_tangents(vertices, indices)
 
             if #verts_with_tangents > 0 then
+                local vdata = (geometry and scene.tangents) and vertices or util.pack_floats(verts_with_tangents)
                 local vbuf = gfx.make_buffer(gfx.BufferDesc({
-                    data = gfx.Range(util.pack_floats(verts_with_tangents)),
+                    data = gfx.Range(vdata),
                 }))
+                local ibuf = scene.tangents and gfx.make_buffer(gfx.BufferDesc({
+                    usage = { index_buffer = true },
+                    data = gfx.Range(geometry and indices or util.pack_u32(indices)),
+                })) or nil
 
                 -- Get textures (views)
                 ---@type gfx.View, gfx.Sampler
@@ -365,12 +395,14 @@ local function init_game()
                     end
                 end
 
-                -- Get material
-                local mat = scene.materials[name] or { diffuse = {0.8, 0.8, 0.8}, shininess = 32 }
+                -- Get material (streamed meshes may split one material into several)
+                local mat = scene.materials[mesh.material or name] or { diffuse = {0.8, 0.8, 0.8}, shininess = 32 }
 
                 table.insert(meshes, {
+                    pipeline = get_pipeline(ibuf and index_type or gfx.IndexType.NONE),
                     vbuf = vbuf,
-                    vertex_count = #verts_with_tangents / 11,  -- 11 floats per vertex now
+                    ibuf = ibuf,
+                    vertex_count = ibuf and #indices or #verts_with_tangents / 11,  -- 11 floats per vertex now
                     diffuse_view = diffuse_view,
                     diffuse_smp = diffuse_smp,
                     normal_view = normal_view,
@@ -438,14 +470,18 @@ local function update_frame()
         swapchain = glue.swapchain(),
     }))
 
-    gfx.apply_pipeline(pipeline)
-
     local mvp = proj * view * model
 
     -- Draw all meshes
+    local pipeline = nil
     for _, mesh in ipairs(meshes) do
+        if mesh.pipeline ~= pipeline then
+            pipeline = mesh.pipeline
+            gfx.apply_pipeline(pipeline)
+        end
         gfx.apply_bindings(gfx.Bindings({
             vertex_buffers = { mesh.vbuf },
+            index_buffer = mesh.ibuf,
             views = { mesh.diffuse_view, mesh.normal_view },
             samplers = { mesh.diffuse_smp, mesh.normal_smp },
         }))
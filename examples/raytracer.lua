@@ -7,6 +7,7 @@ local sdtx = require("sokol.debugtext")
 local log = require("lib.log")
 local shaderMod = require("lib.shader")
 local util = require("lib.util")
+local buffer = require("mane3d.buffer")
 
 ---@type gfx.Shader?
 local shader = nil
@@ -14,6 +15,8 @@ local shader = nil
 local pipeline = nil
 ---@type gfx.Buffer?
 local vbuf = nil
+-- Uniform block (time, aspect ratio), reused every frame
+local uniforms = buffer.f32(4)
 local t = 0
 local last_time = 0
 local frame_count = 0
@@ -327,7 +330,8 @@ local function update_frame()
     gfx.apply_bindings(gfx.Bindings({ vertex_buffers = { vbuf } }))
 
     -- Pass uniforms (time, aspect ratio)
-    gfx.apply_uniforms(0, gfx.Range(util.pack_floats({ t, w / h, 0, 0 })))
+    uniforms:set(1, { t, w / h, 0, 0 })
+    gfx.apply_uniforms(0, uniforms)
 
     gfx.draw(0, 4, 1)
 
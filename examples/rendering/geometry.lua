@@ -7,6 +7,7 @@ local render_pass = require("lib.render_pass")
 ---@field vbuf gpu.Buffer Vertex buffer
 ---@field ibuf gpu.Buffer Index buffer
 ---@field num_indices integer
+---@field index_type gfx.IndexType? Index size of ibuf (default UINT32)
 ---@field diffuse_view any Diffuse texture view handle
 ---@field diffuse_smp any Diffuse sampler handle
 ---@field normal_view any Normal texture view handle
@@ -117,7 +118,8 @@ M.shader_desc = {
 -- Setup common resource management (on_reload, destroy, ensure_resources)
 render_pass.setup(M, {
     shader_name = "geom",
-    pipeline_desc = function(shader_handle)
+    -- The default pipeline takes u32 indices; meshes with other index types get a variant
+    pipeline_desc = function(shader_handle, index_type)
         return gfx.PipelineDesc({
             shader = shader_handle,
             layout = {
@@ -141,7 +143,7 @@ render_pass.setup(M, {
                 { pixel_format = gfx.PixelFormat.RGBA8 },    -- albedo
                 { pixel_format = gfx.PixelFormat.RGBA8 },    -- specular
             },
-            index_type = gfx.IndexType.UINT32,
+            index_type = index_type or gfx.IndexType.UINT32,
             label = "geom_pipeline",
         })
     end,
@@ -184,12 +186,17 @@ function M.execute(ctx, frame_data)
     local proj_matrix = frame_data.proj
     local model_matrix = frame_data.model
 
-    gfx.apply_pipeline(M.resources.pipeline.handle)
-
     local mvp = proj_matrix * view_matrix * model_matrix
     local vs_uniforms = mvp:pack() .. model_matrix:pack() .. view_matrix:pack()
 
+    local pipeline = nil
     for _, mesh in ipairs(meshes) do
+        local index_type = mesh.index_type ~= gfx.IndexType.UINT32 and mesh.index_type or nil
+        local mesh_pipeline = M.get_pipeline(index_type)
+        if mesh_pipeline ~= pipeline then
+            pipeline = mesh_pipeline
+            gfx.apply_pipeline(pipeline.handle)
+        end
         gfx.apply_bindings(gfx.Bindings({
             vertex_buffers = { mesh.vbuf.handle },
             index_buffer = mesh.ibuf.handle,
@@ -7,6 +7,7 @@ local app = require("sokol.app")
 local log = require("lib.log")
 local texture = require("lib.texture")
 local util = require("lib.util")
+local mesh_file = require("lib.mesh")
 local glm = require("lib.glm")
 local imgui = require("imgui")
 local gpu = require("lib.gpu")
@@ -215,6 +216,16 @@ local function load_model()
             log.error("Failed to load model: " .. tostring(err))
         end
     end
+    -- Geometry converted with egg2lua.py --binary lives in a mesh container
+    local geometry
+    if model and model.mesh_file then
+        local err
+        geometry, err = mesh_file.load("assets/" .. model_name .. "/" .. model.mesh_file)
+        if not geometry then
+            log.error("Failed to load mesh data: " .. tostring(err))
+            return
+        end
+    end
     log.info(string.format("load model: %.3fs", os.clock() - t0))
 
     local t_tangent, t_vbuf, t_texture = 0, 0, 0
@@ -222,67 +233,79 @@ local function load_model()
     for mat_name, mesh_data in pairs(model.meshes) do
         local vertices = mesh_data.vertices
         local indices = mesh_data.indices
-
-        -- Compute tangents
-        local t1 = os.clock()
-        local in_stride = 8
-        local vertex_count = #vertices / in_stride
-        local tangents = {}
-        for i = 0, vertex_count - 1 do
-            tangents[i] = { 0, 0, 0 }
+        local index_type = gfx.IndexType.UINT32
+        if geometry then
+            -- Same layout as the tables (8 or 11 floats per vertex), but as buffers with u16 or u32 indices
+            local m = geometry.meshes[mat_name]
+            vertices, indices, index_type = m.vertices, m.indices, m.index_type
         end
 
-        for i = 1, #indices, 3 do
-            local i1, i2, i3 = indices[i], indices[i + 1], indices[i + 2]
-            local base1, base2, base3 = i1 * in_stride, i2 * in_stride, i3 * in_stride
-            -- Inline tangent computation to avoid table allocation
-            local p1x, p1y, p1z = vertices[base1 + 1], vertices[base1 + 2], vertices[base1 + 3]
-            local p2x, p2y, p2z = vertices[base2 + 1], vertices[base2 + 2], vertices[base2 + 3]
-            local p3x, p3y, p3z = vertices[base3 + 1], vertices[base3 + 2], vertices[base3 + 3]
-            local uv1u, uv1v = vertices[base1 + 7], vertices[base1 + 8]
-            local uv2u, uv2v = vertices[base2 + 7], vertices[base2 + 8]
-            local uv3u, uv3v = vertices[base3 + 7], vertices[base3 + 8]
-            local e1x, e1y, e1z = p2x - p1x, p2y - p1y, p2z - p1z
-            local e2x, e2y, e2z = p3x - p1x, p3y - p1y, p3z - p1z
-            local duv1u, duv1v = uv2u - uv1u, uv2v - uv1v
-            local duv2u, duv2v = uv3u - uv1u, uv3v - uv1v
-            local f = duv1u * duv2v - duv2u * duv1v
-            if math.abs(f) < 0.0001 then f = 1 end
-            f = 1.0 / f
-            local tx = f * (duv2v * e1x - duv1v * e2x)
-            local ty = f * (duv2v * e1y - duv1v * e2y)
-            local tz = f * (duv2v * e1z - duv1v * e2z)
-            local t1, t2, t3 = tangents[i1], tangents[i2], tangents[i3]
-            t1[1], t1[2], t1[3] = t1[1] + tx, t1[2] + ty, t1[3] + tz
-            t2[1], t2[2], t2[3] = t2[1] + tx, t2[2] + ty, t2[3] + tz
-            t3[1], t3[2], t3[3] = t3[1] + tx, t3[2] + ty, t3[3] + tz
-        end
-        t_tangent = t_tangent + (os.clock() - t1)
+        local vdata
+        local t1 = os.clock()
+        if model.tangents then
+            -- egg2lua.py --tangents already appended them: 11 floats per vertex
+            vdata = geometry and vertices or util.pack_floats(vertices)
+        else
+            -- Compute tangents
+            local in_stride = 8
+            local vertex_count = #vertices / in_stride
+            local tangents = {}
+            for i = 0, vertex_count - 1 do
+                tangents[i] = { 0, 0, 0 }
+            end
 
-        -- Build vertex buffer with tangents
-        t1 = os.clock()
-        local vparts = {}
-        for i = 0, vertex_count - 1 do
-            local base = i * in_stride
-            local t = tangents[i]
-            local len = math.sqrt(t[1] * t[1] + t[2] * t[2] + t[3] * t[3])
-            local tx, ty, tz
-            if len > 0.0001 then
-                tx, ty, tz = t[1] / len, t[2] / len, t[3] / len
-            else
-                tx, ty, tz = 1, 0, 0
+            for i = 1, #indices, 3 do
+                local i1, i2, i3 = indices[i], indices[i + 1], indices[i + 2]
+                local base1, base2, base3 = i1 * in_stride, i2 * in_stride, i3 * in_stride
+                -- Inline tangent computation to avoid table allocation
+                local p1x, p1y, p1z = vertices[base1 + 1], vertices[base1 + 2], vertices[base1 + 3]
+                local p2x, p2y, p2z = vertices[base2 + 1], vertices[base2 + 2], vertices[base2 + 3]
+                local p3x, p3y, p3z = vertices[base3 + 1], vertices[base3 + 2], vertices[base3 + 3]
+                local uv1u, uv1v = vertices[base1 + 7], vertices[base1 + 8]
+                local uv2u, uv2v = vertices[base2 + 7], vertices[base2 + 8]
+                local uv3u, uv3v = vertices[base3 + 7], vertices[base3 + 8]
+                local e1x, e1y, e1z = p2x - p1x, p2y - p1y, p2z - p1z
+                local e2x, e2y, e2z = p3x - p1x, p3y - p1y, p3z - p1z
+                local duv1u, duv1v = uv2u - uv1u, uv2v - uv1v
+                local duv2u, duv2v = uv3u - uv1u, uv3v - uv1v
+                local f = duv1u * duv2v - duv2u * duv1v
+                if math.abs(f) < 0.0001 then f = 1 end
+                f = 1.0 / f
+                local tx = f * (duv2v * e1x - duv1v * e2x)
+                local ty = f * (duv2v * e1y - duv1v * e2y)
+                local tz = f * (duv2v * e1z - duv1v * e2z)
+                local t1, t2, t3 = tangents[i1], tangents[i2], tangents[i3]
+                t1[1], t1[2], t1[3] = t1[1] + tx, t1[2] + ty, t1[3] + tz
+                t2[1], t2[2], t2[3] = t2[1] + tx, t2[2] + ty, t2[3] + tz
+                t3[1], t3[2], t3[3] = t3[1] + tx, t3[2] + ty, t3[3] + tz
+            end
+            t_tangent = t_tangent + (os.clock() - t1)
+
+            -- Build vertex buffer with tangents
+            t1 = os.clock()
+            local vparts = {}
+            for i = 0, vertex_count - 1 do
+                local base = i * in_stride
+                local t = tangents[i]
+                local len = math.sqrt(t[1] * t[1] + t[2] * t[2] + t[3] * t[3])
+                local tx, ty, tz
+                if len > 0.0001 then
+                    tx, ty, tz = t[1] / len, t[2] / len, t[3] / len
+                else
+                    tx, ty, tz = 1, 0, 0
+                end
+                -- pos(3) + normal(3) + uv(2) + tangent(3) = 11 floats
+                vparts[i + 1] = string.pack("fffffffffff",
+                    vertices[base + 1], vertices[base + 2], vertices[base + 3],
+                    vertices[base + 4], vertices[base + 5], vertices[base + 6],
+                    vertices[base + 7], vertices[base + 8],
+                    tx, ty, tz)
             end
-            -- pos(3) + normal(3) + uv(2) + tangent(3) = 11 floats
-            vparts[i + 1] = string.pack("fffffffffff",
-                vertices[base + 1], vertices[base + 2], vertices[base + 3],
-                vertices[base + 4], vertices[base + 5], vertices[base + 6],
-                vertices[base + 7], vertices[base + 8],
-                tx, ty, tz)
+            vdata = table.concat(vparts)
         end
-        local vdata = table.concat(vparts)
         local vbuf = gpu.buffer(gfx.BufferDesc({ data = gfx.Range(vdata) }))
 
-        local idata = util.pack_u32(indices)
+        local idata = geometry and indices or util.pack_u32(indices)
         local ibuf = gpu.buffer(gfx.BufferDesc({
             usage = { index_buffer = true },
             data = gfx.Range(idata),
@@ -384,6 +407,7 @@ local function load_model()
                 vbuf = vbuf,
                 ibuf = ibuf,
                 num_indices = #indices,
+                index_type = index_type,
                 diffuse_view = diffuse_view,
                 diffuse_smp = diffuse_smp,
                 normal_view = normal_view,
@@ -0,0 +1,141 @@
+-- lib/mesh.lua
+-- Loader for the binary mesh container written by scripts/egg2lua.py --binary
+--
+-- Vertex and index blobs are read straight into mane3d.buffer objects, which
+-- the bindings take as a gfx.Range without packing:
+--
+--   local mesh = require("lib.mesh")
+--   local file = assert(mesh.load("assets/scene/scene.mesh"))
+--   local m = file.meshes["wood"]
+--   local vbuf = gfx.make_buffer(gfx.BufferDesc({ data = m.vertices }))
+--   local ibuf = gfx.make_buffer(gfx.BufferDesc({ usage = { index_buffer = true }, data = m.indices }))
+--   -- m.index_type is gfx.IndexType.UINT16 or UINT32
+local gfx = require("sokol.gfx")
+local buffer = require("mane3d.buffer")
+
+local M = {}
+
+M.VERSION = 1
+
+-- Attribute semantics (u8 semantic of the container)
+M.semantics = { [0] = "position", "normal", "texcoord", "tangent", "color" }
+
+---@class mesh.Attr
+---@field semantic string "position", "normal", "texcoord", "tangent" or "color"
+---@field components integer float32 components
+---@field offset integer byte offset in the vertex
+
+---@class mesh.Mesh
+---@field attrs mesh.Attr[]
+---@field stride integer bytes per vertex
+---@field vertex_count integer
+---@field index_count integer
+---@field index_type gfx.IndexType
+---@field vertices mane3d.buffer f32 interleaved vertices
+---@field indices mane3d.buffer u16 or u32 indices
+
+---@class mesh.File
+---@field version integer
+---@field meshes table<string, mesh.Mesh>
+
+-- Read the blob at offset as a buffer of the given element type
+local function read_blob(f, offset, size, type)
+    if size == 0 then
+        return buffer.new(type)
+    end
+    f:seek("set", offset)
+    local data = f:read(size)
+    if not data or #data ~= size then
+        return nil
+    end
+    return buffer.new(type, data)
+end
+
+-- Load a mesh container
+---@param path string
+---@return mesh.File? file
+---@return string? error
+function M.load(path)
+    local f, err = io.open(path, "rb")
+    if not f then
+        return nil, err
+    end
+    local header = f:read(16)
+    if not header or #header < 16 or header:sub(1, 4) ~= "M3DM" then
+        f:close()
+        return nil, path .. ": not a mesh container"
+    end
+    local version, mesh_count = string.unpack("<I4I4", header, 5)
+    if version ~= M.VERSION then
+        f:close()
+        return nil, string.format("%s: unsupported version %d (expected %d)", path, version, M.VERSION)
+    end
+
+    -- Descriptors are small: read them in one go up to the first blob
+    local descs = {}
+    local pos = 1
+    local chunk = f:read(4096) or ""
+    local function need(n)
+        while #chunk < pos + n - 1 do
+            local more = f:read(4096)
+            if not more then
+                return false
+            end
+            chunk = chunk .. more
+        end
+        return true
+    end
+    for _ = 1, mesh_count do
+        if not need(4) then break end
+        local name_len = string.unpack("<I4", chunk, pos)
+        local padded = (name_len + 3) // 4 * 4
+        if not need(4 + padded + 20) then break end
+        local name = chunk:sub(pos + 4, pos + 3 + name_len)
+        pos = pos + 4 + padded
+        local stride, vertex_count, index_count, index_size, attr_count
+        stride, vertex_count, index_count, index_size, attr_count, pos = string.unpack("<I4I4I4I4I4", chunk, pos)
+        if not need(attr_count * 8 + 32) then break end
+        local attrs = {}
+        for i = 1, attr_count do
+            local semantic, _, components, offset
+            semantic, _, components, offset, pos = string.unpack("<BBBxI4", chunk, pos)
+            attrs[i] = { semantic = M.semantics[semantic] or tostring(semantic), components = components, offset = offset }
+        end
+        local vertex_offset, vertex_size, index_offset, index_bytes
+        vertex_offset, vertex_size, index_offset, index_bytes, pos = string.unpack("<I8I8I8I8", chunk, pos)
+        descs[#descs + 1] = {
+            name = name, attrs = attrs, stride = stride,
+            vertex_count = vertex_count, index_count = index_count, index_size = index_size,
+            vertex_offset = vertex_offset, vertex_size = vertex_size,
+            index_offset = index_offset, index_bytes = index_bytes,
+        }
+    end
+    if #descs ~= mesh_count then
+        f:close()
+        return nil, path .. ": truncated mesh descriptors"
+    end
+    chunk = nil
+
+    local file = { version = version, meshes = {} }
+    for _, d in ipairs(descs) do
+        local vertices = read_blob(f, d.vertex_offset, d.vertex_size, "f32")
+        local indices = read_blob(f, d.index_offset, d.index_bytes, d.index_size == 2 and "u16" or "u32")
+        if not vertices or not indices then
+            f:close()
+            return nil, path .. ": truncated data of mesh " .. d.name
+        end
+        file.meshes[d.name] = {
+            attrs = d.attrs,
+            stride = d.stride,
+            vertex_count = d.vertex_count,
+            index_count = d.index_count,
+            index_type = d.index_size == 2 and gfx.IndexType.UINT16 or gfx.IndexType.UINT32,
+            vertices = vertices,
+            indices = indices,
+        }
+    end
+    f:close()
+    return file
+end
+
+return M
@@ -10,8 +10,10 @@ pcall(function() notify = require("lib.notify") end)
 local M = {}
 
 ---Setup common resource management on a pass module
+---pipeline_desc(shader_handle) builds the default pipeline; pass.get_pipeline(variant)
+---creates more on demand with pipeline_desc(shader_handle, variant)
 ---@param pass table The pass module table
----@param opts {shader_name: string, pipeline_desc: fun(shader_handle: any): gfx.PipelineDesc}
+---@param opts {shader_name: string, pipeline_desc: fun(shader_handle: any, variant: any?): gfx.PipelineDesc}
 function M.setup(pass, opts)
     -- Preserve across hotreload
     pass.resources = pass.resources
@@ -33,14 +35,28 @@ function M.setup(pass, opts)
         local pip_desc = opts.pipeline_desc(shader.handle)
         local pipeline = gpu.pipeline(pip_desc)
 
-        pass.resources = { shader = shader, pipeline = pipeline }
+        pass.resources = { shader = shader, pipeline = pipeline, variants = {} }
         if notify then notify.ok("[shader] " .. pass.name .. " OK") end
         return true
     end
 
-    ---Called by hotreload when this module is reloaded
-    function pass.on_reload()
+    ---Get the pipeline for a variant (nil: the default pipeline)
+    ---@param variant any
+    ---@return gpu.Pipeline
+    function pass.get_pipeline(variant)
+        local resources = pass.resources
+        if variant == nil then return resources.pipeline end
+        if not resources.variants[variant] then
+            resources.variants[variant] = gpu.pipeline(opts.pipeline_desc(resources.shader.handle, variant))
+        end
+        return resources.variants[variant]
+    end
+
+    local function destroy_resources()
         if pass.resources then
+            for _, pipeline in pairs(pass.resources.variants) do
+                pipeline:destroy()
+            end
             pass.resources.pipeline:destroy()
             pass.resources.shader:destroy()
             pass.resources = nil
@@ -48,14 +64,14 @@ function M.setup(pass, opts)
         pass._compile_attempted = false
     end
 
+    ---Called by hotreload when this module is reloaded
+    function pass.on_reload()
+        destroy_resources()
+    end
+
     ---Destroy pass resources
     function pass.destroy()
-        if pass.resources then
-            pass.resources.pipeline:destroy()
-            pass.resources.shader:destroy()
-            pass.resources = nil
-        end
-        pass._compile_attempted = false
+        destroy_resources()
     end
 end
 
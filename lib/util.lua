@@ -1,6 +1,7 @@
 -- Utility functions for mane3d examples
 local stm = require("sokol.time")
 local log = require("lib.log")
+local buffer = require("mane3d.buffer")
 
 -- Initialize sokol_time (once)
 if not _G._stm_initialized then
@@ -54,34 +55,15 @@ function M.resolve_path(path)
     return path
 end
 
--- Helper to pack vertex data as floats (handles large arrays)
+-- Helper to pack vertex data as floats
+-- Returns a string; pass a mane3d.buffer to the bindings directly to skip the copy
 function M.pack_floats(floats)
-    local CHUNK_SIZE = 200  -- Lua unpack limit is around 200-1000
-    local result = {}
-    for i = 1, #floats, CHUNK_SIZE do
-        local chunk_end = math.min(i + CHUNK_SIZE - 1, #floats)
-        local chunk = {}
-        for j = i, chunk_end do
-            chunk[#chunk + 1] = floats[j]
-        end
-        result[#result + 1] = string.pack(string.rep("f", #chunk), table.unpack(chunk))
-    end
-    return table.concat(result)
+    return buffer.f32(floats):tostring()
 end
 
--- Helper to pack index data as u32 (handles large arrays)
+-- Helper to pack index data as u32
 function M.pack_u32(ints)
-    local CHUNK_SIZE = 200
-    local result = {}
-    for i = 1, #ints, CHUNK_SIZE do
-        local chunk_end = math.min(i + CHUNK_SIZE - 1, #ints)
-        local chunk = {}
-        for j = i, chunk_end do
-            chunk[#chunk + 1] = ints[j]
-        end
-        result[#result + 1] = string.pack(string.rep("I4", #chunk), table.unpack(chunk))
-    end
-    return table.concat(result)
+    return buffer.u32(ints):tostring()
 end
 
 return M
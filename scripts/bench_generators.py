@@ -0,0 +1,216 @@
+#-------------------------------------------------------------------------------
+#   bench_generators.py
+#
+#   Throughput benchmark for the binding generators.
+#
+#   Feeds recorded IR (gen/ir_cache/*.json written by gen_lua.py, and
+#   gen/imgui.json written by gen_ir_imgui.py) and synthetically scaled
+#   copies of it (10x, 100x declarations by default) through the generator
+#   stages, without clang:
+#
+#     gen_lua:   ir_load, pre_parse, bindings (gen_module), types (gen_luacats_types)
+#     gen_imgui: ir_load, index (ImGuiBindingGenerator()), bindings (generate), types (LuaCATSGenerator)
+#
+#   Times are the best of --repeat runs; peak memory comes from a separate
+#   run under tracemalloc. The "scaling" column is the cost per declaration
+#   relative to the 1x run: ~1.0 means linear, anything well above it means
+#   a stage went super-linear.
+#
+#   Usage:
+#     python scripts/bench_generators.py --bindgen deps/sokol/bindgen --save-baseline
+#     python scripts/bench_generators.py --bindgen deps/sokol/bindgen
+#
+#   Every run exits with 1 if a stage scales super-linearly (its scaling is
+#   above --tolerance); that check needs no baseline and is the only one
+#   enforced out of the box.
+#
+#   The comparison against a baseline is opt-in: no baseline is committed,
+#   because timings are machine specific. Record one with --save-baseline
+#   on the machine that runs the comparison, and refresh it after changing
+#   that machine, the Python version or the recorded IR, or after an
+#   intended generator slowdown. Runs with a baseline also fail if a stage
+#   got slower than --tolerance times its baseline time or memory.
+#-------------------------------------------------------------------------------
+import argparse
+import copy, glob, importlib, json
+import os, sys, time, tracemalloc
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.abspath(os.path.join(script_dir, '..'))
+
+parser = argparse.ArgumentParser(description='Benchmark the binding generators')
+parser.add_argument('--bindgen', default=os.path.join(root_dir, 'deps/sokol/bindgen'),
+                    help='Path to sokol/bindgen directory (imported by gen_lua.py)')
+parser.add_argument('--ir-cache', default=os.path.join(root_dir, 'gen/ir_cache'),
+                    help='Recorded sokol IR (the gen_lua.py IR cache)')
+parser.add_argument('--imgui-ir', default=os.path.join(root_dir, 'gen/imgui.json'),
+                    help='Recorded ImGui IR (written by gen_ir_imgui.py)')
+parser.add_argument('--scales', default='1,10,100',
+                    help='Comma separated declaration multipliers')
+parser.add_argument('--repeat', type=int, default=3,
+                    help='Timed runs per case (the fastest one is reported)')
+parser.add_argument('--baseline', default=os.path.join(script_dir, 'bench_generators_baseline.json'),
+                    help='Baseline JSON to compare against')
+parser.add_argument('--save-baseline', action='store_true',
+                    help='Store this run as the baseline instead of comparing')
+parser.add_argument('--tolerance', type=float, default=1.5,
+                    help='Allowed slowdown against the baseline, and allowed scaling factor')
+parser.add_argument('--min-ms', type=float, default=5.0,
+                    help='Stages faster than this are too noisy to be checked')
+args = parser.parse_args()
+
+def import_gen_lua():
+    """gen_lua.py parses the command line when imported: give it its own"""
+    argv = sys.argv
+    sys.argv = ['gen_lua.py', '--bindgen', args.bindgen, '--handles-as-integers', '--no-ir-cache']
+    try:
+        return importlib.import_module('gen_lua')
+    finally:
+        sys.argv = argv
+
+def scale_ir(ir, factor):
+    """IR with factor copies of every declaration of the module. Copies get
+    their own names but keep the types of the original, so every copy goes
+    through the same code paths. Dependency declarations are kept once."""
+    decls = list(ir['decls'])
+    for i in range(1, factor):
+        for decl in ir['decls']:
+            if decl.get('is_dep') or 'name' not in decl:
+                continue
+            dup = copy.deepcopy(decl)
+            dup['name'] = f'{decl["name"]}_dup{i}'
+            for item in dup.get('items', []):
+                item['name'] = f'{item["name"]}_dup{i}'
+            decls.append(dup)
+    scaled = dict(ir)
+    scaled['decls'] = decls
+    return scaled
+
+def load_recorded_irs():
+    """[(case name, ir)] for every recorded IR that exists"""
+    irs = []
+    for path in sorted(glob.glob(os.path.join(args.ir_cache, '*.json'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            irs.append((f'lua.{os.path.splitext(os.path.basename(path))[0]}', json.load(f)['ir']))
+    if os.path.isfile(args.imgui_ir):
+        with open(args.imgui_ir, 'r', encoding='utf-8') as f:
+            irs.append(('imgui', json.load(f)))
+    return irs
+
+def run_gen_lua(gen_lua, ir_json):
+    stages = {}
+    start = time.perf_counter()
+    ir = json.loads(ir_json)
+    stages['ir_load'] = time.perf_counter() - start
+    c_prefix = ir['prefix']
+    module_name = gen_lua.module_names[c_prefix]
+    ctx = gen_lua.begin_module()
+    with gen_lua.phase('bindings'):
+        gen_lua.gen_module(ir, c_prefix, gen_lua.module_deps.get(c_prefix, []))
+        ctx.source()
+    with gen_lua.phase('types'):
+        gen_lua.gen_luacats_types(ir, ir['prefix'], module_name)
+    for stage in ('pre_parse', 'bindings', 'types'):
+        stages[stage] = ctx.timings.get(stage, 0.0)
+    return stages
+
+def run_gen_imgui(gen_imgui, ir_json):
+    stages = {}
+    start = time.perf_counter()
+    ir = json.loads(ir_json)
+    stages['ir_load'] = time.perf_counter() - start
+    start = time.perf_counter()
+    gen = gen_imgui.ImGuiBindingGenerator(ir)
+    stages['index'] = time.perf_counter() - start
+    start = time.perf_counter()
+    gen.generate()
+    stages['bindings'] = time.perf_counter() - start
+    start = time.perf_counter()
+    gen_imgui.LuaCATSGenerator(ir, gen).generate()
+    stages['types'] = time.perf_counter() - start
+    return stages
+
+def measure(run, ir_json):
+    """Best stage times (seconds) of args.repeat runs, and the peak traced memory (bytes)"""
+    best = None
+    for _ in range(max(1, args.repeat)):
+        stages = run(ir_json)
+        best = stages if best is None else {k: min(v, best[k]) for k, v in stages.items()}
+    tracemalloc.start()
+    run(ir_json)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def bench():
+    gen_lua = import_gen_lua()
+    gen_imgui = importlib.import_module('gen_imgui')
+    scales = [int(s) for s in args.scales.split(',')]
+    results = {}
+    print(f'{"case":<24}{"decls":>8}{"stage":>11}{"ms":>10}{"scaling":>9}')
+    for name, ir in load_recorded_irs():
+        if not any(not d.get('is_dep') for d in ir['decls']):
+            continue
+        run = (lambda j: run_gen_imgui(gen_imgui, j)) if name == 'imgui' else (lambda j: run_gen_lua(gen_lua, j))
+        unit = None
+        for factor in scales:
+            scaled = scale_ir(ir, factor)
+            stages, peak = measure(run, json.dumps(scaled))
+            case = f'{name}@{factor}x'
+            decls = sum(1 for d in scaled['decls'] if not d.get('is_dep'))
+            results[case] = {'decls': decls, 'peak_kib': peak // 1024,
+                             'ms': {k: v * 1000 for k, v in stages.items()}}
+            if unit is None:
+                unit = (decls, results[case]['ms'])
+            for stage, ms in results[case]['ms'].items():
+                scaling = ''
+                base_ms = unit[1][stage] / unit[0] * decls
+                if factor != scales[0] and base_ms > 0:
+                    scaling = f'{ms / base_ms:.2f}'
+                    results[case].setdefault('scaling', {})[stage] = ms / base_ms
+                print(f'{case:<24}{decls:>8}{stage:>11}{ms:>10.2f}{scaling:>9}')
+            print(f'{case:<24}{decls:>8}{"peak KiB":>11}{peak // 1024:>10}')
+    return results
+
+def compare(results, baseline):
+    """Return the list of regressions against the baseline, and super-linear stages"""
+    failures = []
+    for case, r in results.items():
+        for stage, ms in r['ms'].items():
+            if ms < args.min_ms:
+                continue
+            scaling = r.get('scaling', {}).get(stage)
+            if scaling is not None and scaling > args.tolerance:
+                failures.append(f'{case} {stage}: {scaling:.2f}x the per-declaration cost of the smallest scale')
+            base = baseline.get(case, {}).get('ms', {}).get(stage)
+            if base and ms > base * args.tolerance:
+                failures.append(f'{case} {stage}: {ms:.2f} ms vs {base:.2f} ms baseline')
+        base_peak = baseline.get(case, {}).get('peak_kib')
+        if base_peak and r['peak_kib'] > base_peak * args.tolerance:
+            failures.append(f'{case} peak memory: {r["peak_kib"]} KiB vs {base_peak} KiB baseline')
+    return failures
+
+def main():
+    results = bench()
+    if not results:
+        print(f'No recorded IR in {args.ir_cache} or {args.imgui_ir}: run gen_lua.py / gen_imgui.py first')
+        return 1
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8', newline='\n') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline written to {args.baseline}')
+        return 0
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    else:
+        print(f'No baseline at {args.baseline}: only checking scaling (use --save-baseline)')
+    failures = compare(results, baseline)
+    for failure in failures:
+        print(f'REGRESSION: {failure}')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,29 +2,110 @@
 """
 egg2lua.py - Convert Panda3D .egg files to Lua table format
 
-Usage: python egg2lua.py input.egg output.lua
+Usage: python egg2lua.py input.egg output.lua [--binary] [--index-format u16|u32|auto]
+                         [--no-weld] [--weld-epsilon EPS]
+                         [--stream] [--max-mesh-vertices N] [--tangents]
+                         [--optimize] [--cache-size N] [--overdraw-threshold T]
+
+Polygon corners with identical position, normal and uv share one vertex
+per material mesh unless --no-weld is given. --tangents appends a
+per-vertex tangent (tx, ty, tz) to every vertex, computed with NumPy.
+--optimize reorders the triangles of each mesh for the post-transform
+vertex cache and for overdraw, renumbers the vertices in order of first
+use, and reports the ACMR and ATVR before and after.
+
+With --binary the mesh geometry goes to a binary container next to the Lua
+module (output.mesh, loaded with lib/mesh.lua) and the module only keeps
+textures, materials and per-mesh metadata. Container layout, little-endian:
+
+  header      "M3DM", u32 version (1), u32 mesh_count, u32 reserved
+  per mesh    u32 name_length, name (UTF-8, padded to 4 bytes),
+              u32 stride, u32 vertex_count, u32 index_count,
+              u32 index_size (2 or 4), u32 attr_count,
+              attr_count * { u8 semantic, u8 format, u8 components, u8 reserved, u32 offset },
+              u64 vertex_offset, u64 vertex_size, u64 index_offset, u64 index_size
+  blobs       float32 vertices and u16/u32 indices, at 16-byte aligned
+              offsets from the start of the file
+
+--stream converts scenes too large to hold in memory into the binary
+container: the input is read in chunks, vertex pools are kept as float32
+arrays, and each material mesh is written out once complete. A material
+with more than --max-mesh-vertices vertices is split into several meshes
+("name", "name.1", ...), each with material = "name" in the Lua module.
 """
 
+import argparse
+import array
+import struct
 import sys
 import re
 import os
+import shutil
+import tempfile
+
+try:
+    import numpy as np
+except ImportError:  # only needed for --tangents
+    np = None
+
+
+# One token per match, with the whitespace before it; lastindex tells the
+# kind. Consecutive bare words (the numbers of a vertex, say) come as one
+# run, split by the parser.
+RE_TOKEN = re.compile(
+    r"""\s*(?:"""
+    r"""((?:[^\s{}<>"/]|/(?![/*]))(?:[^{}<>"/]+|/(?![/*]))*)"""  # 1: run of bare words
+    r"""|([{}])"""                       # 2: brace
+    r"""|<([^>]*)>"""                    # 3: <Tag>
+    r"""|("[^"]*")"""                    # 4: quoted string
+    r"""|(//[^\n]*|/\*.*?\*/))""",      # 5: comment
+    re.DOTALL,
+)
+TOKEN_WORDS, TOKEN_BRACE, TOKEN_TAG, TOKEN_STRING, TOKEN_COMMENT = 1, 2, 3, 4, 5
+
+# Fast path for the bulk of a file: after <Vertex>, a plain "n { x y z ... }"
+# block whose only children are unnamed <UV>, <Normal> and <RGBA> blocks.
+# Anything else (comments, tangents, named UVs, ...) goes through the tokenizer.
+RE_SIMPLE_VERTEX = re.compile(
+    r"""\s*(\d+)\s*\{([^{}<>"/]*)((?:<(?:UV|Normal|RGBA)>\s*\{[^{}<>"/]*\}\s*)*)\}"""
+)
+RE_VERTEX_ATTR = re.compile(r"<(UV|Normal|RGBA)>\s*\{([^{}]*)\}")
+
+# Fast path for leaf blocks (<Scalar> name { v }, <TRef> { t }, ...): the
+# name and the contents in one match when neither needs the tokenizer
+RE_LEAF = re.compile(r"""([^{}<>"/]*)\{([^{}<>"/]*)\}""")
+
+# Text the tokenizer skipped that may still become a token with more input
+RE_INCOMPLETE = re.compile(r"""["<]|/\*""")
+
+MATERIAL_SCALARS = {
+    "diffr": ("diffuse", 0), "diffg": ("diffuse", 1), "diffb": ("diffuse", 2),
+    "ambr": ("ambient", 0), "ambg": ("ambient", 1), "ambb": ("ambient", 2),
+    "specr": ("specular", 0), "specg": ("specular", 1), "specb": ("specular", 2),
+    "emitr": ("emission", 0), "emitg": ("emission", 1), "emitb": ("emission", 2),
+}
+
+
+class _Block:
+    """An open <Tag> name { ... } block on the parser stack"""
+
+    __slots__ = ("tag", "name", "values", "data")
+
+    def __init__(self, tag, name, data):
+        self.tag = tag
+        self.name = name
+        self.values = []  # words and strings directly inside the block
+        self.data = data  # what the block builds (vertex, polygon, ...), or None
 
 
 class EggParser:
-    """Parser for Panda3D .egg files"""
-
-    # Pre-compiled regex patterns
-    RE_SCALAR = re.compile(r"<Scalar>\s*(\w+)\s*{\s*(\S+)\s*}")
-    RE_VERTEX = re.compile(r"<Vertex>\s*(\d+)\s*{")
-    RE_UV = re.compile(r"<UV>\s*{\s*([\d.e+-]+)\s+([\d.e+-]+)\s*}")
-    RE_NORMAL = re.compile(r"<Normal>\s*{\s*([\d.e+-]+)\s+([\d.e+-]+)\s+([\d.e+-]+)\s*}")
-    RE_RGBA = re.compile(r"<RGBA>\s*{\s*([\d.e+-]+)\s+([\d.e+-]+)\s+([\d.e+-]+)\s+([\d.e+-]+)\s*}")
-    RE_POLYGON = re.compile(r"<Polygon>\s*{")
-    RE_GROUP = re.compile(r"<Group>\s*(\S+)\s*{")
-    RE_TREF = re.compile(r"<TRef>\s*{\s*(\S+)\s*}")
-    RE_MREF = re.compile(r"<MRef>\s*{\s*(\S+)\s*}")
-    RE_VREF = re.compile(r"<VertexRef>\s*{([^}]+)}")
-    RE_VREF_REF = re.compile(r"<Ref>")
+    """Parser for Panda3D .egg files.
+
+    parse() tokenizes the file in one pass and keeps the open blocks on an
+    explicit stack. Each block is turned into a texture, material, vertex,
+    polygon or group when its closing brace is reached, so the time is
+    linear in the file size. Polygons belong to their innermost group.
+    """
 
     def __init__(self):
         self.textures = {}
@@ -32,104 +113,246 @@ class EggParser:
         self.vertex_pools = {}
         self.groups = []
         self.coordinate_system = "Z-Up"
+        self._stack = []
+        self._pending_tag = None
+        self._pending_name = []
+        self._tail = ""
+        self._openers = {
+            "Group": self._open_group,
+            "VertexPool": lambda stack, name: [],
+            "Vertex": lambda stack, name: {"pos": [0, 0, 0], "uv": [0, 0], "normal": [0, 1, 0], "rgba": [1, 1, 1, 1]},
+            "Polygon": lambda stack, name: {"texture_refs": [], "material_ref": None, "vertex_refs": []},
+            "Texture": lambda stack, name: {},
+            "Material": lambda stack, name: {},
+        }
+        self._closers = {
+            "Vertex": self._close_vertex,
+            "UV": self._close_uv,
+            "Normal": self._close_normal,
+            "RGBA": self._close_rgba,
+            "VertexPool": self._close_vertex_pool,
+            "TRef": self._close_tref,
+            "MRef": self._close_mref,
+            "VertexRef": self._close_vertex_ref,
+            "Polygon": self._close_polygon,
+            "Group": self._close_group,
+            "Scalar": self._close_scalar,
+            "Texture": self._close_texture,
+            "Material": self._close_material,
+            "CoordinateSystem": self._close_coordinate_system,
+        }
 
     def parse(self, content):
         """Parse egg file content"""
-        content = re.sub(r"//.*$", "", content, flags=re.MULTILINE)
-        content_len = len(content)
-
+        self._scan(content, True)
+
+    def feed(self, chunk):
+        """Parse the next chunk of a file read piece by piece; call close() after the last one"""
+        content = self._tail + chunk
+        self._tail = content[self._scan(content, False):]
+
+    def close(self):
+        """Parse what is left of the chunks given to feed()"""
+        content, self._tail = self._tail, ""
+        self._scan(content, True)
+
+    def _scan(self, content, final):
+        """Tokenize content and return the position parsed up to. Unless
+        final, a token that may continue past the end of content is left
+        for the next call."""
+        openers = self._openers
+        closers = self._closers
+        stack = self._stack
+        pending_tag = self._pending_tag
+        pending_name = self._pending_name
+
+        search = RE_TOKEN.search
+        simple_vertex = RE_SIMPLE_VERTEX.match
+        leaf = RE_LEAF.match
+        end = len(content)
         pos = 0
-        while pos < content_len:
-            pos = self._skip_whitespace(content, pos, content_len)
-            if pos >= content_len:
-                break
 
-            if content[pos] == "<":
-                end = content.find(">", pos)
-                if end == -1:
+        while True:
+            m = search(content, pos)
+            if not final and (m is None or m.end() == end or m.start() != pos):
+                # A word run or comment cut by the chunk end, or a string,
+                # tag or comment whose closing delimiter is yet to come
+                skipped = content[pos:end if m is None else m.start()]
+                if m is not None and m.end() == end or RE_INCOMPLETE.search(skipped):
                     break
-                tag = content[pos + 1 : end].strip()
-                pos = end + 1
-
-                pos = self._skip_whitespace(content, pos, content_len)
-
-                name_start = pos
-                while pos < content_len and content[pos] not in "{\n":
-                    pos += 1
-                name = content[name_start:pos].strip()
-
-                pos = self._skip_whitespace(content, pos, content_len)
-                if pos < content_len and content[pos] == "{":
-                    block_end = self._find_block_end(content, pos, content_len)
-                    block_content = content[pos + 1 : block_end]
-
-                    if tag == "CoordinateSystem":
-                        self.coordinate_system = block_content.strip()
-                    elif tag == "Texture":
-                        self._parse_texture(name, block_content)
-                    elif tag == "Material":
-                        self._parse_material(name, block_content)
-                    elif tag == "VertexPool":
-                        self._parse_vertex_pool(name, block_content)
-                    elif tag == "Group":
-                        self._parse_group(name, block_content)
-
-                    pos = block_end + 1
-            else:
-                pos += 1
-
-    def _skip_whitespace(self, content, pos, content_len):
-        while pos < content_len and content[pos] in " \t\n\r":
-            pos += 1
+            if m is None:
+                pos = end
+                break
+            pos = m.end()
+            kind = m.lastindex
+            if kind == TOKEN_WORDS:
+                if pending_tag is not None:
+                    pending_name.extend(m.group(kind).split())
+                elif stack:
+                    stack[-1].values.extend(m.group(kind).split())
+            elif kind == TOKEN_STRING:
+                if pending_tag is not None:
+                    pending_name.append(m.group(kind))
+                elif stack:
+                    stack[-1].values.append(m.group(kind))
+            elif kind == TOKEN_BRACE:
+                if m.group(kind) == "{":
+                    name = " ".join(pending_name)
+                    opener = openers.get(pending_tag)
+                    stack.append(_Block(pending_tag, name, opener(stack, name) if opener else None))
+                elif stack:
+                    block = stack.pop()
+                    closer = closers.get(block.tag)
+                    if closer:
+                        closer(block, stack)
+                pending_tag = None
+            elif kind == TOKEN_TAG:
+                pending_tag = m.group(kind).strip()
+                pending_name = []
+                if pending_tag == "Vertex":
+                    vm = simple_vertex(content, pos)
+                    if vm is not None:
+                        self._simple_vertex(vm, stack)
+                        pos = vm.end()
+                        pending_tag = None
+                else:
+                    lm = leaf(content, pos)
+                    if lm is not None:
+                        block = _Block(pending_tag, " ".join(lm.group(1).split()), None)
+                        opener = openers.get(pending_tag)
+                        if opener:
+                            block.data = opener(stack, block.name)
+                        block.values = lm.group(2).split()
+                        closer = closers.get(pending_tag)
+                        if closer:
+                            closer(block, stack)
+                        pos = lm.end()
+                        pending_tag = None
+
+        self._pending_tag = pending_tag
+        self._pending_name = pending_name
         return pos
 
-    def _find_block_end(self, content, start, content_len):
-        """Find matching closing brace - optimized"""
-        depth = 1
-        pos = start + 1
-        while pos < content_len:
-            # Find next brace of either type
-            next_open = content.find("{", pos)
-            next_close = content.find("}", pos)
-
-            if next_close == -1:
-                return content_len
-
-            if next_open == -1 or next_close < next_open:
-                depth -= 1
-                if depth == 0:
-                    return next_close
-                pos = next_close + 1
-            else:
-                depth += 1
-                pos = next_open + 1
-
-        return content_len
-
-    def _parse_texture(self, name, content):
-        """Parse texture block"""
+    @staticmethod
+    def _enclosing(stack, tag):
+        """Innermost open block with the given tag, or None"""
+        for block in reversed(stack):
+            if block.tag == tag:
+                return block
+        return None
+
+    @staticmethod
+    def _parent(stack, tag):
+        """The enclosing block if it has the given tag, or None"""
+        if stack and stack[-1].tag == tag:
+            return stack[-1]
+        return None
+
+    def _open_group(self, stack, name):
+        parent = self._enclosing(stack, "Group")
+        if parent is not None:
+            name = f"{parent.data['name']}/{name.split()[0] if name else name}"
+        return {"name": name, "polygons": []}
+
+    def _simple_vertex(self, m, stack):
+        """Build a vertex matched by RE_SIMPLE_VERTEX, as the blocks would"""
+        block = _Block("Vertex", m.group(1), self._openers["Vertex"](stack, m.group(1)))
+        block.values = m.group(2).split()
+        attrs = m.group(3)
+        if attrs:
+            stack.append(block)
+            closers = self._closers
+            for tag, values in RE_VERTEX_ATTR.findall(attrs):
+                attr = _Block(tag, "", None)
+                attr.values = values.split()
+                closers[tag](attr, stack)
+            stack.pop()
+        self._close_vertex(block, stack)
+
+    def _close_vertex(self, block, stack):
+        values = block.values
+        if len(values) >= 3:
+            block.data["pos"] = [float(values[0]), float(values[1]), float(values[2])]
+        pool = self._enclosing(stack, "VertexPool")
+        if pool is not None and block.name.isdigit():
+            self._store_vertex(pool.data, int(block.name), block.data)
+
+    def _store_vertex(self, vertices, idx, vertex):
+        while len(vertices) <= idx:
+            vertices.append(None)
+        vertices[idx] = vertex
+
+    def _close_uv(self, block, stack):
+        vertex = self._parent(stack, "Vertex")
+        values = block.values
+        # Named UV sets are extra texture coordinates: only the default one is used
+        if vertex is not None and not block.name and len(values) >= 2:
+            vertex.data["uv"] = [float(values[0]), float(values[1])]
+
+    def _close_normal(self, block, stack):
+        vertex = self._parent(stack, "Vertex")
+        values = block.values
+        if vertex is not None and len(values) >= 3:
+            nx, ny, nz = float(values[0]), float(values[1]), float(values[2])
+            length = (nx * nx + ny * ny + nz * nz) ** 0.5
+            if length > 0.0001:
+                vertex.data["normal"] = [nx / length, ny / length, nz / length]
+
+    def _close_rgba(self, block, stack):
+        vertex = self._parent(stack, "Vertex")
+        if vertex is not None and len(block.values) >= 4:
+            vertex.data["rgba"] = [float(v) for v in block.values[:4]]
+
+    def _close_vertex_pool(self, block, stack):
+        self.vertex_pools[block.name] = block.data
+
+    def _close_tref(self, block, stack):
+        polygon = self._parent(stack, "Polygon")
+        if polygon is not None and block.values:
+            polygon.data["texture_refs"].append(block.values[0])
+
+    def _close_mref(self, block, stack):
+        polygon = self._parent(stack, "Polygon")
+        if polygon is not None and block.values and polygon.data["material_ref"] is None:
+            polygon.data["material_ref"] = block.values[0]
+
+    def _close_vertex_ref(self, block, stack):
+        # The pool named by the nested <Ref> is not used: meshes take the first pool
+        polygon = self._parent(stack, "Polygon")
+        if polygon is not None:
+            polygon.data["vertex_refs"] = [int(x) for x in block.values if x.isdigit()]
+
+    def _close_polygon(self, block, stack):
+        group = self._enclosing(stack, "Group")
+        if group is not None:
+            group.data["polygons"].append(block.data)
+
+    def _close_group(self, block, stack):
+        if block.data["polygons"]:
+            self.groups.append(block.data)
+
+    def _close_scalar(self, block, stack):
+        if stack and stack[-1].tag in ("Texture", "Material") and block.values:
+            stack[-1].data[block.name] = block.values[0]
+
+    def _close_texture(self, block, stack):
+        """Texture path (first string) and wrap/env scalars"""
         tex = {"path": "", "wrap_u": "repeat", "wrap_v": "repeat", "envtype": "modulate"}
-
-        lines = content.strip().split("\n")
-        for line in lines:
-            line = line.strip()
-            if line.startswith('"') and line.endswith('"'):
-                tex["path"] = os.path.basename(line[1:-1])
-            elif "<Scalar>" in line:
-                m = self.RE_SCALAR.search(line)
-                if m:
-                    key, val = m.group(1), m.group(2)
-                    if key == "wrapu":
-                        tex["wrap_u"] = val
-                    elif key == "wrapv":
-                        tex["wrap_v"] = val
-                    elif key == "envtype":
-                        tex["envtype"] = val
-
-        self.textures[name] = tex
-
-    def _parse_material(self, name, content):
-        """Parse material block"""
+        for value in block.values:
+            if value.startswith('"'):
+                tex["path"] = os.path.basename(value[1:-1])
+                break
+        scalars = block.data
+        if "wrapu" in scalars:
+            tex["wrap_u"] = scalars["wrapu"]
+        if "wrapv" in scalars:
+            tex["wrap_v"] = scalars["wrapv"]
+        if "envtype" in scalars:
+            tex["envtype"] = scalars["envtype"]
+        self.textures[block.name] = tex
+
+    def _close_material(self, block, stack):
+        """Material colors and shininess from its scalars"""
         mat = {
             "diffuse": [0.8, 0.8, 0.8],
             "ambient": [1, 1, 1],
@@ -137,148 +360,689 @@ class EggParser:
             "emission": [0, 0, 0],
             "shininess": 10,
         }
-
-        for m in self.RE_SCALAR.finditer(content):
-            key, val = m.group(1), float(m.group(2))
-            if key == "diffr":
-                mat["diffuse"][0] = val
-            elif key == "diffg":
-                mat["diffuse"][1] = val
-            elif key == "diffb":
-                mat["diffuse"][2] = val
-            elif key == "ambr":
-                mat["ambient"][0] = val
-            elif key == "ambg":
-                mat["ambient"][1] = val
-            elif key == "ambb":
-                mat["ambient"][2] = val
-            elif key == "specr":
-                mat["specular"][0] = val
-            elif key == "specg":
-                mat["specular"][1] = val
-            elif key == "specb":
-                mat["specular"][2] = val
-            elif key == "emitr":
-                mat["emission"][0] = val
-            elif key == "emitg":
-                mat["emission"][1] = val
-            elif key == "emitb":
-                mat["emission"][2] = val
+        for key, val in block.data.items():
+            if key in MATERIAL_SCALARS:
+                field, i = MATERIAL_SCALARS[key]
+                mat[field][i] = float(val)
             elif key == "shininess":
-                mat["shininess"] = val
+                mat["shininess"] = float(val)
+        self.materials[block.name] = mat
 
-        self.materials[name] = mat
+    def _close_coordinate_system(self, block, stack):
+        self.coordinate_system = " ".join(block.values)
 
-    def _parse_vertex_pool(self, name, content):
-        """Parse vertex pool block"""
-        vertices = []
-        content_len = len(content)
 
-        for m in self.RE_VERTEX.finditer(content):
-            idx = int(m.group(1))
-            start = m.end()
-            end = self._find_block_end(content, start - 1, content_len)
-            vertex_content = content[start:end]
+# Characters read at a time by --stream
+CHUNK_SIZE = 1 << 20
 
-            vertex = self._parse_vertex(vertex_content)
+# Floats per vertex of a CompactVertexPool: x y z nx ny nz u v
+POOL_FLOATS = 8
 
-            while len(vertices) <= idx:
-                vertices.append(None)
-            vertices[idx] = vertex
 
-        self.vertex_pools[name] = vertices
+class CompactVertexPool:
+    """Vertex pool holding the position, normal and uv of each vertex in one
+    float32 array, POOL_FLOATS per vertex, instead of a dict per vertex"""
 
-    def _parse_vertex(self, content):
-        """Parse single vertex data"""
-        vertex = {
-            "pos": [0, 0, 0],
-            "uv": [0, 0],
-            "normal": [0, 1, 0],
-            "rgba": [1, 1, 1, 1],
-        }
+    def __init__(self):
+        self.floats = array.array("f")
+        self.present = bytearray()  # 1 for each index a <Vertex> defined
+
+    def __len__(self):
+        return len(self.present)
+
+    def store(self, idx, vertex):
+        count = len(self.present)
+        values = [*vertex["pos"], *vertex["normal"], *vertex["uv"]]
+        if idx == count:
+            self.floats.extend(values)
+            self.present.append(1)
+            return
+        if idx > count:
+            self.floats.frombytes(bytes((idx + 1 - count) * POOL_FLOATS * 4))
+            self.present.extend(bytes(idx + 1 - count))
+        offset = idx * POOL_FLOATS
+        self.floats[offset:offset + POOL_FLOATS] = array.array("f", values)
+        self.present[idx] = 1
+
+    def values(self, idx):
+        """The POOL_FLOATS floats of a vertex, as an array('f')"""
+        offset = idx * POOL_FLOATS
+        return self.floats[offset:offset + POOL_FLOATS]
+
+
+class StreamingEggParser(EggParser):
+    """EggParser for scenes too large to hold in memory, usually fed a chunk
+    at a time with feed().
+
+    Vertex pools are CompactVertexPools, and each polygon inside a group is
+    handed to on_polygon(polygon, pool) with the first vertex pool as soon
+    as it is parsed instead of being kept. groups only records the name and
+    polygon count of each group.
+    """
+
+    def __init__(self, on_polygon):
+        super().__init__()
+        self.on_polygon = on_polygon
+        self.polygon_count = 0
+        self._openers["VertexPool"] = lambda stack, name: CompactVertexPool()
+
+    def _store_vertex(self, vertices, idx, vertex):
+        vertices.store(idx, vertex)
+
+    def _open_group(self, stack, name):
+        group = super()._open_group(stack, name)
+        group["polygons"] = 0
+        return group
+
+    def _close_polygon(self, block, stack):
+        group = self._enclosing(stack, "Group")
+        if group is None:
+            return
+        group.data["polygons"] += 1
+        self.polygon_count += 1
+        pool = next(iter(self.vertex_pools.values()), None)
+        if pool is not None:
+            self.on_polygon(block.data, pool)
+
+
+MESH_MAGIC = b"M3DM"
+MESH_VERSION = 1
+
+# Vertex attribute semantics and formats of the binary container
+SEMANTIC_POSITION = 0
+SEMANTIC_NORMAL = 1
+SEMANTIC_TEXCOORD = 2
+SEMANTIC_TANGENT = 3
+SEMANTIC_COLOR = 4
+FORMAT_FLOAT32 = 1
+
+# (semantic, components) of the vertices written by build_meshes
+VERTEX_LAYOUT = [
+    (SEMANTIC_POSITION, 3),
+    (SEMANTIC_NORMAL, 3),
+    (SEMANTIC_TEXCOORD, 2),
+]
+
+# VERTEX_LAYOUT followed by the tangents of add_tangents
+TANGENT_LAYOUT = VERTEX_LAYOUT + [(SEMANTIC_TANGENT, 3)]
+
+# Post-transform cache entries assumed by --optimize, and its overdraw
+# clustering threshold (see optimize_indices)
+CACHE_SIZE = 16
+OVERDRAW_THRESHOLD = 1.05
+
+
+def _weld_key(vertex, epsilon):
+    """Hashable (position, normal, uv) of a vertex, snapped to an epsilon grid if given"""
+    values = (*vertex["pos"], *vertex["normal"], *vertex["uv"])
+    if epsilon > 0:
+        return tuple(round(x / epsilon) for x in values)
+    return values
+
+
+def build_meshes(parser, weld=True, weld_epsilon=0.0):
+    """Group polygons by material into indexed triangle-list meshes.
+
+    With weld, corners with the same (position, normal, uv) share one vertex
+    per mesh (compared exactly, or after snapping to weld_epsilon), and
+    triangles that collapse doing so are dropped. Without it every polygon
+    corner gets its own vertex.
+    """
+    meshes_by_material = {}
+    weld_maps = {}
 
-        lines = content.strip().split("\n")
-        if lines:
-            parts = lines[0].strip().split()
-            if len(parts) >= 3:
-                vertex["pos"] = [float(parts[0]), float(parts[1]), float(parts[2])]
+    pool_name = next(iter(parser.vertex_pools), None)
+    pool = parser.vertex_pools[pool_name] if pool_name else None
 
-        # Search in full content for sub-elements
-        m = self.RE_UV.search(content)
-        if m:
-            vertex["uv"] = [float(m.group(1)), float(m.group(2))]
+    for group in parser.groups:
+        for polygon in group["polygons"]:
+            mat_name = polygon["material_ref"] or "default"
+            if mat_name not in meshes_by_material:
+                meshes_by_material[mat_name] = {
+                    "vertices": [],
+                    "indices": [],
+                    "textures": [],
+                    "corners": 0,
+                }
+                weld_maps[mat_name] = {}
+            mesh = meshes_by_material[mat_name]
 
-        m = self.RE_NORMAL.search(content)
-        if m:
-            nx, ny, nz = float(m.group(1)), float(m.group(2)), float(m.group(3))
-            length = (nx * nx + ny * ny + nz * nz) ** 0.5
-            if length > 0.0001:
-                vertex["normal"] = [nx / length, ny / length, nz / length]
-
-        m = self.RE_RGBA.search(content)
-        if m:
-            vertex["rgba"] = [
-                float(m.group(1)),
-                float(m.group(2)),
-                float(m.group(3)),
-                float(m.group(4)),
-            ]
-
-        return vertex
-
-    def _parse_group(self, name, content):
-        """Parse group block (contains polygons)"""
-        group = {"name": name, "polygons": []}
-        content_len = len(content)
-
-        # Find all polygons
-        for m in self.RE_POLYGON.finditer(content):
-            start = m.end()
-            end = self._find_block_end(content, start - 1, content_len)
-            polygon_content = content[start:end]
-
-            polygon = self._parse_polygon(polygon_content)
-            group["polygons"].append(polygon)
-
-        # Recursively parse nested groups
-        for m in self.RE_GROUP.finditer(content):
-            nested_name = m.group(1)
-            start = m.end()
-            end = self._find_block_end(content, start - 1, content_len)
-            nested_content = content[start:end]
-
-            self._parse_group(f"{name}/{nested_name}", nested_content)
-
-        if group["polygons"]:
-            self.groups.append(group)
-
-    def _parse_polygon(self, content):
-        """Parse polygon block"""
-        polygon = {"texture_refs": [], "material_ref": None, "vertex_refs": []}
-
-        for m in self.RE_TREF.finditer(content):
-            polygon["texture_refs"].append(m.group(1))
-
-        m = self.RE_MREF.search(content)
-        if m:
-            polygon["material_ref"] = m.group(1)
-
-        m = self.RE_VREF.search(content)
-        if m:
-            ref_content = m.group(1)
-            ref_m = self.RE_VREF_REF.search(ref_content)
-            if ref_m:
-                indices_str = ref_content[: ref_m.start()]
-            else:
-                indices_str = ref_content
-            indices = [int(x) for x in indices_str.split() if x.isdigit()]
-            polygon["vertex_refs"] = indices
+            if pool is None:
+                continue
+
+            if not mesh["textures"] and polygon["texture_refs"]:
+                mesh["textures"] = polygon["texture_refs"]
 
-        return polygon
+            vertices = mesh["vertices"]
+            corners = []
+            if weld:
+                weld_map = weld_maps[mat_name]
+                for vi in polygon["vertex_refs"]:
+                    if vi < len(pool) and pool[vi]:
+                        key = _weld_key(pool[vi], weld_epsilon)
+                        idx = weld_map.get(key)
+                        if idx is None:
+                            idx = len(vertices)
+                            weld_map[key] = idx
+                            vertices.append(pool[vi])
+                        corners.append(idx)
+            else:
+                for vi in polygon["vertex_refs"]:
+                    if vi < len(pool) and pool[vi]:
+                        corners.append(len(vertices))
+                        vertices.append(pool[vi])
+            mesh["corners"] += len(corners)
+
+            for i in range(1, len(corners) - 1):
+                a, b, c = corners[0], corners[i], corners[i + 1]
+                if weld and (a == b or b == c or a == c):
+                    continue
+                mesh["indices"].extend((a, b, c))
+
+    return meshes_by_material
+
+
+def cache_misses(indices, cache_size=CACHE_SIZE):
+    """Misses of a FIFO post-transform vertex cache drawing indices in order"""
+    inserted = {}
+    time = 0
+    for v in indices:
+        t = inserted.get(v)
+        if t is None or time - t >= cache_size:
+            inserted[v] = time
+            time += 1
+    return time
+
+
+def _tipsify(indices, vertex_count, cache_size):
+    """Triangle order of Tipsify (Sander, Nehab and Barczak, "Fast Triangle
+    Reordering for Vertex Locality and Reduced Overdraw", 2007), and the
+    positions in it where the fanning vertex had fallen out of the cache.
+
+    Each step emits the remaining triangles around one vertex, then moves
+    to the neighbor that will still be cached after its own triangles are
+    emitted, preferring the oldest; dead ends fall back to recently used
+    vertices, then to the next vertex with triangles left.
+    """
+    tri_count = len(indices) // 3
+    live = [0] * vertex_count
+    for v in indices:
+        live[v] += 1
+    offsets = [0] * (vertex_count + 1)
+    for v in range(vertex_count):
+        offsets[v + 1] = offsets[v] + live[v]
+    fill = offsets[:-1]
+    adjacency = [0] * len(indices)
+    for i, v in enumerate(indices):
+        adjacency[fill[v]] = i // 3
+        fill[v] += 1
+
+    cache_time = [0] * vertex_count
+    time = cache_size + 1
+    emitted = bytearray(tri_count)
+    dead_end = []
+    order = []
+    boundaries = []
+    cursor = 0
+    fanning = 0 if tri_count else -1
+
+    while fanning >= 0:
+        candidates = []
+        for t in adjacency[offsets[fanning]:offsets[fanning + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = 1
+            order.append(t)
+            for v in indices[3 * t:3 * t + 3]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if time - cache_time[v] > cache_size:
+                    cache_time[v] = time
+                    time += 1
+
+        fanning = -1
+        best = -1
+        for v in candidates:
+            if live[v] > 0:
+                age = time - cache_time[v]
+                priority = age if age + 2 * live[v] <= cache_size else 0
+                if priority > best:
+                    best = priority
+                    fanning = v
+        while fanning < 0 and dead_end:
+            v = dead_end.pop()
+            if live[v] > 0:
+                fanning = v
+        while fanning < 0 and cursor < vertex_count:
+            if live[cursor] > 0:
+                fanning = cursor
+            cursor += 1
+        if fanning >= 0 and time - cache_time[fanning] > cache_size:
+            boundaries.append(len(order))
+    return order, boundaries
+
+
+def _split_clusters(indices, order, boundaries, cache_size, threshold):
+    """Cut the triangle order into clusters at boundaries, and inside them
+    wherever the cluster so far has an ACMR (on a cold cache) of at most
+    threshold. Returns the (start, end) of each cluster in order."""
+    clusters = []
+    hard = set(boundaries)
+    inserted = {}
+    time = 0
+    start = 0
+    misses = 0
+    for i, t in enumerate(order):
+        if i > start and i in hard:
+            clusters.append((start, i))
+            start, misses, time = i, 0, time + cache_size
+        for v in indices[3 * t:3 * t + 3]:
+            stamp = inserted.get(v)
+            if stamp is None or time - stamp >= cache_size:
+                inserted[v] = time
+                time += 1
+                misses += 1
+        if misses <= threshold * (i + 1 - start):
+            clusters.append((start, i + 1))
+            start, misses, time = i + 1, 0, time + cache_size
+    if start < len(order):
+        clusters.append((start, len(order)))
+    return clusters
+
+
+def _sort_clusters(indices, order, clusters, positions, normals):
+    """Triangle order with the clusters sorted for less overdraw from any
+    viewpoint: by how far each cluster lies out from the center of the mesh
+    along its average normal, outermost first (Sander et al.)"""
+    keys = []
+    total_area = 0.0
+    center = [0.0, 0.0, 0.0]
+    sums = []
+    for start, end in clusters:
+        area_sum = 0.0
+        c = [0.0, 0.0, 0.0]
+        n = [0.0, 0.0, 0.0]
+        for t in order[start:end]:
+            a, b, d = indices[3 * t:3 * t + 3]
+            pa, pb, pd = positions[3 * a:3 * a + 3], positions[3 * b:3 * b + 3], positions[3 * d:3 * d + 3]
+            e1 = [pb[k] - pa[k] for k in range(3)]
+            e2 = [pd[k] - pa[k] for k in range(3)]
+            cross = (e1[1] * e2[2] - e1[2] * e2[1], e1[2] * e2[0] - e1[0] * e2[2], e1[0] * e2[1] - e1[1] * e2[0])
+            area = 0.5 * (cross[0] * cross[0] + cross[1] * cross[1] + cross[2] * cross[2]) ** 0.5
+            area_sum += area
+            for k in range(3):
+                c[k] += area * (pa[k] + pb[k] + pd[k]) / 3.0
+                # Shading normals rather than the winding, whichever way the renderer culls
+                n[k] += area * (normals[3 * a + k] + normals[3 * b + k] + normals[3 * d + k])
+        sums.append((c, n, area_sum))
+        total_area += area_sum
+        for k in range(3):
+            center[k] += c[k]
+    if total_area > 0.0:
+        center = [x / total_area for x in center]
+    for c, n, area_sum in sums:
+        length = (n[0] * n[0] + n[1] * n[1] + n[2] * n[2]) ** 0.5
+        if area_sum > 0.0 and length > 0.0:
+            keys.append(sum((c[k] / area_sum - center[k]) * n[k] for k in range(3)) / length)
+        else:
+            keys.append(0.0)
+
+    sorted_order = []
+    for i in sorted(range(len(clusters)), key=lambda i: -keys[i]):
+        start, end = clusters[i]
+        sorted_order.extend(order[start:end])
+    return sorted_order
+
+
+def optimize_indices(indices, vertex_count, positions, normals, cache_size=CACHE_SIZE, overdraw_threshold=OVERDRAW_THRESHOLD):
+    """Reorder an indexed triangle list for the GPU.
+
+    Triangles are put in Tipsify order for the post-transform vertex cache,
+    cut into clusters and the clusters sorted to reduce overdraw (clusters
+    are cut where the local ACMR reaches overdraw_threshold times that of
+    the Tipsify order: higher values give more, smaller clusters at some
+    cache cost; 0 keeps the Tipsify order). Vertices are then renumbered
+    in order of first use for fetch locality. positions and normals are
+    flat x, y, z lists. Returns the new indices and, for each new vertex,
+    the old one it comes from.
+    """
+    order, boundaries = _tipsify(indices, vertex_count, cache_size)
+    if overdraw_threshold > 0 and order:
+        acmr = cache_misses([v for t in order for v in indices[3 * t:3 * t + 3]], cache_size) / len(order)
+        clusters = _split_clusters(indices, order, boundaries, cache_size, overdraw_threshold * acmr)
+        order = _sort_clusters(indices, order, clusters, positions, normals)
+
+    remap = [-1] * vertex_count
+    vertex_order = []
+    new_indices = []
+    for t in order:
+        for v in indices[3 * t:3 * t + 3]:
+            if remap[v] < 0:
+                remap[v] = len(vertex_order)
+                vertex_order.append(v)
+            new_indices.append(remap[v])
+    vertex_order.extend(v for v in range(vertex_count) if remap[v] < 0)
+    return new_indices, vertex_order
+
+
+def optimize_meshes(meshes_by_material, cache_size=CACHE_SIZE, overdraw_threshold=OVERDRAW_THRESHOLD):
+    """optimize_indices every mesh from build_meshes in place. Returns the
+    cache misses before and after, the triangle and the vertex counts."""
+    stats = [0, 0, 0, 0]
+    for mesh in meshes_by_material.values():
+        vertices = mesh["vertices"]
+        indices = mesh["indices"]
+        positions = [x for v in vertices for x in v["pos"]]
+        normals = [x for v in vertices for x in v["normal"]]
+        new_indices, vertex_order = optimize_indices(indices, len(vertices), positions, normals,
+                                                     cache_size, overdraw_threshold)
+        stats[0] += cache_misses(indices, cache_size)
+        stats[1] += cache_misses(new_indices, cache_size)
+        stats[2] += len(indices) // 3
+        stats[3] += len(vertices)
+        mesh["vertices"] = [vertices[v] for v in vertex_order]
+        mesh["indices"] = new_indices
+    return stats
+
+
+def print_cache_report(stats, cache_size):
+    """Print ACMR (misses per triangle) and ATVR (misses per vertex) before and after"""
+    before, after, triangles, vertices = stats
+    if triangles and vertices:
+        print(f"  Vertex cache (FIFO {cache_size}): ACMR {before / triangles:.3f} -> {after / triangles:.3f}, "
+              f"ATVR {before / vertices:.3f} -> {after / vertices:.3f}")
+
+
+def compute_tangents(positions, normals, uvs, indices):
+    """Per-vertex tangents of an indexed triangle list, as an (n, 3) array.
+
+    The tangent of each triangle (the direction of increasing u) is added
+    to its three vertices unnormalized, so triangles weigh by their size;
+    triangles with degenerate uvs are skipped. Each sum is then made
+    orthogonal to the vertex normal (Gram-Schmidt) and normalized. Vertices
+    left without a tangent get the x (or y) axis projected onto the plane
+    of the normal.
+    """
+    p = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    n = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+    uv = np.asarray(uvs, dtype=np.float64).reshape(-1, 2)
+    tri = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    count = len(p)
+
+    e1 = p[tri[:, 1]] - p[tri[:, 0]]
+    e2 = p[tri[:, 2]] - p[tri[:, 0]]
+    d1 = uv[tri[:, 1]] - uv[tri[:, 0]]
+    d2 = uv[tri[:, 2]] - uv[tri[:, 0]]
+    det = d1[:, 0] * d2[:, 1] - d2[:, 0] * d1[:, 1]
+    valid = np.abs(det) > 1e-12
+    r = np.where(valid, 1.0 / np.where(valid, det, 1.0), 0.0)
+    face = (e1 * d2[:, 1:2] - e2 * d1[:, 1:2]) * r[:, None]
+
+    tangents = np.zeros((count, 3))
+    for corner in range(3):
+        for axis in range(3):
+            tangents[:, axis] += np.bincount(tri[:, corner], weights=face[:, axis], minlength=count)
+
+    tangents -= n * np.sum(n * tangents, axis=1, keepdims=True)
+    length = np.linalg.norm(tangents, axis=1)
+    fallback = np.where(np.abs(n[:, 0:1]) < 0.9, [[1.0, 0.0, 0.0]], [[0.0, 1.0, 0.0]])
+    fallback -= n * np.sum(n * fallback, axis=1, keepdims=True)
+    fallback /= np.linalg.norm(fallback, axis=1, keepdims=True)
+    ok = length > 1e-10
+    return np.where(ok[:, None], tangents / np.where(ok, length, 1.0)[:, None], fallback)
+
+
+def add_tangents(meshes_by_material):
+    """Store the tangent of every vertex of meshes from build_meshes in mesh["tangents"]"""
+    for mesh in meshes_by_material.values():
+        vertices = mesh["vertices"]
+        tangents = compute_tangents([v["pos"] for v in vertices], [v["normal"] for v in vertices],
+                                    [v["uv"] for v in vertices], mesh["indices"])
+        mesh["tangents"] = tangents.tolist()
+
+
+def _vertex_floats(mesh):
+    """Interleaved float32 vertex data in VERTEX_LAYOUT (or TANGENT_LAYOUT) order"""
+    floats = array.array("f")
+    tangents = mesh.get("tangents")
+    for i, v in enumerate(mesh["vertices"]):
+        floats.extend(v["pos"])
+        floats.extend(v["normal"])
+        floats.extend(v["uv"])
+        if tangents:
+            floats.extend(tangents[i])
+    return floats
+
+
+def _index_array(indices, vertex_count, index_format):
+    """Indices as array('H') or array('I') (4-byte) per index_format"""
+    if index_format == "auto":
+        index_format = "u16" if vertex_count <= 0x10000 else "u32"
+    if index_format == "u16":
+        if vertex_count > 0x10000:
+            raise ValueError(f"{vertex_count} vertices do not fit 16-bit indices")
+        return array.array("H", indices)
+    typecode = "I" if array.array("I").itemsize == 4 else "L"
+    return array.array(typecode, indices)
+
+
+def _align(n, alignment=16):
+    return (n + alignment - 1) // alignment * alignment
+
+
+def _mesh_header(descs, layout=VERTEX_LAYOUT):
+    """Container header and mesh descriptors, and the offset of the first blob.
+
+    descs are (name, vertex_count, index_count, index_size, vertex_offset,
+    vertex_size, index_offset, index_bytes) with the blob offsets relative
+    to the first blob.
+    """
+    stride = sum(components for _, components in layout) * 4
+    attrs = []
+    offset = 0
+    for semantic, components in layout:
+        attrs.append(struct.pack("<BBBxI", semantic, FORMAT_FLOAT32, components, offset))
+        offset += components * 4
+
+    desc_size = 16
+    for desc in descs:
+        desc_size += 4 + _align(len(desc[0]), 4) + 20 + len(attrs) * 8 + 32
+    blob_base = _align(desc_size)
+
+    header = [struct.pack("<4sIII", MESH_MAGIC, MESH_VERSION, len(descs), 0)]
+    for name, vertex_count, index_count, index_size, vertex_offset, vertex_size, index_offset, index_bytes in descs:
+        header.append(struct.pack("<I", len(name)))
+        header.append(name + b"\0" * (_align(len(name), 4) - len(name)))
+        header.append(struct.pack("<IIIII", stride, vertex_count, index_count, index_size, len(attrs)))
+        header.extend(attrs)
+        header.append(struct.pack("<QQQQ", blob_base + vertex_offset, vertex_size, blob_base + index_offset, index_bytes))
+    header = b"".join(header)
+    return header + b"\0" * (blob_base - len(header)), blob_base
+
+
+def write_mesh_file(meshes_by_material, output_path, index_format="u32"):
+    """Write the meshes to a binary container (layout in the module docstring)"""
+    descs = []
+    blobs = []
+    blob_offset = 0
+    for mat_name, mesh in meshes_by_material.items():
+        name = mat_name.replace("-", "_").encode("utf-8")
+        vertices = _vertex_floats(mesh)
+        indices = _index_array(mesh["indices"], len(mesh["vertices"]), index_format)
+        if sys.byteorder != "little":
+            vertices.byteswap()
+            indices.byteswap()
+        vertex_bytes = vertices.tobytes()
+        index_bytes = indices.tobytes()
+        vertex_offset = blob_offset
+        index_offset = _align(vertex_offset + len(vertex_bytes))
+        blob_offset = _align(index_offset + len(index_bytes))
+        descs.append((name, len(mesh["vertices"]), len(indices), indices.itemsize,
+                      vertex_offset, len(vertex_bytes), index_offset, len(index_bytes)))
+        blobs.append((vertex_offset, vertex_bytes))
+        blobs.append((index_offset, index_bytes))
+
+    tangents = any("tangents" in mesh for mesh in meshes_by_material.values())
+    header, blob_base = _mesh_header(descs, TANGENT_LAYOUT if tangents else VERTEX_LAYOUT)
+    with open(output_path, "wb") as f:
+        f.write(header)
+        for offset, data in blobs:
+            f.write(b"\0" * (blob_base + offset - f.tell()))
+            f.write(data)
+
+
+class MeshStreamWriter:
+    """Builds material meshes from the polygons of a StreamingEggParser and
+    writes each one as soon as it is complete, so only the meshes being
+    built are held in memory.
+
+    A mesh is complete when one more polygon would take it past
+    max_vertices (the material continues in a new mesh named
+    "material.1", "material.2", ...) or when close() is called at the end
+    of the input. Vertex and index blobs go to the spool file as they are
+    written; write_file() puts the container together from it. Welding
+    follows build_meshes, on the float32 values of the vertices. With
+    optimize each mesh goes through optimize_indices when written (its
+    cache misses add up in cache_stats, as from optimize_meshes), then with
+    tangents it gets them from compute_tangents.
+    """
+
+    def __init__(self, spool, weld=True, weld_epsilon=0.0, index_format="u32", max_vertices=0x10000, tangents=False,
+                 optimize=False, cache_size=CACHE_SIZE, overdraw_threshold=OVERDRAW_THRESHOLD):
+        self.spool = spool
+        self.tangents = tangents
+        self.optimize = optimize
+        self.cache_size = cache_size
+        self.overdraw_threshold = overdraw_threshold
+        self.cache_stats = [0, 0, 0, 0]
+        self.weld = weld
+        self.weld_epsilon = weld_epsilon
+        self.index_format = index_format
+        self.max_vertices = max_vertices
+        self.meshes = {}  # name -> metadata of each written mesh, for generate_lua
+        self._descs = []
+        self._building = {}
+        self._parts = {}
+
+    def add_polygon(self, polygon, pool):
+        mat_name = polygon["material_ref"] or "default"
+        refs = [vi for vi in polygon["vertex_refs"] if vi < len(pool) and pool.present[vi]]
+        mesh = self._building.get(mat_name)
+        if mesh is None:
+            mesh = self._start(mat_name)
+        elif mesh["vertex_count"] + len(refs) > self.max_vertices and mesh["vertex_count"]:
+            self._write(mat_name)
+            mesh = self._start(mat_name)
+
+        if not mesh["textures"] and polygon["texture_refs"]:
+            mesh["textures"] = polygon["texture_refs"]
+
+        vertices = mesh["vertices"]
+        weld_map = mesh["weld_map"]
+        epsilon = self.weld_epsilon
+        corners = []
+        for vi in refs:
+            values = pool.values(vi)
+            if self.weld:
+                key = tuple(round(x / epsilon) for x in values) if epsilon > 0 else values.tobytes()
+                idx = weld_map.get(key)
+                if idx is None:
+                    idx = mesh["vertex_count"]
+                    weld_map[key] = idx
+                    vertices.extend(values)
+                    mesh["vertex_count"] += 1
+            else:
+                idx = mesh["vertex_count"]
+                vertices.extend(values)
+                mesh["vertex_count"] += 1
+            corners.append(idx)
+        mesh["corners"] += len(corners)
+
+        indices = mesh["indices"]
+        for i in range(1, len(corners) - 1):
+            a, b, c = corners[0], corners[i], corners[i + 1]
+            if self.weld and (a == b or b == c or a == c):
+                continue
+            indices.extend((a, b, c))
+
+    def close(self):
+        """Write the meshes still being built"""
+        for mat_name in list(self._building):
+            self._write(mat_name)
+
+    def write_file(self, output_path):
+        """Write the container: header, then the spooled blobs"""
+        header, _ = _mesh_header(self._descs, TANGENT_LAYOUT if self.tangents else VERTEX_LAYOUT)
+        self.spool.flush()
+        self.spool.seek(0)
+        with open(output_path, "wb") as f:
+            f.write(header)
+            shutil.copyfileobj(self.spool, f)
+
+    def _start(self, mat_name):
+        mesh = {
+            "vertices": array.array("f"),
+            "indices": array.array("I" if array.array("I").itemsize == 4 else "L"),
+            "vertex_count": 0,
+            "textures": [],
+            "corners": 0,
+            "weld_map": {},
+        }
+        self._building[mat_name] = mesh
+        return mesh
+
+    def _write(self, mat_name):
+        mesh = self._building.pop(mat_name)
+        part = self._parts.get(mat_name, 0)
+        self._parts[mat_name] = part + 1
+        name = mat_name if part == 0 else f"{mat_name}.{part}"
+
+        vertices = mesh["vertices"]
+        indices = mesh["indices"]
+        if self.optimize:
+            positions = [x for o in range(0, len(vertices), POOL_FLOATS) for x in vertices[o:o + 3]]
+            normals = [x for o in range(0, len(vertices), POOL_FLOATS) for x in vertices[o + 3:o + 6]]
+            new_indices, vertex_order = optimize_indices(indices, mesh["vertex_count"], positions, normals,
+                                                         self.cache_size, self.overdraw_threshold)
+            self.cache_stats[0] += cache_misses(indices, self.cache_size)
+            self.cache_stats[1] += cache_misses(new_indices, self.cache_size)
+            self.cache_stats[2] += len(indices) // 3
+            self.cache_stats[3] += mesh["vertex_count"]
+            reordered = array.array("f")
+            for v in vertex_order:
+                reordered.extend(vertices[v * POOL_FLOATS:(v + 1) * POOL_FLOATS])
+            vertices, indices = reordered, new_indices
+        if self.tangents:
+            floats = np.frombuffer(vertices, dtype=np.float32).reshape(-1, POOL_FLOATS)
+            tangents = compute_tangents(floats[:, 0:3], floats[:, 3:6], floats[:, 6:8], indices)
+            vertices = array.array("f", np.hstack([floats, tangents.astype(np.float32)]).tobytes())
+        indices = _index_array(indices, mesh["vertex_count"], self.index_format)
+        if sys.byteorder != "little":
+            vertices.byteswap()
+            indices.byteswap()
+        vertex_offset = _align(self.spool.tell())
+        self.spool.write(b"\0" * (vertex_offset - self.spool.tell()))
+        vertices.tofile(self.spool)
+        index_offset = _align(self.spool.tell())
+        self.spool.write(b"\0" * (index_offset - self.spool.tell()))
+        indices.tofile(self.spool)
+        self._descs.append((name.replace("-", "_").encode("utf-8"), mesh["vertex_count"], len(indices), indices.itemsize,
+                            vertex_offset, len(vertices) * 4, index_offset, len(indices) * indices.itemsize))
+        self.meshes[name] = {
+            "material": mat_name,
+            "textures": mesh["textures"],
+            "vertex_count": mesh["vertex_count"],
+            "index_count": len(indices),
+            "corners": mesh["corners"],
+        }
 
 
-def generate_lua(parser, output_path):
-    """Generate Lua module from parsed egg data"""
+def generate_lua(parser, meshes_by_material, output_path, mesh_file=None, tangents=False):
+    """Generate Lua module from parsed egg data and its meshes. With
+    mesh_file the geometry is expected in that binary container and only
+    metadata is written. tangents marks vertices that carry add_tangents
+    tangents."""
 
     lines = []
     lines.append("-- Generated by egg2lua.py")
@@ -316,36 +1080,15 @@ def generate_lua(parser, output_path):
     lines.append("}")
     lines.append("")
 
-    # Build meshes by material
-    meshes_by_material = {}
-
-    for group in parser.groups:
-        for polygon in group["polygons"]:
-            mat_name = polygon["material_ref"] or "default"
-            if mat_name not in meshes_by_material:
-                meshes_by_material[mat_name] = {
-                    "vertices": [],
-                    "indices": [],
-                    "textures": [],
-                }
-            mesh = meshes_by_material[mat_name]
-
-            pool_name = list(parser.vertex_pools.keys())[0] if parser.vertex_pools else None
-            if not pool_name:
-                continue
-            pool = parser.vertex_pools[pool_name]
-
-            if not mesh["textures"] and polygon["texture_refs"]:
-                mesh["textures"] = polygon["texture_refs"]
+    if tangents:
+        lines.append("-- Vertices end with their tangent (tx, ty, tz)")
+        lines.append("M.tangents = true")
+        lines.append("")
 
-            base_idx = len(mesh["vertices"])
-            for vi in polygon["vertex_refs"]:
-                if vi < len(pool) and pool[vi]:
-                    mesh["vertices"].append(pool[vi])
-
-            n = len(polygon["vertex_refs"])
-            for i in range(1, n - 1):
-                mesh["indices"].extend([base_idx, base_idx + i, base_idx + i + 1])
+    if mesh_file:
+        lines.append("-- Mesh geometry (load with lib/mesh.lua)")
+        lines.append(f'M.mesh_file = "{mesh_file}"')
+        lines.append("")
 
     # Write meshes
     lines.append("-- Mesh data (by material)")
@@ -357,24 +1100,36 @@ def generate_lua(parser, output_path):
         tex_refs = ", ".join(f'"{t.replace("-", "_")}"' for t in mesh["textures"])
         lines.append(f"    textures = {{{tex_refs}}},")
 
-        lines.append("    -- Format: x, y, z, nx, ny, nz, u, v")
-        lines.append("    vertices = {")
-        for v in mesh["vertices"]:
-            p = v["pos"]
-            n = v["normal"]
-            uv = v["uv"]
-            lines.append(f"      {p[0]}, {p[1]}, {p[2]}, {n[0]}, {n[1]}, {n[2]}, {uv[0]}, {uv[1]},")
-        lines.append("    },")
-
-        lines.append("    indices = {")
-        for i in range(0, len(mesh["indices"]), 12):
-            chunk = mesh["indices"][i : i + 12]
-            lines.append("      " + ", ".join(str(x) for x in chunk) + ",")
-        lines.append("    },")
-
-        lines.append(f'    material = "{safe_name}",')
-        lines.append(f"    vertex_count = {len(mesh['vertices'])},")
-        lines.append(f"    index_count = {len(mesh['indices'])},")
+        if not mesh_file:
+            if tangents:
+                lines.append("    -- Format: x, y, z, nx, ny, nz, u, v, tx, ty, tz")
+            else:
+                lines.append("    -- Format: x, y, z, nx, ny, nz, u, v")
+            lines.append("    vertices = {")
+            for i, v in enumerate(mesh["vertices"]):
+                p = v["pos"]
+                n = v["normal"]
+                uv = v["uv"]
+                if tangents:
+                    t = mesh["tangents"][i]
+                    lines.append(f"      {p[0]}, {p[1]}, {p[2]}, {n[0]}, {n[1]}, {n[2]}, {uv[0]}, {uv[1]}, {t[0]}, {t[1]}, {t[2]},")
+                else:
+                    lines.append(f"      {p[0]}, {p[1]}, {p[2]}, {n[0]}, {n[1]}, {n[2]}, {uv[0]}, {uv[1]},")
+            lines.append("    },")
+
+            lines.append("    indices = {")
+            for i in range(0, len(mesh["indices"]), 12):
+                chunk = mesh["indices"][i : i + 12]
+                lines.append("      " + ", ".join(str(x) for x in chunk) + ",")
+            lines.append("    },")
+
+        # Streamed meshes only keep their counts, and may be one of several of a material
+        material = mesh.get("material", mat_name).replace("-", "_")
+        vertex_count = mesh["vertex_count"] if "vertex_count" in mesh else len(mesh["vertices"])
+        index_count = mesh["index_count"] if "index_count" in mesh else len(mesh["indices"])
+        lines.append(f'    material = "{material}",')
+        lines.append(f"    vertex_count = {vertex_count},")
+        lines.append(f"    index_count = {index_count},")
         lines.append("  },")
     lines.append("}")
     lines.append("")
@@ -386,16 +1141,86 @@ def generate_lua(parser, output_path):
         f.write("\n".join(lines))
 
 
-def main():
-    if len(sys.argv) < 3:
-        print("Usage: python egg2lua.py input.egg output.lua")
-        sys.exit(1)
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    """Yield the text of a file chunk_size characters at a time"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def convert_streaming(args, output_path, mesh_path):
+    """--stream: parse chunk by chunk and spool each mesh as it is completed"""
+    spool_dir = os.path.dirname(os.path.abspath(mesh_path))
+    with tempfile.TemporaryFile(dir=spool_dir) as spool:
+        writer = MeshStreamWriter(spool, weld=not args.no_weld, weld_epsilon=args.weld_epsilon,
+                                  index_format=args.index_format, max_vertices=args.max_mesh_vertices,
+                                  tangents=args.tangents, optimize=args.optimize, cache_size=args.cache_size,
+                                  overdraw_threshold=args.overdraw_threshold)
+        parser = StreamingEggParser(writer.add_polygon)
+        for chunk in read_chunks(args.input):
+            parser.feed(chunk)
+        parser.close()
+        writer.close()
+
+        print(f"  Textures: {len(parser.textures)}")
+        print(f"  Materials: {len(parser.materials)}")
+        print(f"  Vertex pools: {len(parser.vertex_pools)}")
+        print(f"  Groups: {len(parser.groups)}")
+        print(f"  Total polygons: {parser.polygon_count}")
+        corners = sum(m["corners"] for m in writer.meshes.values())
+        vertices = sum(m["vertex_count"] for m in writer.meshes.values())
+        print(f"  Vertices: {vertices} ({corners} polygon corners) in {len(writer.meshes)} meshes")
+        if args.optimize:
+            print_cache_report(writer.cache_stats, args.cache_size)
+
+        print(f"Generating {output_path}...")
+        generate_lua(parser, writer.meshes, output_path, os.path.basename(mesh_path), args.tangents)
+        print(f"Writing {mesh_path}...")
+        writer.write_file(mesh_path)
 
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Convert Panda3D .egg files to Lua table format")
+    arg_parser.add_argument("input", help="input .egg file")
+    arg_parser.add_argument("output", help="output .lua module")
+    arg_parser.add_argument("--binary", action="store_true",
+                            help="write the geometry to a binary container next to the output (output.mesh)")
+    arg_parser.add_argument("--index-format", choices=("u16", "u32", "auto"), default="u32",
+                            help="index size of the binary container (auto: u16 when the mesh fits)")
+    arg_parser.add_argument("--no-weld", action="store_true",
+                            help="emit every polygon corner as its own vertex instead of sharing identical ones")
+    arg_parser.add_argument("--weld-epsilon", type=float, default=0.0,
+                            help="weld vertices whose attributes match after snapping to this grid (0: exact)")
+    arg_parser.add_argument("--stream", action="store_true",
+                            help="convert in bounded memory: read the input in chunks, keep vertex pools as float32 "
+                                 "arrays and write each mesh as soon as it is complete (implies --binary)")
+    arg_parser.add_argument("--max-mesh-vertices", type=int, default=0x10000,
+                            help="with --stream, continue a material in a new mesh past this many vertices")
+    arg_parser.add_argument("--tangents", action="store_true",
+                            help="compute per-vertex tangents (needs NumPy) and append them to the vertices")
+    arg_parser.add_argument("--optimize", action="store_true",
+                            help="reorder triangles for the vertex cache and overdraw, and vertices for fetch locality")
+    arg_parser.add_argument("--cache-size", type=int, default=CACHE_SIZE,
+                            help="post-transform vertex cache entries to optimize and report for")
+    arg_parser.add_argument("--overdraw-threshold", type=float, default=OVERDRAW_THRESHOLD,
+                            help="ACMR allowed to overdraw clusters, relative to the cache order (0: no overdraw pass)")
+    args = arg_parser.parse_args()
+    if args.tangents and np is None:
+        arg_parser.error("--tangents needs NumPy")
+
+    input_path = args.input
+    output_path = args.output
 
     print(f"Parsing {input_path}...")
 
+    if args.stream:
+        convert_streaming(args, output_path, os.path.splitext(output_path)[0] + ".mesh")
+        print("Done!")
+        return
+
     with open(input_path, "r", encoding="utf-8", errors="replace") as f:
         content = f.read()
 
@@ -410,8 +1235,21 @@ def main():
     total_polys = sum(len(g["polygons"]) for g in parser.groups)
     print(f"  Total polygons: {total_polys}")
 
+    meshes = build_meshes(parser, weld=not args.no_weld, weld_epsilon=args.weld_epsilon)
+    corners = sum(m["corners"] for m in meshes.values())
+    vertices = sum(len(m["vertices"]) for m in meshes.values())
+    print(f"  Vertices: {vertices} ({corners} polygon corners)")
+    if args.optimize:
+        print_cache_report(optimize_meshes(meshes, args.cache_size, args.overdraw_threshold), args.cache_size)
+    if args.tangents:
+        add_tangents(meshes)
+
     print(f"Generating {output_path}...")
-    generate_lua(parser, output_path)
+    mesh_path = os.path.splitext(output_path)[0] + ".mesh" if args.binary else None
+    generate_lua(parser, meshes, output_path, os.path.basename(mesh_path) if mesh_path else None, args.tangents)
+    if mesh_path:
+        print(f"Writing {mesh_path}...")
+        write_mesh_file(meshes, mesh_path, args.index_format)
     print("Done!")
 
 
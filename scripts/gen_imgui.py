@@ -111,13 +111,13 @@ Output parameters:
 import sys
 import os
 import json
-from datetime import datetime
 
 # Add scripts directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 import gen_ir_imgui as ir
 import gen_util_imgui as util
+import gen_output
 
 # Functions to skip (complex callbacks, internal, etc.)
 SKIP_FUNCTIONS = {
@@ -366,7 +366,7 @@ class ImGuiBindingGenerator:
         # Check if this is a float array (e.g., ColorEdit3's col parameter)
         array_size = get_float_array_size(func_name, name, t)
         if array_size > 0:
-            lines.append(f'    luaL_checktype(L, {lua_idx}, LUA_TTABLE);')
+            lines.append(f'    MANE3D_CHECKTABLE(L, {lua_idx});')
             lines.append(f'    float {name}[{array_size}];')
             for i in range(array_size):
                 lines.append(f'    lua_rawgeti(L, {lua_idx}, {i+1}); {name}[{i}] = (float)lua_tonumber(L, -1); lua_pop(L, 1);')
@@ -389,25 +389,25 @@ class ImGuiBindingGenerator:
             return lines
 
         if is_out and t == 'int *':
-            lines.append(f'    int {name}_val = (int)luaL_checkinteger(L, {lua_idx});')
+            lines.append(f'    int {name}_val = (int)MANE3D_CHECKINTEGER(L, {lua_idx});')
             lines.append(f'    int* {name} = &{name}_val;')
             out_params.append((name, 'int'))
             return lines
 
         if is_out and t == 'float *':
-            lines.append(f'    float {name}_val = (float)luaL_checknumber(L, {lua_idx});')
+            lines.append(f'    float {name}_val = (float)MANE3D_CHECKNUMBER(L, {lua_idx});')
             lines.append(f'    float* {name} = &{name}_val;')
             out_params.append((name, 'float'))
             return lines
 
         if is_out and t == 'double *':
-            lines.append(f'    double {name}_val = luaL_checknumber(L, {lua_idx});')
+            lines.append(f'    double {name}_val = MANE3D_CHECKNUMBER(L, {lua_idx});')
             lines.append(f'    double* {name} = &{name}_val;')
             out_params.append((name, 'double'))
             return lines
 
         if is_out and t == 'unsigned int *':
-            lines.append(f'    unsigned int {name}_val = (unsigned int)luaL_checkinteger(L, {lua_idx});')
+            lines.append(f'    unsigned int {name}_val = (unsigned int)MANE3D_CHECKINTEGER(L, {lua_idx});')
             lines.append(f'    unsigned int* {name} = &{name}_val;')
             out_params.append((name, 'unsigned int'))
             return lines
@@ -415,9 +415,9 @@ class ImGuiBindingGenerator:
         # const char *
         if t == 'const char *':
             if has_default:
-                lines.append(f'    const char* {name} = luaL_optstring(L, {lua_idx}, nullptr);')
+                lines.append(f'    const char* {name} = MANE3D_OPTSTRING(L, {lua_idx}, nullptr);')
             else:
-                lines.append(f'    const char* {name} = luaL_checkstring(L, {lua_idx});')
+                lines.append(f'    const char* {name} = MANE3D_CHECKSTRING(L, {lua_idx});')
             return lines
 
         # bool
@@ -431,33 +431,33 @@ class ImGuiBindingGenerator:
         # int/ImGuiID/enums/flags (all ImGui* types are ints)
         if t in ('int', 'ImGuiID', 'ImU32', 'ImS32') or t.startswith('ImGui'):
             if has_default:
-                lines.append(f'    int {name} = (int)luaL_optinteger(L, {lua_idx}, 0);')
+                lines.append(f'    int {name} = (int)MANE3D_OPTINTEGER(L, {lua_idx}, 0);')
             else:
-                lines.append(f'    int {name} = (int)luaL_checkinteger(L, {lua_idx});')
+                lines.append(f'    int {name} = (int)MANE3D_CHECKINTEGER(L, {lua_idx});')
             return lines
 
         # unsigned int
         if t == 'unsigned int':
             if has_default:
-                lines.append(f'    unsigned int {name} = (unsigned int)luaL_optinteger(L, {lua_idx}, 0);')
+                lines.append(f'    unsigned int {name} = (unsigned int)MANE3D_OPTINTEGER(L, {lua_idx}, 0);')
             else:
-                lines.append(f'    unsigned int {name} = (unsigned int)luaL_checkinteger(L, {lua_idx});')
+                lines.append(f'    unsigned int {name} = (unsigned int)MANE3D_CHECKINTEGER(L, {lua_idx});')
             return lines
 
         # float
         if t == 'float':
             if has_default:
-                lines.append(f'    float {name} = (float)luaL_optnumber(L, {lua_idx}, 0.0);')
+                lines.append(f'    float {name} = (float)MANE3D_OPTNUMBER(L, {lua_idx}, 0.0);')
             else:
-                lines.append(f'    float {name} = (float)luaL_checknumber(L, {lua_idx});')
+                lines.append(f'    float {name} = (float)MANE3D_CHECKNUMBER(L, {lua_idx});')
             return lines
 
         # double
         if t == 'double':
             if has_default:
-                lines.append(f'    double {name} = luaL_optnumber(L, {lua_idx}, 0.0);')
+                lines.append(f'    double {name} = MANE3D_OPTNUMBER(L, {lua_idx}, 0.0);')
             else:
-                lines.append(f'    double {name} = luaL_checknumber(L, {lua_idx});')
+                lines.append(f'    double {name} = MANE3D_CHECKNUMBER(L, {lua_idx});')
             return lines
 
         # ImVec2
@@ -469,10 +469,10 @@ class ImGuiBindingGenerator:
                 lines.append(f'        lua_rawgeti(L, {lua_idx}, 2); {name}.y = (float)lua_tonumber(L, -1); lua_pop(L, 1);')
                 lines.append(f'    }}')
             else:
-                lines.append(f'    luaL_checktype(L, {lua_idx}, LUA_TTABLE);')
+                lines.append(f'    MANE3D_CHECKTABLE(L, {lua_idx});')
                 lines.append(f'    ImVec2 {name};')
-                lines.append(f'    lua_rawgeti(L, {lua_idx}, 1); {name}.x = (float)luaL_checknumber(L, -1); lua_pop(L, 1);')
-                lines.append(f'    lua_rawgeti(L, {lua_idx}, 2); {name}.y = (float)luaL_checknumber(L, -1); lua_pop(L, 1);')
+                lines.append(f'    lua_rawgeti(L, {lua_idx}, 1); {name}.x = (float)MANE3D_CHECKNUMBER(L, -1); lua_pop(L, 1);')
+                lines.append(f'    lua_rawgeti(L, {lua_idx}, 2); {name}.y = (float)MANE3D_CHECKNUMBER(L, -1); lua_pop(L, 1);')
             return lines
 
         # ImVec4
@@ -486,32 +486,32 @@ class ImGuiBindingGenerator:
                 lines.append(f'        lua_rawgeti(L, {lua_idx}, 4); {name}.w = (float)lua_tonumber(L, -1); lua_pop(L, 1);')
                 lines.append(f'    }}')
             else:
-                lines.append(f'    luaL_checktype(L, {lua_idx}, LUA_TTABLE);')
+                lines.append(f'    MANE3D_CHECKTABLE(L, {lua_idx});')
                 lines.append(f'    ImVec4 {name};')
-                lines.append(f'    lua_rawgeti(L, {lua_idx}, 1); {name}.x = (float)luaL_checknumber(L, -1); lua_pop(L, 1);')
-                lines.append(f'    lua_rawgeti(L, {lua_idx}, 2); {name}.y = (float)luaL_checknumber(L, -1); lua_pop(L, 1);')
-                lines.append(f'    lua_rawgeti(L, {lua_idx}, 3); {name}.z = (float)luaL_checknumber(L, -1); lua_pop(L, 1);')
-                lines.append(f'    lua_rawgeti(L, {lua_idx}, 4); {name}.w = (float)luaL_checknumber(L, -1); lua_pop(L, 1);')
+                lines.append(f'    lua_rawgeti(L, {lua_idx}, 1); {name}.x = (float)MANE3D_CHECKNUMBER(L, -1); lua_pop(L, 1);')
+                lines.append(f'    lua_rawgeti(L, {lua_idx}, 2); {name}.y = (float)MANE3D_CHECKNUMBER(L, -1); lua_pop(L, 1);')
+                lines.append(f'    lua_rawgeti(L, {lua_idx}, 3); {name}.z = (float)MANE3D_CHECKNUMBER(L, -1); lua_pop(L, 1);')
+                lines.append(f'    lua_rawgeti(L, {lua_idx}, 4); {name}.w = (float)MANE3D_CHECKNUMBER(L, -1); lua_pop(L, 1);')
             return lines
 
         # float arrays (col[3], col[4], v[2], etc.)
         if t.startswith('float') and '[' in t:
             # Extract array size
             size = int(t.split('[')[1].split(']')[0])
-            lines.append(f'    luaL_checktype(L, {lua_idx}, LUA_TTABLE);')
+            lines.append(f'    MANE3D_CHECKTABLE(L, {lua_idx});')
             lines.append(f'    float {name}[{size}];')
             for i in range(size):
-                lines.append(f'    lua_rawgeti(L, {lua_idx}, {i+1}); {name}[{i}] = (float)luaL_checknumber(L, -1); lua_pop(L, 1);')
+                lines.append(f'    lua_rawgeti(L, {lua_idx}, {i+1}); {name}[{i}] = (float)MANE3D_CHECKNUMBER(L, -1); lua_pop(L, 1);')
             out_params.append((name, f'float[{size}]'))
             return lines
 
         # int arrays
         if t.startswith('int') and '[' in t:
             size = int(t.split('[')[1].split(']')[0])
-            lines.append(f'    luaL_checktype(L, {lua_idx}, LUA_TTABLE);')
+            lines.append(f'    MANE3D_CHECKTABLE(L, {lua_idx});')
             lines.append(f'    int {name}[{size}];')
             for i in range(size):
-                lines.append(f'    lua_rawgeti(L, {lua_idx}, {i+1}); {name}[{i}] = (int)luaL_checkinteger(L, -1); lua_pop(L, 1);')
+                lines.append(f'    lua_rawgeti(L, {lua_idx}, {i+1}); {name}[{i}] = (int)MANE3D_CHECKINTEGER(L, -1); lua_pop(L, 1);')
             out_params.append((name, f'int[{size}]'))
             return lines
 
@@ -531,12 +531,12 @@ class ImGuiBindingGenerator:
 
         # size_t
         if t == 'size_t':
-            lines.append(f'    size_t {name} = (size_t)luaL_checkinteger(L, {lua_idx});')
+            lines.append(f'    size_t {name} = (size_t)MANE3D_CHECKINTEGER(L, {lua_idx});')
             return lines
 
         # Default: try to pass as integer
         lines.append(f'    // TODO: Unsupported type {t}')
-        lines.append(f'    int {name} = (int)luaL_optinteger(L, {lua_idx}, 0);')
+        lines.append(f'    int {name} = (int)MANE3D_OPTINTEGER(L, {lua_idx}, 0);')
         return lines
 
     def gen_func(self, func):
@@ -645,7 +645,6 @@ class ImGuiBindingGenerator:
     def generate(self):
         """Generate the complete binding file."""
         self.emit('// Auto-generated ImGui Lua bindings')
-        self.emit(f'// Generated on {datetime.now().isoformat()}')
         self.emit('// Do not edit manually!')
         self.emit('')
         self.emit('#include "imgui.h"')
@@ -656,6 +655,9 @@ class ImGuiBindingGenerator:
         self.emit('#include "lualib.h"')
         self.emit('}')
         self.emit('')
+        # MANE3D_CHECK*/OPT* argument reads (MANE3D_UNCHECKED_BINDINGS drops the type checks)
+        self.emit('#include "mane3d_bindings.h"')
+        self.emit('')
 
         # Generate forward declarations
         self.emit('// Forward declarations')
@@ -855,14 +857,10 @@ def main():
     print(f"Found {len([d for d in ir_data['decls'] if d['kind'] in ('enum', 'consts')])} enums")
 
     print(f"Generating bindings to {output_path}...")
+    writer = gen_output.OutputWriter(root_dir, 'gen_imgui')
     gen = ImGuiBindingGenerator(ir_data)
     code = gen.generate()
-
-    # Ensure output directory exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-    with open(output_path, 'w') as f:
-        f.write(code)
+    writer.write(output_path, code)
 
     print(f"Generated {len(gen.out_lines)} lines of C++ bindings")
 
@@ -871,13 +869,10 @@ def main():
     print(f"Generating type definitions to {types_path}...")
     types_gen = LuaCATSGenerator(ir_data, gen)
     types_code = types_gen.generate()
-
-    os.makedirs(os.path.dirname(types_path), exist_ok=True)
-
-    with open(types_path, 'w') as f:
-        f.write(types_code)
+    writer.write(types_path, types_code)
 
     print(f"Generated {len(types_gen.out_lines)} lines of LuaCATS types")
+    writer.finish()
     print("Done!")
 
 if __name__ == '__main__':
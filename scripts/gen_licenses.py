@@ -6,6 +6,8 @@ import os
 import re
 import json
 
+import gen_output
+
 # Override auto-detected values (only when necessary)
 LIBRARY_INFO = {
     "glslang": {"type": "BSD-3-Clause/MIT/Apache-2.0"},  # Multi-license
@@ -161,7 +163,9 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE."""
     # Walk deps directory for LICENSE files
     deps_dir = os.path.join(root_dir, "deps")
     for dirpath, dirnames, filenames in os.walk(deps_dir):
-        for filename in filenames:
+        # Walk in a fixed order so the output does not depend on the file system
+        dirnames.sort()
+        for filename in sorted(filenames):
             if filename.startswith("LICENSE"):
                 filepath = os.path.join(dirpath, filename)
 
@@ -224,7 +228,7 @@ def split_string_literal(s, max_len=8000):
     chunks.append(s)
     return chunks
 
-def generate_c_source(licenses, output_path):
+def generate_c_source(licenses):
     """Generate C source file with license data."""
 
     lines = [
@@ -306,10 +310,7 @@ def generate_c_source(licenses, output_path):
         "}",
     ])
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(lines))
-        f.write('\n')
+    return '\n'.join(lines) + '\n'
 
 def main():
     import argparse
@@ -330,7 +331,9 @@ def main():
         print(f"  {lib['name']} ({lib['type']})")
 
     print(f"Generating {output}...")
-    generate_c_source(licenses, output)
+    writer = gen_output.OutputWriter(root, 'gen_licenses')
+    writer.write(output, generate_c_source(licenses))
+    writer.finish()
     print("Done.")
 
 if __name__ == '__main__':
@@ -4,7 +4,11 @@
 #   Generate Lua 5.5 C API bindings.
 #-------------------------------------------------------------------------------
 import argparse
-import os, shutil, sys
+import concurrent.futures, contextlib, io
+import hashlib, json, subprocess
+import os, shutil, sys, time
+
+import gen_output
 
 # Parse arguments first to get bindgen path
 parser = argparse.ArgumentParser(description='Generate Lua bindings for sokol')
@@ -14,6 +18,16 @@ parser.add_argument('--bindgen', default=os.path.join(root_dir, 'deps/sokol/bind
                     help='Path to sokol/bindgen directory')
 parser.add_argument('--sokol', default=os.path.join(root_dir, 'deps/sokol'),
                     help='Path to sokol directory (for headers)')
+parser.add_argument('--handles-as-integers', action='store_true',
+                    help='Marshal single-id handle structs (sg_buffer, sg_image, ...) as Lua integers')
+parser.add_argument('--ir-cache', default=os.path.join(root_dir, 'gen/ir_cache'),
+                    help='Directory caching the clang IR of unchanged headers')
+parser.add_argument('--no-ir-cache', action='store_true',
+                    help='Always run clang, ignoring and not updating the IR cache')
+parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                    help='Modules generated in parallel (1 = in this process)')
+parser.add_argument('--timings', action='store_true',
+                    help='Print the time spent in each generation phase per module')
 args = parser.parse_args()
 
 # Add CLANGPP directory to PATH for gen_ir.py (which uses clang)
@@ -28,10 +42,12 @@ import gen_ir
 import gen_util as util
 
 sokol_root = args.sokol
+handles_as_integers = args.handles_as_integers
 
 bindings_root = root_dir
 stubs_root = f'{bindings_root}/gen/stubs'
 module_root = f'{bindings_root}/gen/bindings'
+ir_cache_root = None if args.no_ir_cache else args.ir_cache
 
 module_names = {
     'slog_':    'log',
@@ -95,23 +111,47 @@ ignores = [
 # Note: saudio_setup is now supported (stream_cb trampoline implemented)
 callback_funcs = []
 
-struct_types = []
-enum_types = []
-out_lines = ''
-
-def reset_globals():
-    global struct_types
-    global enum_types
-    global out_lines
-    global consts_counter
-    struct_types = []
-    enum_types = []
-    out_lines = ''
-    consts_counter = 0
+class ModuleContext:
+    """Generation state of one module: the types it knows about and the C source emitted so far"""
+    def __init__(self):
+        self.struct_types = []          # in declaration order, for the metatable slots
+        self.local_struct_types = set()
+        self.type_kinds = {}            # type name -> 'struct' | 'handle' | 'enum'
+        self.struct_ptr_kinds = {}      # pointer spelling -> 'const' | 'mut' | '' (not a struct pointer)
+        self.out = []
+        self.consts_counter = 0
+        self.timings = {}               # phase name -> seconds
+        self.phase_stack = []
+
+    def source(self):
+        return '\n'.join(self.out) + '\n' if self.out else ''
+
+# Context of the module being generated; each worker process generates one module at a time
+ctx = ModuleContext()
+
+def begin_module():
+    """Start generating a module with a fresh context"""
+    global ctx
+    ctx = ModuleContext()
+    return ctx
+
+@contextlib.contextmanager
+def phase(name):
+    """Add the wall time of a generation phase to ctx.timings. Time spent in a
+    nested phase is only counted there, so the phases of a module add up."""
+    ctx.phase_stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = ctx.phase_stack.pop()
+        ctx.timings[name] = ctx.timings.get(name, 0.0) + elapsed - nested
+        if ctx.phase_stack:
+            ctx.phase_stack[-1] += elapsed
 
 def l(s):
-    global out_lines
-    out_lines += s + '\n'
+    ctx.out.append(s)
 
 def check_ignore(name):
     return name in ignores
@@ -156,6 +196,23 @@ def as_struct_metatable_name(type_name):
     parts = type_name.lower().split('_')
     return ''.join(part.capitalize() for part in parts if part != 't')
 
+def get_metatable_name(type_name):
+    """Registry name of a struct metatable, qualified by module (e.g. sokol.gfx.Desc)"""
+    module = module_names.get(get_type_prefix(type_name), 'sokol')
+    return f'sokol.{module}.{as_struct_metatable_name(type_name)}'
+
+def check_udata(type_name, idx):
+    """Expression checking that stack slot idx holds a struct (or view) of type_name"""
+    return f'({type_name}*)mane3d_checkstruct(L, {idx}, &g_{type_name}_mt, &g_{type_name}_view_mt, "{get_metatable_name(type_name)}")'
+
+def test_udata(type_name, idx):
+    """Expression returning the struct (or view) at stack slot idx, or NULL if it is not a type_name"""
+    return f'({type_name}*)mane3d_teststruct(L, {idx}, &g_{type_name}_mt, &g_{type_name}_view_mt)'
+
+def set_metatable(type_name):
+    """Statement setting the cached metatable of type_name on the value on top of the stack"""
+    return f'mane3d_setmetatable(L, &g_{type_name}_mt);'
+
 def is_prim_type(s):
     return s in ['int', 'bool', 'char', 'int8_t', 'uint8_t', 'int16_t', 'uint16_t',
                  'int32_t', 'uint32_t', 'int64_t', 'uint64_t', 'float', 'double',
@@ -170,26 +227,43 @@ def is_float_type(s):
     return s in ['float', 'double']
 
 def is_struct_type(s):
-    return s in struct_types
+    return ctx.type_kinds.get(s) == 'struct'
+
+def is_handle_decl(decl):
+    """Handle struct (a single integer 'id' field) marshalled as a plain Lua integer"""
+    if not handles_as_integers or decl['kind'] != 'struct':
+        return False
+    fields = decl['fields']
+    return len(fields) == 1 and fields[0].get('name') == 'id' and is_int_type(fields[0]['type'])
+
+def is_handle_type(s):
+    return ctx.type_kinds.get(s) == 'handle'
+
+def is_local_struct_type(s):
+    """Struct generated by the current module (dependency structs live in other modules)"""
+    return s in ctx.local_struct_types
 
 def is_enum_type(s):
-    return s in enum_types
+    return ctx.type_kinds.get(s) == 'enum'
+
+def normalize_ptr(s):
+    return s.replace(' *', '*').replace('* ', '*')
+
+def get_struct_ptr_kind(s):
+    """'const' for a const struct pointer, 'mut' for a struct pointer, '' otherwise.
+    pre_parse() registers the normalized spellings; other spellings are
+    normalized on first use and remembered."""
+    kind = ctx.struct_ptr_kinds.get(s)
+    if kind is None:
+        kind = ctx.struct_ptr_kinds.get(normalize_ptr(s), '')
+        ctx.struct_ptr_kinds[s] = kind
+    return kind
 
 def is_const_struct_ptr(s):
-    # Normalize spacing for comparison
-    normalized = s.replace(' *', '*').replace('* ', '*')
-    for struct_type in struct_types:
-        if normalized == f"const {struct_type}*":
-            return True
-    return False
+    return get_struct_ptr_kind(s) == 'const'
 
 def is_struct_ptr(s):
-    # Normalize spacing for comparison
-    normalized = s.replace(' *', '*').replace('* ', '*')
-    for struct_type in struct_types:
-        if normalized == f"{struct_type}*":
-            return True
-    return False
+    return get_struct_ptr_kind(s) == 'mut'
 
 def parse_func_ptr(field_type):
     """Parse a function pointer type and return (result_type, args_list)"""
@@ -212,9 +286,10 @@ def get_lua_push_code(type_str, var_name, prefix):
         return f'lua_pushnumber(L, (lua_Number){var_name});'
     elif util.is_string_ptr(type_str):
         return f'lua_pushstring(L, {var_name});'
+    elif is_handle_type(type_str):
+        return f'lua_pushinteger(L, (lua_Integer){var_name}.id);'
     elif is_struct_type(type_str):
-        struct_name = as_struct_metatable_name(type_str)
-        return f'{type_str}* ud = ({type_str}*)lua_newuserdatauv(L, sizeof({type_str}), 0);\n    *ud = {var_name};\n    luaL_setmetatable(L, "sokol.{struct_name}");'
+        return f'{type_str}* ud = ({type_str}*)lua_newuserdatauv(L, sizeof({type_str}), 1);\n    *ud = {var_name};\n    {set_metatable(type_str)}'
     elif is_enum_type(type_str):
         return f'lua_pushinteger(L, (lua_Integer){var_name});'
     elif util.is_void_ptr(type_str) or util.is_const_void_ptr(type_str):
@@ -227,18 +302,18 @@ def get_lua_to_code(type_str, arg_index, var_name, prefix):
     if type_str == 'bool':
         return f'bool {var_name} = lua_toboolean(L, {arg_index});'
     elif is_int_type(type_str):
-        return f'{type_str} {var_name} = ({type_str})luaL_checkinteger(L, {arg_index});'
+        return f'{type_str} {var_name} = ({type_str})MANE3D_CHECKINTEGER(L, {arg_index});'
     elif is_float_type(type_str):
-        return f'{type_str} {var_name} = ({type_str})luaL_checknumber(L, {arg_index});'
+        return f'{type_str} {var_name} = ({type_str})MANE3D_CHECKNUMBER(L, {arg_index});'
     elif util.is_string_ptr(type_str):
-        return f'const char* {var_name} = luaL_checkstring(L, {arg_index});'
+        return f'const char* {var_name} = MANE3D_CHECKSTRING(L, {arg_index});'
+    elif is_handle_type(type_str):
+        return f'{type_str} {var_name} = {{ (uint32_t)MANE3D_CHECKINTEGER(L, {arg_index}) }};'
     elif is_struct_type(type_str):
-        struct_name = as_struct_metatable_name(type_str)
-        return f'{type_str}* {var_name}_ptr = ({type_str}*)luaL_checkudata(L, {arg_index}, "sokol.{struct_name}");\n    {type_str} {var_name} = *{var_name}_ptr;'
+        return f'{type_str}* {var_name}_ptr = {check_udata(type_str, arg_index)};\n    {type_str} {var_name} = *{var_name}_ptr;'
     elif is_const_struct_ptr(type_str):
         inner_type = util.extract_ptr_type(type_str)
-        struct_name = as_struct_metatable_name(inner_type)
-        # Special case: const sg_range* can accept string
+        # Special case: const sg_range* can accept string or mane3d.buffer
         if inner_type == 'sg_range':
             return f'''sg_range {var_name}_storage;
     const sg_range* {var_name};
@@ -248,25 +323,29 @@ def get_lua_to_code(type_str, arg_index, var_name, prefix):
         {var_name}_storage.ptr = {var_name}_str;
         {var_name}_storage.size = {var_name}_len;
         {var_name} = &{var_name}_storage;
+    }} else if (({var_name}_storage.ptr = mane3d_buffer_todata(L, {arg_index}, &{var_name}_storage.size)) != NULL) {{
+        {var_name} = &{var_name}_storage;
     }} else {{
-        {var_name} = (const sg_range*)luaL_checkudata(L, {arg_index}, "sokol.{struct_name}");
+        {var_name} = {check_udata('sg_range', arg_index)};
     }}'''
-        return f'const {inner_type}* {var_name} = (const {inner_type}*)luaL_checkudata(L, {arg_index}, "sokol.{struct_name}");'
+        return f'const {inner_type}* {var_name} = {check_udata(inner_type, arg_index)};'
     elif is_struct_ptr(type_str):
         inner_type = util.extract_ptr_type(type_str)
-        struct_name = as_struct_metatable_name(inner_type)
-        return f'{inner_type}* {var_name} = ({inner_type}*)luaL_checkudata(L, {arg_index}, "sokol.{struct_name}");'
+        return f'{inner_type}* {var_name} = {check_udata(inner_type, arg_index)};'
     elif is_enum_type(type_str):
-        return f'{type_str} {var_name} = ({type_str})luaL_checkinteger(L, {arg_index});'
+        return f'{type_str} {var_name} = ({type_str})MANE3D_CHECKINTEGER(L, {arg_index});'
     elif util.is_void_ptr(type_str):
         return f'void* {var_name} = lua_touserdata(L, {arg_index});'
     elif util.is_const_void_ptr(type_str):
         return f'const void* {var_name} = lua_touserdata(L, {arg_index});'
     elif type_str == 'const float *' or type_str == 'const float*':
-        # Accept string as binary float data or lightuserdata
+        # Accept string as binary float data, mane3d.buffer or lightuserdata
         return f'''const float* {var_name};
+    size_t {var_name}_size;
     if (lua_isstring(L, {arg_index})) {{
         {var_name} = (const float*)lua_tostring(L, {arg_index});
+    }} else if (({var_name} = (const float*)mane3d_buffer_todata(L, {arg_index}, &{var_name}_size)) != NULL) {{
+        (void){var_name}_size;
     }} else {{
         {var_name} = (const float*)lua_touserdata(L, {arg_index});
     }}'''
@@ -292,7 +371,7 @@ def get_dummy_return_value(result_type, prefix):
         return '0.0f' if result_type == 'float' else '0.0'
     elif util.is_string_ptr(result_type):
         return '""'
-    elif is_struct_type(result_type):
+    elif is_struct_type(result_type) or is_handle_type(result_type):
         return f'({result_type}){{0}}'
     elif is_enum_type(result_type):
         return '0'
@@ -328,6 +407,220 @@ dummy_special_returns = {
     'sapp_frame_duration': '1.0/60.0',
 }
 
+# Extra statements emitted right after specific C calls
+func_post_calls = {
+    # gfx.commit() ends the frame: recycle sokol.frame_arena pools, close the sokol.stats frame
+    'sg_commit': 'mane3d_arena_recycle();\n    MANE3D_STATS_END_FRAME();',
+}
+
+# Functions MANE3D_BINDING_STATS leaves unwrapped: they reset the sokol_time
+# origin the counters are timed with, so a call would record a bogus duration
+unwrapped_stat_funcs = ['stm_setup']
+
+def get_stat_funcs(funcs):
+    """The functions that get MANE3D_BINDING_STATS counters"""
+    return [f for f in funcs if f['name'] not in unwrapped_stat_funcs]
+
+# sokol.gfx calls that gfx.CommandBuffer can record (only those present in the header are used)
+command_buffer_funcs = [
+    'sg_apply_viewport',
+    'sg_apply_viewportf',
+    'sg_apply_scissor_rect',
+    'sg_apply_scissor_rectf',
+    'sg_apply_pipeline',
+    'sg_apply_bindings',
+    'sg_apply_uniforms',
+    'sg_draw',
+    'sg_draw_ex',
+    'sg_dispatch',
+]
+
+def get_command_param_kind(param_type):
+    """How a recorded command stores a parameter: 'value', 'struct_ptr', 'range' or None if it can't"""
+    if param_type == 'const sg_range *':
+        return 'range'
+    elif param_type == 'bool' or is_int_type(param_type) or is_float_type(param_type):
+        return 'value'
+    elif is_enum_type(param_type) or is_handle_type(param_type) or is_struct_type(param_type):
+        return 'value'
+    elif is_const_struct_ptr(param_type):
+        return 'struct_ptr'
+    return None
+
+def get_command_funcs(funcs):
+    """Functions to expose on gfx.CommandBuffer, in header order"""
+    return [decl for decl in funcs
+            if decl['name'] in command_buffer_funcs
+            and get_result_type(decl) == 'void'
+            and all(get_command_param_kind(p['type']) for p in decl['params'])]
+
+def gen_command_buffer(funcs, prefix):
+    """Generate gfx.CommandBuffer: one recording method per command, and a replay loop
+    that runs them all from a single Lua call"""
+    cmds = get_command_funcs(funcs)
+    if not cmds:
+        return cmds
+    tname = f'sokol.{module_names[prefix]}.CommandBuffer'
+
+    l(f'/* {prefix}CommandBuffer: commands recorded into a mane3d_cmdbuf and replayed by submit() */')
+    l(f'static mane3d_metatable g_{prefix}cmdbuf_mt;')
+    l('')
+    l('enum {')
+    for i, decl in enumerate(cmds):
+        l(f'    L_{decl["name"].upper()}_CMD = {i + 1},')
+    l('};')
+    l('')
+
+    # Command layouts: parameters by value, sg_range payloads follow the struct
+    for decl in cmds:
+        func_name = decl['name']
+        l('typedef struct {')
+        l('    mane3d_cmd_header hdr;')
+        for param in decl['params']:
+            kind = get_command_param_kind(param['type'])
+            if kind == 'value':
+                l(f'    {param["type"]} {param["name"]};')
+            elif kind == 'struct_ptr':
+                l(f'    {util.extract_ptr_type(param["type"])} {param["name"]};')
+            else:
+                l(f'    size_t {param["name"]}_size;')
+        l(f'}} l_{func_name}_cmd;')
+        l('')
+
+    # Recording methods
+    for decl in cmds:
+        func_name = decl['name']
+        params = decl['params']
+        ranges = [p['name'] for p in params if get_command_param_kind(p['type']) == 'range']
+        l(f'static int l_{func_name}_record(lua_State *L) {{')
+        l(f'    mane3d_cmdbuf* cb = (mane3d_cmdbuf*)mane3d_checkudata(L, 1, &g_{prefix}cmdbuf_mt, "{tname}");')
+        for i, param in enumerate(params):
+            l(f'    {get_lua_to_code(param["type"], i + 2, param["name"], prefix)}')
+        size = f'sizeof(l_{func_name}_cmd)'
+        for name in ranges:
+            size += f' + MANE3D_CMD_ALIGN({name}->size)'
+        l(f'    l_{func_name}_cmd* c = (l_{func_name}_cmd*)mane3d_cmdbuf_push(L, cb, L_{func_name.upper()}_CMD, {size});')
+        for param in params:
+            name = param['name']
+            kind = get_command_param_kind(param['type'])
+            if kind == 'value':
+                l(f'    c->{name} = {name};')
+            elif kind == 'struct_ptr':
+                l(f'    c->{name} = *{name};')
+        if ranges:
+            l('    unsigned char* payload = (unsigned char*)(c + 1);')
+            for name in ranges:
+                l(f'    c->{name}_size = {name}->size;')
+                l(f'    if ({name}->size > 0) memcpy(payload, {name}->ptr, {name}->size);')
+                l(f'    payload += MANE3D_CMD_ALIGN({name}->size);')
+            l('    (void)payload;')
+        l('    return 0;')
+        l('}')
+        l('')
+
+    l(f'static void l_{prefix}cmdbuf_replay(const mane3d_cmdbuf* cb) {{')
+    l('    const unsigned char* p = cb->data;')
+    l('    const unsigned char* end = p + cb->size;')
+    l('    while (p < end) {')
+    l('        const mane3d_cmd_header* hdr = (const mane3d_cmd_header*)p;')
+    l('        switch (hdr->op) {')
+    for decl in cmds:
+        func_name = decl['name']
+        params = decl['params']
+        l(f'        case L_{func_name.upper()}_CMD: {{')
+        l(f'            const l_{func_name}_cmd* c = (const l_{func_name}_cmd*)hdr;')
+        args = []
+        ranges = [p['name'] for p in params if get_command_param_kind(p['type']) == 'range']
+        if ranges:
+            l('            const unsigned char* payload = (const unsigned char*)(c + 1);')
+        for param in params:
+            name = param['name']
+            kind = get_command_param_kind(param['type'])
+            if kind == 'value':
+                args.append(f'c->{name}')
+            elif kind == 'struct_ptr':
+                args.append(f'&c->{name}')
+            else:
+                l(f'            sg_range {name} = {{ payload, c->{name}_size }};')
+                l(f'            payload += MANE3D_CMD_ALIGN(c->{name}_size);')
+                args.append(f'&{name}')
+        if ranges:
+            l('            (void)payload;')
+        l(f'            {func_name}({", ".join(args)});')
+        l('            break;')
+        l('        }')
+    l('        default:')
+    l('            break;')
+    l('        }')
+    l('        p += hdr->size;')
+    l('    }')
+    l('}')
+    l('')
+
+    l('/* cb:submit() replays every command; uncached buffers are emptied afterwards */')
+    l(f'static int l_{prefix}cmdbuf_submit(lua_State *L) {{')
+    l(f'    mane3d_cmdbuf* cb = (mane3d_cmdbuf*)mane3d_checkudata(L, 1, &g_{prefix}cmdbuf_mt, "{tname}");')
+    l(f'    l_{prefix}cmdbuf_replay(cb);')
+    l('    if (!cb->cached) {')
+    l('        cb->size = 0;')
+    l('        cb->count = 0;')
+    l('    }')
+    l('    return 0;')
+    l('}')
+    l('')
+    l('/* cb:reset() drops all commands, keeping the allocation */')
+    l(f'static int l_{prefix}cmdbuf_reset(lua_State *L) {{')
+    l(f'    mane3d_cmdbuf* cb = (mane3d_cmdbuf*)mane3d_checkudata(L, 1, &g_{prefix}cmdbuf_mt, "{tname}");')
+    l('    cb->size = 0;')
+    l('    cb->count = 0;')
+    l('    return 0;')
+    l('}')
+    l('')
+    l(f'static int l_{prefix}cmdbuf__len(lua_State *L) {{')
+    l(f'    mane3d_cmdbuf* cb = (mane3d_cmdbuf*)mane3d_checkudata(L, 1, &g_{prefix}cmdbuf_mt, "{tname}");')
+    l('    lua_pushinteger(L, cb->count);')
+    l('    return 1;')
+    l('}')
+    l('')
+    l(f'static int l_{prefix}cmdbuf__gc(lua_State *L) {{')
+    l('    mane3d_cmdbuf_free((mane3d_cmdbuf*)lua_touserdata(L, 1));')
+    l('    return 0;')
+    l('}')
+    l('')
+    l('/* CommandBuffer([{ cached = true }]): cached buffers keep their commands across submits */')
+    l(f'static int l_{prefix}cmdbuf_new(lua_State *L) {{')
+    l('    mane3d_cmdbuf* cb = (mane3d_cmdbuf*)lua_newuserdatauv(L, sizeof(mane3d_cmdbuf), 0);')
+    l('    memset(cb, 0, sizeof(mane3d_cmdbuf));')
+    l(f'    mane3d_setmetatable(L, &g_{prefix}cmdbuf_mt);')
+    l('    if (lua_istable(L, 1)) {')
+    l('        lua_getfield(L, 1, "cached");')
+    l('        cb->cached = lua_toboolean(L, -1);')
+    l('        lua_pop(L, 1);')
+    l('    }')
+    l('    return 1;')
+    l('}')
+    l('')
+    l(f'static const luaL_Reg l_{prefix}cmdbuf_methods[] = {{')
+    for decl in cmds:
+        l(f'    {{"{as_snake_case(decl["name"], prefix)}", l_{decl["name"]}_record}},')
+    l(f'    {{"submit", l_{prefix}cmdbuf_submit}},')
+    l(f'    {{"reset", l_{prefix}cmdbuf_reset}},')
+    l('    {NULL, NULL}')
+    l('};')
+    l('')
+    l(f'static void register_{prefix}cmdbuf(lua_State *L) {{')
+    l(f'    mane3d_metatable_init(L, &g_{prefix}cmdbuf_mt, "{tname}");')
+    l(f'    luaL_newlib(L, l_{prefix}cmdbuf_methods);')
+    l('    lua_setfield(L, -2, "__index");')
+    l(f'    lua_pushcfunction(L, l_{prefix}cmdbuf__len);')
+    l('    lua_setfield(L, -2, "__len");')
+    l(f'    lua_pushcfunction(L, l_{prefix}cmdbuf__gc);')
+    l('    lua_setfield(L, -2, "__gc");')
+    l('    lua_pop(L, 1);')
+    l('}')
+    l('')
+    return cmds
+
 def gen_func_wrapper(decl, prefix):
     """Generate a Lua C API wrapper function"""
     func_name = decl['name']
@@ -369,11 +662,16 @@ def gen_func_wrapper(decl, prefix):
 
     # Call the C function
     args_str = ', '.join(arg_names)
+    post_call = func_post_calls.get(func_name)
     if result_type == 'void':
         l(f'    {func_name}({args_str});')
+        if post_call:
+            l(f'    {post_call}')
         l('    return 0;')
     else:
         l(f'    {result_type} result = {func_name}({args_str});')
+        if post_call:
+            l(f'    {post_call}')
         push_code = get_lua_push_code(result_type, 'result', prefix)
         if push_code:
             l(f'    {push_code}')
@@ -393,20 +691,18 @@ def get_callback_arg_push_code(arg_type, var_name, prefix, unique_suffix=''):
     # For const struct pointers, push a copy of the struct
     if is_const_struct_ptr(arg_type):
         inner_type = util.extract_ptr_type(arg_type)
-        struct_name = as_struct_metatable_name(inner_type)
         return [
-            f'{inner_type}* {ud_name} = ({inner_type}*)lua_newuserdatauv(L, sizeof({inner_type}), 0);',
+            f'{inner_type}* {ud_name} = ({inner_type}*)lua_newuserdatauv(L, sizeof({inner_type}), 1);',
             f'*{ud_name} = *{var_name};',
-            f'luaL_setmetatable(L, "sokol.{struct_name}");'
+            set_metatable(inner_type)
         ]
     # For non-const struct pointers, push directly
     elif is_struct_ptr(arg_type):
         inner_type = util.extract_ptr_type(arg_type)
-        struct_name = as_struct_metatable_name(inner_type)
         return [
-            f'{inner_type}* {ud_name} = ({inner_type}*)lua_newuserdatauv(L, sizeof({inner_type}), 0);',
+            f'{inner_type}* {ud_name} = ({inner_type}*)lua_newuserdatauv(L, sizeof({inner_type}), 1);',
             f'*{ud_name} = *{var_name};',
-            f'luaL_setmetatable(L, "sokol.{struct_name}");'
+            set_metatable(inner_type)
         ]
     # For primitive types
     clean_type = arg_type.replace('const ', '').strip()
@@ -487,65 +783,145 @@ def gen_callback_trampoline(c_struct_name, field_name, field_type, prefix):
     l('}')
     l('')
 
-def gen_array_field_init(field_name, field_type, prefix):
-    """Generate code to initialize an array field from a Lua table"""
+def get_value_init_lines(value_type, dst):
+    """Generate lines that store the Lua value on top of the stack into dst"""
+    if value_type == 'bool':
+        return [f'{dst} = lua_toboolean(L, -1);']
+    elif is_int_type(value_type):
+        return [f'{dst} = ({value_type})lua_tointeger(L, -1);']
+    elif is_float_type(value_type):
+        return [f'{dst} = ({value_type})lua_tonumber(L, -1);']
+    elif util.is_string_ptr(value_type):
+        return [f'{dst} = lua_tostring(L, -1);']
+    elif is_handle_type(value_type):
+        return [f'{dst}.id = (uint32_t)lua_tointeger(L, -1);']
+    elif is_struct_type(value_type):
+        lines = []
+        # Special case: sg_range can be initialized from a string or mane3d.buffer
+        if value_type == 'sg_range':
+            lines += [
+                'if (lua_type(L, -1) == LUA_TSTRING) {',
+                '    /* Initialize sg_range from binary string */',
+                '    size_t len;',
+                '    const char* data = lua_tolstring(L, -1, &len);',
+                f'    {dst}.ptr = data;',
+                f'    {dst}.size = len;',
+                f'}} else if (({dst}.ptr = mane3d_buffer_todata(L, -1, &{dst}.size)) != NULL) {{',
+                '    /* Point at the buffer storage */',
+                '} else ',
+            ]
+        if is_local_struct_type(value_type):
+            init = [
+                'if (lua_istable(L, -1)) {',
+                '    /* Initialize in place from inline table */',
+                f'    l_{value_type}_init(L, lua_gettop(L), &{dst});',
+                '} else {',
+            ]
+        else:
+            init = ['{']
+        init += [
+            f'    {value_type}* val = {test_udata(value_type, -1)};',
+            f'    if (val) {dst} = *val;',
+            '}',
+        ]
+        if lines:
+            lines[-1] += init[0]
+            return lines + init[1:]
+        return init
+    elif is_enum_type(value_type):
+        return [f'{dst} = ({value_type})lua_tointeger(L, -1);']
+    elif util.is_void_ptr(value_type) or util.is_const_void_ptr(value_type):
+        return [f'{dst} = lua_touserdata(L, -1);']
+    return [f'/* TODO: init {value_type} */']
+
+def gen_array_field_init(c_struct_name, field_name, field_type, prefix):
+    """Generate code to initialize an array field from the Lua table (or array view) on top of the stack"""
     array_type = util.extract_array_type(field_type)
     array_sizes = util.extract_array_sizes(field_type)
     size = array_sizes[0]
 
-    l(f'        lua_getfield(L, 1, "{field_name}");')
-    l(f'        if (lua_istable(L, -1)) {{')
-    l(f'            for (int i = 0; i < {size}; i++) {{')
-    l(f'                lua_rawgeti(L, -1, i + 1);')
-    l(f'                if (!lua_isnil(L, -1)) {{')
-    if array_type == 'bool':
-        l(f'                    ud->{field_name}[i] = lua_toboolean(L, -1);')
-    elif is_int_type(array_type):
-        l(f'                    ud->{field_name}[i] = ({array_type})lua_tointeger(L, -1);')
-    elif is_float_type(array_type):
-        l(f'                    ud->{field_name}[i] = ({array_type})lua_tonumber(L, -1);')
-    elif is_struct_type(array_type):
-        inner_struct_name = as_struct_metatable_name(array_type)
-        # Special case: sg_range can be initialized from a string
-        if array_type == 'sg_range':
-            l(f'                    if (lua_isstring(L, -1)) {{')
-            l(f'                        /* Initialize sg_range from binary string */')
-            l(f'                        size_t len;')
-            l(f'                        const char* data = lua_tolstring(L, -1, &len);')
-            l(f'                        ud->{field_name}[i].ptr = data;')
-            l(f'                        ud->{field_name}[i].size = len;')
-            l(f'                    }} else if (lua_istable(L, -1)) {{')
-        else:
-            l(f'                    if (lua_istable(L, -1)) {{')
-        l(f'                        /* Initialize from inline table */')
-        l(f'                        lua_pushcfunction(L, l_{array_type}_new);')
-        l(f'                        lua_pushvalue(L, -2);')
-        l(f'                        lua_call(L, 1, 1);')
-        l(f'                        {array_type}* val = ({array_type}*)luaL_testudata(L, -1, "sokol.{inner_struct_name}");')
-        l(f'                        if (val) ud->{field_name}[i] = *val;')
-        l(f'                        lua_pop(L, 1);')
-        l(f'                    }} else {{')
-        l(f'                        {array_type}* val = ({array_type}*)luaL_testudata(L, -1, "sokol.{inner_struct_name}");')
-        l(f'                        if (val) ud->{field_name}[i] = *val;')
-        l(f'                    }}')
-    elif is_enum_type(array_type):
-        l(f'                    ud->{field_name}[i] = ({array_type})lua_tointeger(L, -1);')
+    l(f'            if (lua_istable(L, -1)) {{')
+    l(f'                for (int i = 0; i < {size}; i++) {{')
+    l(f'                    if (lua_rawgeti(L, -1, i + 1) != LUA_TNIL) {{')
+    for line in get_value_init_lines(array_type, f'ud->{field_name}[i]'):
+        l(f'                        {line}')
+    l(f'                    }}')
+    l(f'                    lua_pop(L, 1);')
     l(f'                }}')
-    l(f'                lua_pop(L, 1);')
+    l(f'            }} else {{')
+    l(f'                mane3d_array_view* v = mane3d_test_array_view(L, -1, &l_{c_struct_name}_{field_name}_desc);')
+    l(f'                if (v) memmove(ud->{field_name}, v->ptr, sizeof(ud->{field_name}));')
     l(f'            }}')
-    l(f'        }}')
-    l(f'        lua_pop(L, 1);')
+
+def gen_struct_init(struct_name, c_struct_name, fields, prefix):
+    """Generate an in-place initializer that walks only the keys present in a table"""
+    names = get_struct_field_names(fields)
+    by_name = {f['name']: f for f in fields}
+
+    l(f'static void l_{c_struct_name}_init(lua_State *L, int idx, {c_struct_name}* ud) {{')
+    l('    lua_pushnil(L);')
+    l('    while (lua_next(L, idx) != 0) {')
+    l('        int f = -1;')
+    l('        if (lua_type(L, -2) == LUA_TSTRING) {')
+    l('            size_t len;')
+    l('            const char* key = lua_tolstring(L, -2, &len);')
+    l(f'            f = l_{c_struct_name}_field(key, len);')
+    l('        }')
+    l('        switch (f) {')
+
+    for i, field_name in enumerate(names):
+        field_type = by_name[field_name]['type']
+        l(f'        case {i}:')
+        if util.is_func_ptr(field_type):
+            # Skip variadic callbacks (e.g., logger.func with "...")
+            if '...' not in field_type:
+                ref = f'g_{c_struct_name}_{field_name}_ref'
+                l(f'            if (lua_isfunction(L, -1)) {{')
+                l(f'                if ({ref} != LUA_NOREF) luaL_unref(L, LUA_REGISTRYINDEX, {ref});')
+                l(f'                lua_pushvalue(L, -1);')
+                l(f'                {ref} = luaL_ref(L, LUA_REGISTRYINDEX);')
+                l(f'                g_{c_struct_name}_L = L;')
+                l(f'                ud->{field_name} = trampoline_{c_struct_name}_{field_name};')
+                l(f'            }}')
+        elif util.is_1d_array_type(field_type):
+            gen_array_field_init(c_struct_name, field_name, field_type, prefix)
+        elif util.is_2d_array_type(field_type):
+            l('            /* 2D arrays not yet supported */')
+        else:
+            for line in get_value_init_lines(field_type, f'ud->{field_name}'):
+                l(f'            {line}')
+        l('            break;')
+
+    l('        default:')
+    l('#ifndef NDEBUG')
+    l(f'            luaL_error(L, "{get_metatable_name(c_struct_name)}: unknown field \'%s\'",')
+    l('                       lua_type(L, -2) == LUA_TSTRING ? lua_tostring(L, -2) : luaL_typename(L, -2));')
+    l('#endif')
+    l('            break;')
+    l('        }')
+    l('        lua_pop(L, 1);')
+    l('    }')
+    l('}')
+    l('')
+
+def get_struct_nuvalue(c_struct_name):
+    """Number of user values on a struct userdata: the view cache
+    (sg_range has no nested fields and anchors its source string or buffer there instead)"""
+    return 1
 
 def gen_struct_new(struct_name, c_struct_name, fields, prefix):
     """Generate a constructor function for a struct that accepts optional table"""
+    nuvalue = get_struct_nuvalue(c_struct_name)
+    l(f'static mane3d_arena_pool g_{c_struct_name}_pool = MANE3D_ARENA_POOL_INIT;')
+    l('')
+    l(f'static int l_{c_struct_name}_new(lua_State *L) {{')
+    l(f'    {c_struct_name}* ud = ({c_struct_name}*)mane3d_arena_newuserdata(L, &g_{c_struct_name}_pool, sizeof({c_struct_name}), {nuvalue});')
+    l(f'    memset(ud, 0, sizeof({c_struct_name}));')
+    l(f'    {set_metatable(c_struct_name)}')
+    l('')
     # Special case for sg_range: accept string as binary data
     if c_struct_name == 'sg_range':
-        l(f'static int l_{c_struct_name}_new(lua_State *L) {{')
-        l(f'    /* sg_range can be created from a string (binary data) or table */')
-        l(f'    {c_struct_name}* ud = ({c_struct_name}*)lua_newuserdatauv(L, sizeof({c_struct_name}), 1);')
-        l(f'    memset(ud, 0, sizeof({c_struct_name}));')
-        l(f'    luaL_setmetatable(L, "sokol.{struct_name}");')
-        l('')
+        l('    /* sg_range can be created from a string (binary data), mane3d.buffer or table */')
         l('    if (lua_isstring(L, 1)) {')
         l('        /* Initialize from string (binary data) */')
         l('        size_t len;')
@@ -555,129 +931,122 @@ def gen_struct_new(struct_name, c_struct_name, fields, prefix):
         l('        /* Keep reference to string to prevent GC */')
         l('        lua_pushvalue(L, 1);')
         l('        lua_setiuservalue(L, -2, 1);')
+        l('    } else if ((ud->ptr = mane3d_buffer_todata(L, 1, &ud->size)) != NULL) {')
+        l('        /* Point at the buffer storage and keep the buffer alive */')
+        l('        lua_pushvalue(L, 1);')
+        l('        lua_setiuservalue(L, -2, 1);')
         l('    } else if (lua_istable(L, 1)) {')
-        l('        lua_getfield(L, 1, "ptr");')
-        l('        if (!lua_isnil(L, -1)) ud->ptr = lua_touserdata(L, -1);')
-        l('        lua_pop(L, 1);')
-        l('        lua_getfield(L, 1, "size");')
-        l('        if (!lua_isnil(L, -1)) ud->size = (size_t)lua_tointeger(L, -1);')
-        l('        lua_pop(L, 1);')
-        l('    }')
-        l('    return 1;')
-        l('}')
-        l('')
-        return
+    else:
+        l('    /* If first arg is a table, use it to initialize fields */')
+        l('    if (lua_istable(L, 1)) {')
+    l(f'        l_{c_struct_name}_init(L, 1, ud);')
+    l('    }')
+    l('    return 1;')
+    l('}')
+    l('')
 
-    l(f'static int l_{c_struct_name}_new(lua_State *L) {{')
-    l(f'    {c_struct_name}* ud = ({c_struct_name}*)lua_newuserdatauv(L, sizeof({c_struct_name}), 0);')
-    l(f'    memset(ud, 0, sizeof({c_struct_name}));')
-    l(f'    luaL_setmetatable(L, "sokol.{struct_name}");')
+def gen_struct_methods(struct_name, c_struct_name, fields, prefix):
+    """Generate :reset() and :assign(tbl) so a struct object can be reused"""
+    nuvalue = get_struct_nuvalue(c_struct_name)
+
+    l(f'static void l_{c_struct_name}_clear(lua_State *L, {c_struct_name}* self) {{')
+    l(f'    memset(self, 0, sizeof({c_struct_name}));')
+    if nuvalue:
+        l(f'    for (int i = 1; i <= {nuvalue}; i++) {{')
+        l('        lua_pushnil(L);')
+        l('        lua_setiuservalue(L, 1, i);')
+        l('    }')
+    else:
+        l('    (void)L;')
+    l('}')
     l('')
-    l('    /* If first arg is a table, use it to initialize fields */')
-    l('    if (lua_istable(L, 1)) {')
 
-    for field in fields:
-        field_name = field['name']
-        field_type = field['type']
-        if util.is_func_ptr(field_type):
-            # Skip variadic callbacks (e.g., logger.func with "...")
-            if '...' in field_type:
-                continue
-            # Generate callback field setup
-            l(f'        lua_getfield(L, 1, "{field_name}");')
-            l(f'        if (lua_isfunction(L, -1)) {{')
-            l(f'            g_{c_struct_name}_{field_name}_ref = luaL_ref(L, LUA_REGISTRYINDEX);')
-            l(f'            g_{c_struct_name}_L = L;')
-            l(f'            ud->{field_name} = trampoline_{c_struct_name}_{field_name};')
-            l(f'        }} else {{')
-            l(f'            lua_pop(L, 1);')
-            l(f'        }}')
-            continue
-        if util.is_1d_array_type(field_type):
-            gen_array_field_init(field_name, field_type, prefix)
-            continue
-        if util.is_2d_array_type(field_type):
-            continue  # Skip 2D arrays for now
-        l(f'        lua_getfield(L, 1, "{field_name}");')
-        l(f'        if (!lua_isnil(L, -1)) {{')
-        if field_type == 'bool':
-            l(f'            ud->{field_name} = lua_toboolean(L, -1);')
-        elif is_int_type(field_type):
-            l(f'            ud->{field_name} = ({field_type})lua_tointeger(L, -1);')
-        elif is_float_type(field_type):
-            l(f'            ud->{field_name} = ({field_type})lua_tonumber(L, -1);')
-        elif util.is_string_ptr(field_type):
-            l(f'            ud->{field_name} = lua_tostring(L, -1);')
-        elif is_struct_type(field_type):
-            inner_struct_name = as_struct_metatable_name(field_type)
-            # Special case: sg_range can be initialized from a string
-            if field_type == 'sg_range':
-                l(f'            if (lua_isstring(L, -1)) {{')
-                l(f'                /* Initialize sg_range from binary string */')
-                l(f'                size_t len;')
-                l(f'                const char* data = lua_tolstring(L, -1, &len);')
-                l(f'                ud->{field_name}.ptr = data;')
-                l(f'                ud->{field_name}.size = len;')
-                l(f'            }} else if (lua_istable(L, -1)) {{')
-            else:
-                l(f'            if (lua_istable(L, -1)) {{')
-            l(f'                /* Initialize from inline table */')
-            l(f'                lua_pushcfunction(L, l_{field_type}_new);')
-            l(f'                lua_pushvalue(L, -2);')
-            l(f'                lua_call(L, 1, 1);')
-            l(f'                {field_type}* val = ({field_type}*)luaL_testudata(L, -1, "sokol.{inner_struct_name}");')
-            l(f'                if (val) ud->{field_name} = *val;')
-            l(f'                lua_pop(L, 1);')
-            l(f'            }} else {{')
-            l(f'                {field_type}* val = ({field_type}*)luaL_testudata(L, -1, "sokol.{inner_struct_name}");')
-            l(f'                if (val) ud->{field_name} = *val;')
-            l(f'            }}')
-        elif is_enum_type(field_type):
-            l(f'            ud->{field_name} = ({field_type})lua_tointeger(L, -1);')
-        elif util.is_void_ptr(field_type) or util.is_const_void_ptr(field_type):
-            l(f'            ud->{field_name} = lua_touserdata(L, -1);')
-        l('        }')
-        l('        lua_pop(L, 1);')
+    l(f'/* obj:reset() zeroes every field and returns obj */')
+    l(f'static int l_{c_struct_name}_reset(lua_State *L) {{')
+    l(f'    {c_struct_name}* self = {check_udata(c_struct_name, 1)};')
+    l(f'    l_{c_struct_name}_clear(L, self);')
+    l('    lua_settop(L, 1);')
+    l('    return 1;')
+    l('}')
+    l('')
 
+    l(f'/* obj:assign(tbl) replaces all fields as if constructed from tbl and returns obj */')
+    l(f'static int l_{c_struct_name}_assign(lua_State *L) {{')
+    l(f'    {c_struct_name}* self = {check_udata(c_struct_name, 1)};')
+    l(f'    l_{c_struct_name}_clear(L, self);')
+    if c_struct_name == 'sg_range':
+        l('    if (lua_isstring(L, 2)) {')
+        l('        size_t len;')
+        l('        self->ptr = lua_tolstring(L, 2, &len);')
+        l('        self->size = len;')
+        l('        lua_pushvalue(L, 2);')
+        l('        lua_setiuservalue(L, 1, 1);')
+        l('    } else if ((self->ptr = mane3d_buffer_todata(L, 2, &self->size)) != NULL) {')
+        l('        lua_pushvalue(L, 2);')
+        l('        lua_setiuservalue(L, 1, 1);')
+        l('    } else if (lua_istable(L, 2)) {')
+    else:
+        l('    if (lua_istable(L, 2)) {')
+    l(f'        l_{c_struct_name}_init(L, 2, self);')
+    l('    } else if (!lua_isnoneornil(L, 2)) {')
+    l('        return luaL_typeerror(L, 2, "table");')
     l('    }')
+    l('    lua_settop(L, 1);')
     l('    return 1;')
     l('}')
     l('')
 
-def gen_struct_field_getter(struct_name, c_struct_name, field, prefix):
-    """Generate a getter for a struct field"""
+    l(f'static const luaL_Reg l_{c_struct_name}_methods[] = {{')
+    l(f'    {{"reset", l_{c_struct_name}_reset}},')
+    l(f'    {{"assign", l_{c_struct_name}_assign}},')
+    l('    {NULL, NULL}')
+    l('};')
+    l('')
+
+def gen_array_field_desc(c_struct_name, field, prefix):
+    """Generate the element accessors and descriptor backing an array field view"""
+    field_name = field['name']
+    array_type = util.extract_array_type(field['type'])
+    size = util.extract_array_sizes(field['type'])[0]
+    base = f'l_{c_struct_name}_{field_name}'
+
+    l(f'static void {base}_push(lua_State *L, void *elem, lua_Integer i) {{')
+    l(f'    {array_type}* e = ({array_type}*)elem;')
+    if is_struct_type(array_type):
+        l(f'    mane3d_push_view(L, 1, i, e, &g_{array_type}_view_mt);')
+    else:
+        l('    (void)i;')
+        l(f'    {get_lua_push_code(array_type, "(*e)", prefix)}')
+    l('}')
+    l('')
+    l(f'static void {base}_set(lua_State *L, void *elem) {{')
+    l(f'    {array_type}* e = ({array_type}*)elem;')
+    for line in get_value_init_lines(array_type, '(*e)'):
+        l(f'    {line}')
+    l('}')
+    l('')
+    l(f'static const mane3d_array_desc {base}_desc = {{ {size}, sizeof({array_type}), {base}_push, {base}_set }};')
+    l('')
+
+def gen_struct_field_getter(struct_name, c_struct_name, field, field_id, prefix):
+    """Generate a getter for a struct field; nested structs and arrays are returned as views"""
     field_name = field['name']
     field_type = field['type']
 
+    if util.is_1d_array_type(field_type):
+        gen_array_field_desc(c_struct_name, field, prefix)
+
     l(f'static int l_{c_struct_name}_get_{field_name}(lua_State *L) {{')
-    l(f'    {c_struct_name}* self = ({c_struct_name}*)luaL_checkudata(L, 1, "sokol.{struct_name}");')
+    l(f'    {c_struct_name}* self = {check_udata(c_struct_name, 1)};')
 
     if util.is_1d_array_type(field_type):
-        array_type = util.extract_array_type(field_type)
-        array_sizes = util.extract_array_sizes(field_type)
-        size = array_sizes[0]
-        l(f'    lua_newtable(L);')
-        l(f'    for (int i = 0; i < {size}; i++) {{')
-        if array_type == 'bool':
-            l(f'        lua_pushboolean(L, self->{field_name}[i]);')
-        elif is_int_type(array_type):
-            l(f'        lua_pushinteger(L, (lua_Integer)self->{field_name}[i]);')
-        elif is_float_type(array_type):
-            l(f'        lua_pushnumber(L, (lua_Number)self->{field_name}[i]);')
-        elif is_struct_type(array_type):
-            inner_struct_name = as_struct_metatable_name(array_type)
-            l(f'        {array_type}* ud = ({array_type}*)lua_newuserdatauv(L, sizeof({array_type}), 0);')
-            l(f'        *ud = self->{field_name}[i];')
-            l(f'        luaL_setmetatable(L, "sokol.{inner_struct_name}");')
-        elif is_enum_type(array_type):
-            l(f'        lua_pushinteger(L, (lua_Integer)self->{field_name}[i]);')
-        else:
-            l(f'        lua_pushnil(L); /* unsupported array type */')
-        l(f'        lua_rawseti(L, -2, i + 1);')
-        l(f'    }}')
+        l(f'    mane3d_push_array_view(L, 1, {field_id + 1}, self->{field_name}, &l_{c_struct_name}_{field_name}_desc);')
     elif util.is_2d_array_type(field_type):
         l(f'    /* 2D array not yet supported */')
+        l('    (void)self;')
         l('    lua_pushnil(L);')
+    elif is_struct_type(field_type):
+        l(f'    mane3d_push_view(L, 1, {field_id + 1}, &self->{field_name}, &g_{field_type}_view_mt);')
     else:
         push_code = get_lua_push_code(field_type, f'self->{field_name}', prefix)
         if push_code:
@@ -690,35 +1059,30 @@ def gen_struct_field_getter(struct_name, c_struct_name, field, prefix):
     l('')
 
 def gen_struct_field_setter(struct_name, c_struct_name, field, prefix):
-    """Generate a setter for a struct field"""
+    """Generate a setter for a struct field (called from __newindex: self, key, value)"""
     field_name = field['name']
     field_type = field['type']
 
     l(f'static int l_{c_struct_name}_set_{field_name}(lua_State *L) {{')
-    l(f'    {c_struct_name}* self = ({c_struct_name}*)luaL_checkudata(L, 1, "sokol.{struct_name}");')
+    l(f'    {c_struct_name}* self = {check_udata(c_struct_name, 1)};')
 
     if util.is_1d_array_type(field_type):
         array_type = util.extract_array_type(field_type)
         array_sizes = util.extract_array_sizes(field_type)
         size = array_sizes[0]
-        l(f'    luaL_checktype(L, 2, LUA_TTABLE);')
-        l(f'    for (int i = 0; i < {size}; i++) {{')
-        l(f'        lua_rawgeti(L, 2, i + 1);')
-        l(f'        if (!lua_isnil(L, -1)) {{')
-        if array_type == 'bool':
-            l(f'            self->{field_name}[i] = lua_toboolean(L, -1);')
-        elif is_int_type(array_type):
-            l(f'            self->{field_name}[i] = ({array_type})lua_tointeger(L, -1);')
-        elif is_float_type(array_type):
-            l(f'            self->{field_name}[i] = ({array_type})lua_tonumber(L, -1);')
-        elif is_struct_type(array_type):
-            inner_struct_name = as_struct_metatable_name(array_type)
-            l(f'            {array_type}* val = ({array_type}*)luaL_testudata(L, -1, "sokol.{inner_struct_name}");')
-            l(f'            if (val) self->{field_name}[i] = *val;')
-        elif is_enum_type(array_type):
-            l(f'            self->{field_name}[i] = ({array_type})lua_tointeger(L, -1);')
+        l(f'    if (lua_istable(L, 3)) {{')
+        l(f'        for (int i = 0; i < {size}; i++) {{')
+        l(f'            if (lua_rawgeti(L, 3, i + 1) != LUA_TNIL) {{')
+        for line in get_value_init_lines(array_type, f'self->{field_name}[i]'):
+            l(f'                {line}')
+        l(f'            }}')
+        l(f'            lua_pop(L, 1);')
         l(f'        }}')
-        l(f'        lua_pop(L, 1);')
+        l(f'    }} else {{')
+        l(f'        /* Copy from a view of the same array field */')
+        l(f'        mane3d_array_view* v = mane3d_test_array_view(L, 3, &l_{c_struct_name}_{field_name}_desc);')
+        l(f'        if (v == NULL) return luaL_typeerror(L, 3, "table");')
+        l(f'        memmove(self->{field_name}, v->ptr, sizeof(self->{field_name}));')
         l(f'    }}')
     elif util.is_2d_array_type(field_type):
         l(f'    /* 2D array not yet supported */')
@@ -726,21 +1090,22 @@ def gen_struct_field_setter(struct_name, c_struct_name, field, prefix):
         l(f'    /* Function pointer field not supported */')
     else:
         if field_type == 'bool':
-            l(f'    self->{field_name} = lua_toboolean(L, 2);')
+            l(f'    self->{field_name} = lua_toboolean(L, 3);')
         elif is_int_type(field_type):
-            l(f'    self->{field_name} = ({field_type})luaL_checkinteger(L, 2);')
+            l(f'    self->{field_name} = ({field_type})MANE3D_CHECKINTEGER(L, 3);')
         elif is_float_type(field_type):
-            l(f'    self->{field_name} = ({field_type})luaL_checknumber(L, 2);')
+            l(f'    self->{field_name} = ({field_type})MANE3D_CHECKNUMBER(L, 3);')
         elif util.is_string_ptr(field_type):
-            l(f'    self->{field_name} = luaL_checkstring(L, 2);')
+            l(f'    self->{field_name} = MANE3D_CHECKSTRING(L, 3);')
+        elif is_handle_type(field_type):
+            l(f'    self->{field_name}.id = (uint32_t)MANE3D_CHECKINTEGER(L, 3);')
         elif is_struct_type(field_type):
-            inner_struct_name = as_struct_metatable_name(field_type)
-            l(f'    {field_type}* val = ({field_type}*)luaL_checkudata(L, 2, "sokol.{inner_struct_name}");')
+            l(f'    {field_type}* val = {check_udata(field_type, 3)};')
             l(f'    self->{field_name} = *val;')
         elif is_enum_type(field_type):
-            l(f'    self->{field_name} = ({field_type})luaL_checkinteger(L, 2);')
+            l(f'    self->{field_name} = ({field_type})MANE3D_CHECKINTEGER(L, 3);')
         elif util.is_void_ptr(field_type) or util.is_const_void_ptr(field_type):
-            l(f'    self->{field_name} = lua_touserdata(L, 2);')
+            l(f'    self->{field_name} = lua_touserdata(L, 3);')
         else:
             l(f'    /* TODO: set {field_type} */')
 
@@ -748,32 +1113,95 @@ def gen_struct_field_setter(struct_name, c_struct_name, field, prefix):
     l('}')
     l('')
 
+def gen_field_switch(names, ids, depth):
+    """Generate nested switch lines that resolve a key among names of equal length"""
+    pad = '    ' * depth
+    if len(names) == 1:
+        name = names[0]
+        return [f'{pad}if (memcmp(key, "{name}", {len(name)}) == 0) return {ids[name]};']
+    # Switch on the character position that splits the group into the most buckets
+    length = len(names[0])
+    pos = max(range(length), key=lambda i: (len({n[i] for n in names}), -i))
+    buckets = {}
+    for name in names:
+        buckets.setdefault(name[pos], []).append(name)
+    lines = [f'{pad}switch (key[{pos}]) {{']
+    for ch in sorted(buckets):
+        lines.append(f"{pad}case '{ch}':")
+        lines += gen_field_switch(buckets[ch], ids, depth + 1)
+        lines.append(f'{pad}    break;')
+    lines.append(f'{pad}}}')
+    return lines
+
+def gen_field_lookup(func_name, names):
+    """Generate a function mapping a field name to its index (-1 if unknown).
+    Dispatches on key length first, then on a distinguishing character."""
+    ids = {name: i for i, name in enumerate(names)}
+    by_len = {}
+    for name in names:
+        by_len.setdefault(len(name), []).append(name)
+    lines = [f'static int {func_name}(const char* key, size_t len) {{']
+    if by_len:
+        lines.append('    switch (len) {')
+        for length in sorted(by_len):
+            lines.append(f'    case {length}:')
+            lines += gen_field_switch(by_len[length], ids, 2)
+            lines.append('        break;')
+        lines.append('    }')
+    else:
+        lines.append('    (void)key; (void)len;')
+    lines.append('    return -1;')
+    lines.append('}')
+    return lines
+
+def get_struct_field_names(fields):
+    """Field names that take part in key dispatch"""
+    return [f['name'] for f in fields]
+
+def gen_struct_dispatch(struct_name, c_struct_name, fields, prefix):
+    """Generate field lookup and getter/setter tables shared by __index/__newindex"""
+    names = get_struct_field_names(fields)
+    for line in gen_field_lookup(f'l_{c_struct_name}_field', names):
+        l(line)
+    l('')
+    if not names:
+        return
+    by_name = {f['name']: f for f in fields}
+    for kind in ['get', 'set']:
+        l(f'static const lua_CFunction l_{c_struct_name}_{kind}ters[] = {{')
+        for name in names:
+            if util.is_func_ptr(by_name[name]['type']):
+                l('    NULL,')
+            else:
+                l(f'    l_{c_struct_name}_{kind}_{name},')
+        l('};')
+        l('')
+
 def gen_struct_index(struct_name, c_struct_name, fields, prefix):
     """Generate __index metamethod for struct"""
     l(f'static int l_{c_struct_name}__index(lua_State *L) {{')
-    l(f'    const char* key = luaL_checkstring(L, 2);')
-
-    for field in fields:
-        field_name = field['name']
-        if util.is_func_ptr(field['type']):
-            continue
-        l(f'    if (strcmp(key, "{field_name}") == 0) return l_{c_struct_name}_get_{field_name}(L);')
-
-    l('    return 0;')
+    l(f'    size_t len;')
+    l(f'    const char* key = luaL_checklstring(L, 2, &len);')
+    if get_struct_field_names(fields):
+        l(f'    int f = l_{c_struct_name}_field(key, len);')
+        l(f'    if (f >= 0 && l_{c_struct_name}_getters[f] != NULL) return l_{c_struct_name}_getters[f](L);')
+    else:
+        l(f'    (void)key; (void)len;')
+    l('    /* Not a field: look up methods (upvalue 1) */')
+    l('    lua_pushvalue(L, 2);')
+    l('    lua_rawget(L, lua_upvalueindex(1));')
+    l('    return 1;')
     l('}')
     l('')
 
 def gen_struct_newindex(struct_name, c_struct_name, fields, prefix):
     """Generate __newindex metamethod for struct"""
     l(f'static int l_{c_struct_name}__newindex(lua_State *L) {{')
-    l(f'    const char* key = luaL_checkstring(L, 2);')
-
-    for field in fields:
-        field_name = field['name']
-        if util.is_func_ptr(field['type']):
-            continue
-        l(f'    if (strcmp(key, "{field_name}") == 0) return l_{c_struct_name}_set_{field_name}(L);')
-
+    l(f'    size_t len;')
+    l(f'    const char* key = luaL_checklstring(L, 2, &len);')
+    if get_struct_field_names(fields):
+        l(f'    int f = l_{c_struct_name}_field(key, len);')
+        l(f'    if (f >= 0 && l_{c_struct_name}_setters[f] != NULL) return l_{c_struct_name}_setters[f](L);')
     l(f'    return luaL_error(L, "unknown field: %s", key);')
     l('}')
     l('')
@@ -796,14 +1224,17 @@ def gen_struct_bindings(decl, prefix):
     for field in callback_fields:
         gen_callback_trampoline(c_struct_name, field['name'], field['type'], prefix)
 
-    # Generate constructor
-    gen_struct_new(struct_name, c_struct_name, fields, prefix)
-
     # Generate field accessors
-    for field in fields:
+    for field_id, field in enumerate(fields):
         if not util.is_func_ptr(field['type']):
-            gen_struct_field_getter(struct_name, c_struct_name, field, prefix)
+            gen_struct_field_getter(struct_name, c_struct_name, field, field_id, prefix)
             gen_struct_field_setter(struct_name, c_struct_name, field, prefix)
+    gen_struct_dispatch(struct_name, c_struct_name, fields, prefix)
+
+    # Generate constructor
+    gen_struct_init(struct_name, c_struct_name, fields, prefix)
+    gen_struct_new(struct_name, c_struct_name, fields, prefix)
+    gen_struct_methods(struct_name, c_struct_name, fields, prefix)
 
     # Generate metamethods
     gen_struct_index(struct_name, c_struct_name, fields, prefix)
@@ -867,13 +1298,10 @@ def gen_enum_constants(decl, prefix):
     l('}')
     l('')
 
-consts_counter = 0
-
 def gen_consts(decl, prefix):
     """Generate anonymous enum constants"""
-    global consts_counter
-    consts_counter += 1
-    l(f'static void register_consts_{consts_counter}(lua_State *L) {{')
+    ctx.consts_counter += 1
+    l(f'static void register_consts_{ctx.consts_counter}(lua_State *L) {{')
     for item in decl['items']:
         item_name = item['name']
         lua_name = as_snake_case(item_name, prefix).upper()
@@ -881,24 +1309,56 @@ def gen_consts(decl, prefix):
         l(f'    lua_setfield(L, -2, "{lua_name}");')
     l('}')
     l('')
-    return consts_counter
+    return ctx.consts_counter
+
+def gen_binding_stats(module_name, prefix, funcs):
+    """Generate the MANE3D_BINDING_STATS counters and the counting wrapper of every function"""
+    funcs = get_stat_funcs(funcs)
+    if not funcs:
+        return
+    l('#ifdef MANE3D_BINDING_STATS')
+    l(f'static mane3d_binding_stat l_{module_name}_stats[] = {{')
+    for func_decl in funcs:
+        l(f'    {{"{module_name}.{as_snake_case(func_decl["name"], prefix)}", 0, 0, 0, 0, 0, 0}},')
+    l('};')
+    l('')
+    for i, func_decl in enumerate(funcs):
+        l(f'MANE3D_STAT_WRAP(l_{func_decl["name"]}, l_{module_name}_stats, {i})')
+    l('#endif')
+    l('')
+
+def gen_metatable_declarations():
+    """Generate the cached metatable slots of every struct type the module touches"""
+    for struct_type in ctx.struct_types:
+        l(f'static mane3d_metatable g_{struct_type}_mt, g_{struct_type}_view_mt;')
+    l('')
 
 def gen_metatable_registration(structs, prefix):
-    """Generate code to register all metatables"""
+    """Generate code to register all metatables and cache them for fast type checks"""
     l('static void register_metatables(lua_State *L) {')
 
-    for struct_decl in structs:
-        c_struct_name = struct_decl['name']
-        struct_name = as_pascal_case(c_struct_name, prefix)
-
-        l(f'    luaL_newmetatable(L, "sokol.{struct_name}");')
-        l(f'    lua_pushcfunction(L, l_{c_struct_name}__index);')
-        l(f'    lua_setfield(L, -2, "__index");')
-        l(f'    lua_pushcfunction(L, l_{c_struct_name}__newindex);')
-        l(f'    lua_setfield(L, -2, "__newindex");')
-        l(f'    lua_pop(L, 1);')
+    l('    mane3d_bindings_open(L);')
+    l('')
+    local_names = [decl['name'] for decl in structs]
+    for c_struct_name in local_names:
+        # Struct userdata and views into other structs share the same accessors
+        for mt, suffix in [('mt', ''), ('view_mt', 'View')]:
+            l(f'    mane3d_metatable_init(L, &g_{c_struct_name}_{mt}, "{get_metatable_name(c_struct_name)}{suffix}");')
+            l(f'    luaL_newlib(L, l_{c_struct_name}_methods);')
+            l(f'    lua_pushcclosure(L, l_{c_struct_name}__index, 1);')
+            l(f'    lua_setfield(L, -2, "__index");')
+            l(f'    lua_pushcfunction(L, l_{c_struct_name}__newindex);')
+            l(f'    lua_setfield(L, -2, "__newindex");')
+            l(f'    lua_pop(L, 1);')
         l('')
 
+    # Structs owned by dependency modules: share (or pre-create) their metatables by name
+    for struct_type in ctx.struct_types:
+        if struct_type not in local_names:
+            for mt, suffix in [('mt', ''), ('view_mt', 'View')]:
+                l(f'    mane3d_metatable_init(L, &g_{struct_type}_{mt}, "{get_metatable_name(struct_type)}{suffix}");')
+                l(f'    lua_pop(L, 1);')
+
     l('}')
     l('')
 
@@ -906,18 +1366,20 @@ lua_keywords = {'and', 'break', 'do', 'else', 'elseif', 'end', 'false', 'for',
                 'function', 'goto', 'if', 'in', 'local', 'nil', 'not', 'or',
                 'repeat', 'return', 'then', 'true', 'until', 'while'}
 
-def gen_luaopen(module_name, prefix, funcs, structs, enums, consts_ids):
+def gen_luaopen(module_name, prefix, funcs, structs, enums, consts_ids, command_funcs):
     """Generate the luaopen function"""
     l(f'static const luaL_Reg {module_name}_funcs[] = {{')
 
     # Add function wrappers
+    stat_funcs = get_stat_funcs(funcs)
     for func_decl in funcs:
         func_name = func_decl['name']
         lua_name = as_snake_case(func_name, prefix)
-        l(f'    {{"{lua_name}", l_{func_name}}},')
+        func = f'MANE3D_STAT_FN(l_{func_name})' if func_decl in stat_funcs else f'l_{func_name}'
+        l(f'    {{"{lua_name}", {func}}},')
         # Add underscore-suffixed alias for Lua reserved keywords
         if lua_name in lua_keywords:
-            l(f'    {{"{lua_name}_", l_{func_name}}},')
+            l(f'    {{"{lua_name}_", {func}}},')
 
     # Add struct constructors
     for struct_decl in structs:
@@ -925,12 +1387,21 @@ def gen_luaopen(module_name, prefix, funcs, structs, enums, consts_ids):
         lua_name = as_pascal_case(c_struct_name, prefix)
         l(f'    {{"{lua_name}", l_{c_struct_name}_new}},')
 
+    if command_funcs:
+        l(f'    {{"CommandBuffer", l_{prefix}cmdbuf_new}},')
+
     l('    {NULL, NULL}')
     l('};')
     l('')
 
     l(f'MANE3D_API int luaopen_sokol_{module_name}(lua_State *L) {{')
     l('    register_metatables(L);')
+    if stat_funcs:
+        l('#ifdef MANE3D_BINDING_STATS')
+        l(f'    mane3d_stats_register(l_{module_name}_stats, {len(stat_funcs)});')
+        l('#endif')
+    if command_funcs:
+        l(f'    register_{prefix}cmdbuf(L);')
     l(f'    luaL_newlib(L, {module_name}_funcs);')
 
     # Register enums
@@ -946,17 +1417,25 @@ def gen_luaopen(module_name, prefix, funcs, structs, enums, consts_ids):
     l('}')
 
 def pre_parse(inp):
-    global struct_types
-    global enum_types
+    """Index the module's types once so the type queries are dict lookups"""
     for decl in inp['decls']:
         kind = decl['kind']
-        if kind == 'struct':
-            struct_types.append(decl['name'])
+        name = decl.get('name')
+        if is_handle_decl(decl):
+            ctx.type_kinds[name] = 'handle'
+        elif kind == 'struct':
+            ctx.type_kinds[name] = 'struct'
+            ctx.struct_types.append(name)
+            ctx.struct_ptr_kinds[f'const {name}*'] = 'const'
+            ctx.struct_ptr_kinds[f'{name}*'] = 'mut'
+            if not decl['is_dep']:
+                ctx.local_struct_types.add(name)
         elif kind == 'enum':
-            enum_types.append(decl['name'])
+            ctx.type_kinds[name] = 'enum'
 
 def gen_module(inp, c_prefix, dep_prefixes):
-    pre_parse(inp)
+    with phase('pre_parse'):
+        pre_parse(inp)
     module_name = module_names[c_prefix]
     prefix = inp['prefix']
 
@@ -996,6 +1475,7 @@ def gen_module(inp, c_prefix, dep_prefixes):
     }.get(c_prefix, f'sokol_{module_name}.h')
 
     l(f'#include "{header_name}"')
+    l('#include "mane3d_bindings.h"')
     l('')
 
     l('#ifndef MANE3D_API')
@@ -1023,13 +1503,15 @@ def gen_module(inp, c_prefix, dep_prefixes):
         kind = decl['kind']
         if kind == 'func' and not check_ignore(decl['name']) and not is_callback_func(decl['name']):
             funcs.append(decl)
-        elif kind == 'struct':
+        elif kind == 'struct' and not is_handle_decl(decl):
             structs.append(decl)
         elif kind == 'enum':
             enums.append(decl)
         elif kind == 'consts':
             consts.append(decl)
 
+    gen_metatable_declarations()
+
     # Generate struct bindings
     for struct_decl in structs:
         gen_struct_bindings(struct_decl, prefix)
@@ -1038,6 +1520,12 @@ def gen_module(inp, c_prefix, dep_prefixes):
     for func_decl in funcs:
         gen_func_wrapper(func_decl, prefix)
 
+    # Generate call counters (MANE3D_BINDING_STATS builds)
+    gen_binding_stats(module_name, prefix, funcs)
+
+    # Generate the recorded command buffer
+    command_funcs = gen_command_buffer(funcs, prefix)
+
     # Generate enum registration functions
     for enum_decl in enums:
         gen_enum_constants(enum_decl, prefix)
@@ -1052,27 +1540,129 @@ def gen_module(inp, c_prefix, dep_prefixes):
     gen_metatable_registration(structs, prefix)
 
     # Generate luaopen function
-    gen_luaopen(module_name, prefix, funcs, structs, enums, consts_ids)
+    gen_luaopen(module_name, prefix, funcs, structs, enums, consts_ids, command_funcs)
+
+def get_stubs_dir(c_prefix):
+    """Per-module stub directory, so modules can be parsed concurrently"""
+    return f'{stubs_root}/{module_names[c_prefix]}'
 
 def get_csource_path(c_prefix):
-    return f'{stubs_root}/{c_source_names[c_prefix]}'
+    return f'{get_stubs_dir(c_prefix)}/{c_source_names[c_prefix]}'
 
-def create_stub_c_file(c_prefix, dep_prefixes):
-    """Create a stub .c file that includes the header for clang parsing"""
-    if c_prefix not in header_names:
-        return
-    header = header_names[c_prefix]
-    c_file = c_source_names[c_prefix]
+def get_stub_c_content(c_prefix, dep_prefixes):
+    """Source of the stub .c file that includes the header for clang parsing"""
     stub_content = ''
     # Include dependency headers first
     for dep_prefix in dep_prefixes:
         if dep_prefix in header_names:
             stub_content += f'#include "{header_names[dep_prefix]}"\n'
-    stub_content += f'#include "{header}"\n'
-    with open(f'{stubs_root}/{c_file}', 'w', newline='\n') as f:
-        f.write(stub_content)
+    stub_content += f'#include "{header_names[c_prefix]}"\n'
+    return stub_content
+
+def create_stub_c_file(c_prefix, dep_prefixes):
+    """Create a stub .c file that includes the header for clang parsing"""
+    if c_prefix not in header_names:
+        return
+    c_file = c_source_names[c_prefix]
+    with open(f'{get_stubs_dir(c_prefix)}/{c_file}', 'w', newline='\n') as f:
+        f.write(get_stub_c_content(c_prefix, dep_prefixes))
+
+# Bump to invalidate cached IR when its meaning changes without gen_ir.py changing
+# (2: util modules' keys now include their dependency headers)
+ir_cache_version = 2
+clang_version = None
+
+def get_clang_version():
+    """First line of `clang --version` (the compiler gen_ir runs), queried once"""
+    global clang_version
+    if clang_version is None:
+        try:
+            result = subprocess.run(['clang', '--version'], capture_output=True, text=True)
+            clang_version = result.stdout.splitlines()[0] if result.stdout else 'unknown'
+        except OSError:
+            clang_version = 'unknown'
+    return clang_version
+
+def get_ir_cache_key(c_header_path, dep_header_paths, c_prefix, dep_prefixes):
+    """Hash of everything the IR depends on: headers, stub source, clang and gen_ir versions"""
+    h = hashlib.sha256()
+    h.update(f'v{ir_cache_version}\0{c_prefix}\0{get_clang_version()}\0'.encode())
+    with open(gen_ir.__file__, 'rb') as f:
+        h.update(f.read())
+    h.update(get_stub_c_content(c_prefix, dep_prefixes).encode())
+    for path in [c_header_path] + dep_header_paths:
+        h.update(os.path.basename(path).encode() + b'\0')
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def load_cached_ir(module_name, key):
+    """IR stored for key, or None"""
+    path = f'{ir_cache_root}/{module_name}.json'
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry['ir'] if entry.get('key') == key else None
+
+def store_cached_ir(module_name, key, ir):
+    os.makedirs(ir_cache_root, exist_ok=True)
+    path = f'{ir_cache_root}/{module_name}.json'
+    with open(f'{path}.tmp', 'w', encoding='utf-8', newline='\n') as f:
+        json.dump({'key': key, 'ir': ir}, f)
+    os.replace(f'{path}.tmp', path)
+
+def get_dep_header_paths(c_prefix, dep_c_prefixes):
+    """Dependency headers of a module, resolved from the sokol root (util
+    headers live in a subdirectory, their dependencies do not)"""
+    paths = []
+    for dep_prefix in dep_c_prefixes:
+        if dep_prefix in header_paths:
+            path = f'{sokol_root}/{header_paths[dep_prefix]}'
+            if not os.path.exists(path):
+                raise FileNotFoundError(f'{path}: dependency header of {module_names[c_prefix]} not found')
+            paths.append(path)
+    return paths
+
+def gen_ir_cached(c_header_path, c_prefix, dep_c_prefixes):
+    """Run clang over the header (via gen_ir) unless the IR cache has it"""
+    module_name = module_names[c_prefix]
+    dep_header_paths = get_dep_header_paths(c_prefix, dep_c_prefixes)
+
+    key = None
+    if ir_cache_root:
+        key = get_ir_cache_key(c_header_path, dep_header_paths, c_prefix, dep_c_prefixes)
+        ir = load_cached_ir(module_name, key)
+        if ir is not None:
+            print(f'    (IR cache hit)')
+            return ir
+
+    # Copy header file to stubs dir for clang parsing
+    stubs_dir = get_stubs_dir(c_prefix)
+    if not os.path.isdir(stubs_dir):
+        os.makedirs(stubs_dir)
+    shutil.copyfile(c_header_path, f'{stubs_dir}/{os.path.basename(c_header_path)}')
+    # Copy dependency headers
+    for dep_header_path in dep_header_paths:
+        shutil.copyfile(dep_header_path, f'{stubs_dir}/{os.path.basename(dep_header_path)}')
+    # Create stub .c file for clang parsing
+    create_stub_c_file(c_prefix, dep_c_prefixes)
+    csource_path = os.path.abspath(get_csource_path(c_prefix))
+    # Change to stubs dir so gen_ir writes .json there
+    orig_dir = os.getcwd()
+    os.chdir(stubs_dir)
+    try:
+        ir = gen_ir.gen(c_header_path, csource_path, module_name, c_prefix, dep_c_prefixes)
+    finally:
+        os.chdir(orig_dir)
+
+    if key:
+        store_cached_ir(module_name, key, ir)
+    return ir
 
 types_root = f'{bindings_root}/gen/types'
+bench_root = f'{bindings_root}/gen/bench'
 
 def lua_type_from_c(type_str, prefix):
     """Convert C type to LuaCATS type annotation"""
@@ -1087,8 +1677,8 @@ def lua_type_from_c(type_str, prefix):
     elif util.is_string_ptr(type_str):
         return 'string'
     elif type_str == 'sg_range' or type_str == 'const sg_range *' or type_str == 'sg_range *':
-        return 'gfx.Range|string'
-    elif is_struct_type(type_str):
+        return 'gfx.Range|mane3d.buffer|string'
+    elif is_struct_type(type_str) or is_handle_type(type_str):
         module = module_names.get(get_type_prefix(type_str), 'sokol')
         struct_name = as_struct_metatable_name(type_str)
         return f'{module}.{struct_name}'
@@ -1137,6 +1727,14 @@ def gen_luacats_types(inp, prefix, module_name):
         elif kind == 'func' and not check_ignore(decl['name']):
             funcs.append(decl)
 
+    # Handle structs marshalled as integers are plain aliases
+    handles = [d for d in structs if is_handle_decl(d)]
+    structs = [d for d in structs if not is_handle_decl(d)]
+    for handle_decl in handles:
+        lines.append(f'---@alias {module_name}.{as_struct_metatable_name(handle_decl["name"])} integer')
+    if handles:
+        lines.append('')
+
     # Generate struct types first (so they're defined before being referenced)
     for struct_decl in structs:
         struct_name = as_struct_metatable_name(struct_decl['name'])
@@ -1145,20 +1743,61 @@ def gen_luacats_types(inp, prefix, module_name):
             field_name = field['name']
             field_type = field['type']
             lua_type = lua_type_from_c(field_type, prefix)
-            # Handle sg_range specially - can be string
+            # Handle sg_range specially - can be string or mane3d.buffer
             if field_type == 'sg_range':
-                lua_type = 'gfx.Range|string'
+                lua_type = 'gfx.Range|mane3d.buffer|string'
+            # Array fields read back as views and accept them on assignment
+            elif util.is_1d_array_type(field_type):
+                lua_type = f'{lua_type}|mane3d.ArrayView'
             lines.append(f'---@field {field_name}? {lua_type}')
+        # Methods are declared as functions so table literals need not provide them
+        class_name = f'{module_name}.{struct_name}'
+        lines.append(f'local {struct_name} = {{}}')
+        lines.append('---Zero every field')
+        lines.append(f'---@return {class_name}')
+        lines.append(f'function {struct_name}:reset() end')
+        lines.append('---Replace all fields as if constructed from t')
+        if struct_decl['name'] == 'sg_range':
+            lines.append(f'---@param t? {class_name}|mane3d.buffer|string')
+        else:
+            lines.append(f'---@param t? {class_name}')
+        lines.append(f'---@return {class_name}')
+        lines.append(f'function {struct_name}:assign(t) end')
+        lines.append('')
+
+    # Recorded command buffer, with one method per recordable call
+    command_funcs = get_command_funcs(funcs)
+    if command_funcs:
+        class_name = f'{module_name}.CommandBuffer'
+        lines.append('---Records calls and replays them all with one submit()')
+        lines.append(f'---@class {class_name}')
+        lines.append('---@operator len: integer')
+        lines.append('local CommandBuffer = {}')
+        for func_decl in command_funcs:
+            params = func_decl['params']
+            for param in params:
+                lines.append(f'---@param {param["name"]} {lua_type_from_c(param["type"], prefix)}')
+            param_names = ', '.join(p['name'] for p in params)
+            lines.append(f'function CommandBuffer:{as_snake_case(func_decl["name"], prefix)}({param_names}) end')
+        lines.append('---Replay all commands; uncached buffers are emptied afterwards')
+        lines.append('function CommandBuffer:submit() end')
+        lines.append('---Drop all commands')
+        lines.append('function CommandBuffer:reset() end')
+        lines.append('')
+        lines.append(f'---@class {module_name}.CommandBufferOptions')
+        lines.append('---@field cached? boolean keep commands across submits')
         lines.append('')
 
     # Define module class with struct constructors as fields
     lines.append(f'---@class {module_name}')
+    if command_funcs:
+        lines.append(f'---@field CommandBuffer fun(t?: {module_name}.CommandBufferOptions): {module_name}.CommandBuffer')
     for struct_decl in structs:
         c_struct_name = struct_decl['name']
         struct_name = as_struct_metatable_name(c_struct_name)
-        # sg_range can be initialized from string
+        # sg_range can be initialized from string or mane3d.buffer
         if c_struct_name == 'sg_range':
-            lines.append(f'---@field {struct_name} fun(t?: {module_name}.{struct_name}|string): {module_name}.{struct_name}')
+            lines.append(f'---@field {struct_name} fun(t?: {module_name}.{struct_name}|mane3d.buffer|string): {module_name}.{struct_name}')
         else:
             lines.append(f'---@field {struct_name} fun(t?: {module_name}.{struct_name}): {module_name}.{struct_name}')
     lines.append(f'local {module_name} = {{}}')
@@ -1220,48 +1859,121 @@ def gen_luacats_types(inp, prefix, module_name):
 
 def prepare():
     print('=== Generating Lua bindings:')
-    if not os.path.isdir(module_root):
-        os.makedirs(module_root)
     if not os.path.isdir(stubs_root):
         os.makedirs(stubs_root)
-    if not os.path.isdir(types_root):
-        os.makedirs(types_root)
 
 def gen(c_header_path, c_prefix, dep_c_prefixes):
     if c_prefix not in module_names:
         print(f'  >> warning: skipping generation for {c_prefix} prefix...')
-        return
-    reset_globals()
+        return None, {}
+    begin_module()
     print(f'  {c_header_path} => {module_names[c_prefix]}')
-    # Copy header file to stubs dir for clang parsing
-    shutil.copyfile(c_header_path, f'{stubs_root}/{os.path.basename(c_header_path)}')
-    # Copy dependency headers
-    for dep_prefix in dep_c_prefixes:
-        if dep_prefix in header_names:
-            dep_header = header_names[dep_prefix]
-            dep_header_path = c_header_path.replace(os.path.basename(c_header_path), dep_header)
-            if os.path.exists(dep_header_path):
-                shutil.copyfile(dep_header_path, f'{stubs_root}/{dep_header}')
-    # Create stub .c file for clang parsing
-    create_stub_c_file(c_prefix, dep_c_prefixes)
-    csource_path = os.path.abspath(get_csource_path(c_prefix))
     module_name = module_names[c_prefix]
-    # Change to stubs dir so gen_ir writes .json there
-    orig_dir = os.getcwd()
-    os.chdir(stubs_root)
-    ir = gen_ir.gen(c_header_path, csource_path, module_name, c_prefix, dep_c_prefixes)
-    os.chdir(orig_dir)
-    gen_module(ir, c_prefix, dep_c_prefixes)
-    with open(f"{module_root}/sokol_{module_name}.c", 'w', newline='\n') as f_outp:
-        f_outp.write(out_lines)
+    with phase('ir'):
+        ir = gen_ir_cached(c_header_path, c_prefix, dep_c_prefixes)
+    with phase('bindings'):
+        gen_module(ir, c_prefix, dep_c_prefixes)
     # Generate LuaCATS type definitions
     prefix = ir['prefix']
-    luacats_content = gen_luacats_types(ir, prefix, module_name)
-    types_sokol_dir = f"{types_root}/sokol"
-    if not os.path.isdir(types_sokol_dir):
-        os.makedirs(types_sokol_dir)
-    with open(f"{types_sokol_dir}/{module_name}.lua", 'w', newline='\n') as f_types:
-        f_types.write(luacats_content)
+    with phase('types'):
+        luacats_content = gen_luacats_types(ir, prefix, module_name)
+    # Written by the main process (see gen_all), which owns the output manifest
+    outputs = {
+        f'{module_root}/sokol_{module_name}.c': ctx.source(),
+        f'{types_root}/sokol/{module_name}.lua': luacats_content,
+    }
+    return ir, outputs
+
+def gen_dispatch_bench(structs):
+    """Generate a standalone C micro-benchmark comparing the old strcmp chain
+    against the generated length/character switch for every struct"""
+    lines = []
+    lines.append('/* machine generated, do not edit */')
+    lines.append('/* Field dispatch micro-benchmark: strcmp chain vs. length/character switch */')
+    lines.append('#include <stdio.h>')
+    lines.append('#include <string.h>')
+    lines.append('#include <time.h>')
+    lines.append('')
+    lines.append('#define ITERATIONS 20000')
+    lines.append('#define MAX_KEYS 256')
+    lines.append('')
+    lines.append('static volatile int sink;')
+    lines.append('')
+    cases = []
+    for decl in structs:
+        c_struct_name = decl['name']
+        names = get_struct_field_names([f for f in decl['fields'] if 'name' in f])
+        if not names:
+            continue
+        assert len(names) <= 256
+        cases.append(c_struct_name)
+        lines.append(f'static int old_{c_struct_name}_field(const char* key) {{')
+        for i, name in enumerate(names):
+            lines.append(f'    if (strcmp(key, "{name}") == 0) return {i};')
+        lines.append('    return -1;')
+        lines.append('}')
+        lines.append('')
+        lines += gen_field_lookup(f'new_{c_struct_name}_field', names)
+        lines.append('')
+        lines.append(f'static const char* const {c_struct_name}_keys[] = {{')
+        for name in names:
+            lines.append(f'    "{name}",')
+        lines.append('};')
+        lines.append('')
+    lines.append('typedef struct {')
+    lines.append('    const char* name;')
+    lines.append('    const char* const* keys;')
+    lines.append('    int count;')
+    lines.append('    int (*old_fn)(const char* key);')
+    lines.append('    int (*new_fn)(const char* key, size_t len);')
+    lines.append('} bench_case;')
+    lines.append('')
+    lines.append('static const bench_case cases[] = {')
+    for c_struct_name in cases:
+        lines.append(f'    {{"{c_struct_name}", {c_struct_name}_keys, '
+                     f'(int)(sizeof({c_struct_name}_keys) / sizeof({c_struct_name}_keys[0])), '
+                     f'old_{c_struct_name}_field, new_{c_struct_name}_field}},')
+    lines.append('};')
+    lines.append('')
+    lines.append('static double seconds(void) {')
+    lines.append('    return (double)clock() / (double)CLOCKS_PER_SEC;')
+    lines.append('}')
+    lines.append('')
+    lines.append('int main(void) {')
+    lines.append('    size_t lens[MAX_KEYS];')
+    lines.append('    double old_total = 0.0, new_total = 0.0;')
+    lines.append('    long long lookups_total = 0;')
+    lines.append('    printf("%-32s %6s %12s %12s\\n", "struct", "fields", "strcmp ns", "switch ns");')
+    lines.append('    for (size_t c = 0; c < sizeof(cases) / sizeof(cases[0]); c++) {')
+    lines.append('        const bench_case* bc = &cases[c];')
+    lines.append('        for (int k = 0; k < bc->count; k++) {')
+    lines.append('            lens[k] = strlen(bc->keys[k]);')
+    lines.append('            if (bc->old_fn(bc->keys[k]) != k || bc->new_fn(bc->keys[k], lens[k]) != k) {')
+    lines.append('                fprintf(stderr, "dispatch mismatch: %s.%s\\n", bc->name, bc->keys[k]);')
+    lines.append('                return 1;')
+    lines.append('            }')
+    lines.append('        }')
+    lines.append('        double t0 = seconds();')
+    lines.append('        for (int it = 0; it < ITERATIONS; it++) {')
+    lines.append('            for (int k = 0; k < bc->count; k++) sink += bc->old_fn(bc->keys[k]);')
+    lines.append('        }')
+    lines.append('        double t1 = seconds();')
+    lines.append('        for (int it = 0; it < ITERATIONS; it++) {')
+    lines.append('            for (int k = 0; k < bc->count; k++) sink += bc->new_fn(bc->keys[k], lens[k]);')
+    lines.append('        }')
+    lines.append('        double t2 = seconds();')
+    lines.append('        double lookups = (double)ITERATIONS * (double)bc->count;')
+    lines.append('        printf("%-32s %6d %12.2f %12.2f\\n", bc->name, bc->count,')
+    lines.append('               (t1 - t0) * 1e9 / lookups, (t2 - t1) * 1e9 / lookups);')
+    lines.append('        old_total += t1 - t0;')
+    lines.append('        new_total += t2 - t1;')
+    lines.append('        lookups_total += (long long)ITERATIONS * bc->count;')
+    lines.append('    }')
+    lines.append('    printf("%-32s %6s %12.2f %12.2f\\n", "average", "",')
+    lines.append('           old_total * 1e9 / (double)lookups_total, new_total * 1e9 / (double)lookups_total);')
+    lines.append('    return 0;')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
 
 module_deps = {
     'slog_':    [],
@@ -1275,9 +1987,64 @@ module_deps = {
     'sglue_':   ['slog_', 'sg_', 'sapp_'],
 }
 
+timing_phases = ['ir', 'pre_parse', 'bindings', 'types', 'write']
+
+def gen_worker(c_prefix):
+    """Generate one module in a pool worker; returns its IR, generated files,
+    console output and phase timings"""
+    header_path = header_paths.get(c_prefix)
+    deps = module_deps.get(c_prefix, [])
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        ir, outputs = gen(f'{sokol_root}/{header_path}', c_prefix, deps)
+    return ir, outputs, log.getvalue(), ctx.timings
+
+def print_timings(timings, wall):
+    """Print the per-module phase timings collected by gen_all()"""
+    print('=== Generation timings (ms):')
+    print(f'  {"module":<10}' + ''.join(f'{p:>10}' for p in timing_phases) + f'{"total":>10}')
+    totals = dict.fromkeys(timing_phases, 0.0)
+    for c_prefix, t in timings.items():
+        for p in timing_phases:
+            totals[p] += t.get(p, 0.0)
+        row = ''.join(f'{t.get(p, 0.0) * 1000:>10.1f}' for p in timing_phases)
+        print(f'  {module_names[c_prefix]:<10}{row}{sum(t.values()) * 1000:>10.1f}')
+    row = ''.join(f'{totals[p] * 1000:>10.1f}' for p in timing_phases)
+    print(f'  {"all":<10}{row}{sum(totals.values()) * 1000:>10.1f}')
+    print(f'  wall time: {wall * 1000:.1f} ms')
+
+def gen_all(jobs, writer):
+    """Generate every module, in parallel when jobs > 1, and write the files that
+    changed. Output does not depend on jobs."""
+    start = time.perf_counter()
+    prefixes = list(module_names)
+    if jobs > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(prefixes))) as pool:
+            results = list(pool.map(gen_worker, prefixes))
+    else:
+        results = [gen_worker(prefix) for prefix in prefixes]
+    irs = []
+    timings = {}
+    for c_prefix, (ir, outputs, log, module_timings) in zip(prefixes, results):
+        sys.stdout.write(log)
+        irs.append(ir)
+        start_write = time.perf_counter()
+        for path, content in outputs.items():
+            writer.write(path, content)
+        if ir:
+            module_timings['write'] = time.perf_counter() - start_write
+            timings[c_prefix] = module_timings
+    if args.timings:
+        print_timings(timings, time.perf_counter() - start)
+    return irs
+
 if __name__ == '__main__':
     prepare()
-    for prefix in module_names:
-        header_path = header_paths.get(prefix)
-        deps = module_deps.get(prefix, [])
-        gen(f'{sokol_root}/{header_path}', prefix, deps)
+    writer = gen_output.OutputWriter(bindings_root, 'gen_lua')
+    bench_structs = []
+    for ir in gen_all(args.jobs, writer):
+        if ir:
+            bench_structs += [d for d in ir['decls']
+                              if d['kind'] == 'struct' and not d['is_dep'] and not is_handle_decl(d)]
+    writer.write(f'{bench_root}/field_dispatch.c', gen_dispatch_bench(bench_structs))
+    writer.finish()
@@ -0,0 +1,87 @@
+#-------------------------------------------------------------------------------
+#   gen_output.py
+#
+#   Write-if-changed output layer shared by the code generators.
+#
+#   Every generator records the files it produced in a manifest
+#   (gen/manifests/<generator>.json) with their sha256, size and mtime.
+#   A file is only rewritten when its content changed, so regenerating
+#   without changes leaves the timestamps alone and the build system has
+#   nothing to recompile. The manifest itself is rewritten on every run and
+#   serves as the build stamp of the generator.
+#-------------------------------------------------------------------------------
+import hashlib, json, os
+
+class OutputWriter:
+    def __init__(self, root_dir, generator):
+        self.root_dir = os.path.abspath(root_dir)
+        self.manifest_path = os.path.join(self.root_dir, 'gen', 'manifests', f'{generator}.json')
+        self.previous = self._load_manifest()
+        self.outputs = {}
+        self.written = []
+        self.unchanged = []
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('outputs', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root_dir).replace(os.sep, '/')
+
+    def _is_current(self, path, entry, data, digest):
+        """True if the file on disk already holds data"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != len(data):
+            return False
+        # Untouched since the last run: trust the recorded hash
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return entry['sha256'] == digest
+        with open(path, 'rb') as f:
+            return f.read() == data
+
+    def write(self, path, content):
+        """Write content (str, written as UTF-8 with '\\n' newlines) to path
+        unless the file already holds it. Returns True if the file was written."""
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        digest = hashlib.sha256(data).hexdigest()
+        key = self._key(path)
+        changed = not self._is_current(path, self.previous.get(key), data, digest)
+        if changed:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+            self.written.append(key)
+        else:
+            self.unchanged.append(key)
+        st = os.stat(path)
+        self.outputs[key] = {'sha256': digest, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        return changed
+
+    def _output_roots(self):
+        """Directories this run wrote to"""
+        return {os.path.dirname(os.path.normpath(os.path.join(self.root_dir, key))) for key in self.outputs}
+
+    def finish(self):
+        """Remove outputs of the previous run that were not produced again and
+        write the manifest. Only files under the directories written by this
+        run are stale: a previous run to other output paths (gen_imgui or
+        gen_licenses with another output argument) keeps its files."""
+        roots = self._output_roots()
+        for key in sorted(set(self.previous) - set(self.outputs)):
+            path = os.path.normpath(os.path.join(self.root_dir, key))
+            if not any(os.path.commonpath([path, root]) == root for root in roots):
+                continue
+            if os.path.isfile(path):
+                os.remove(path)
+                print(f'  removed stale {key}')
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        with open(self.manifest_path, 'w', encoding='utf-8', newline='\n') as f:
+            json.dump({'outputs': self.outputs}, f, indent=1, sort_keys=True)
+            f.write('\n')
+        print(f'  {len(self.written)} file(s) written, {len(self.unchanged)} unchanged')
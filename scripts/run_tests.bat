@@ -48,6 +48,23 @@ for %%s in (
     )
 )
 
+REM mane3d.buffer, sokol.audio_stream, mane3d.mixer and mane3d.wav tests (standalone runner with a fake sokol_audio)
+set AUDIO_TEST=%BUILD_DIR%\mane3d-test-audio.exe
+echo ----------------------------------------
+echo Testing: mane3d-test-audio
+if exist "%AUDIO_TEST%" (
+    "%AUDIO_TEST%" tests\test_buffer.lua tests\test_audio_stream.lua tests\test_mixer.lua tests\test_wav.lua
+    set EC=!errorlevel!
+    if !EC! equ 0 (
+        set /a PASSED+=1
+    ) else (
+        echo FAILED with exit code: !EC!
+        set /a FAILED+=1
+    )
+) else (
+    echo Skipped ^(not built^): mane3d-test-audio
+)
+
 echo.
 echo ========================================
 echo Results: %PASSED% passed, %FAILED% failed
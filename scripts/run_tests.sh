@@ -52,6 +52,25 @@ for script in "${EXAMPLES[@]}"; do
     fi
 done
 
+# mane3d.buffer, sokol.audio_stream, mane3d.mixer and mane3d.wav tests (standalone runner with a fake sokol_audio)
+AUDIO_TEST=""
+if [ -f "$BUILD_DIR/mane3d-test-audio.exe" ]; then
+    AUDIO_TEST="$BUILD_DIR/mane3d-test-audio.exe"
+elif [ -f "$BUILD_DIR/mane3d-test-audio" ]; then
+    AUDIO_TEST="$BUILD_DIR/mane3d-test-audio"
+fi
+echo "----------------------------------------"
+echo "Testing: mane3d-test-audio"
+if [ -z "$AUDIO_TEST" ]; then
+    echo "Skipped (not built): mane3d-test-audio"
+    ((SKIPPED++)) || true
+elif "$AUDIO_TEST" tests/test_buffer.lua tests/test_audio_stream.lua tests/test_mixer.lua tests/test_wav.lua; then
+    ((PASSED++)) || true
+else
+    echo "FAILED with exit code: $?"
+    ((FAILED++)) || true
+fi
+
 echo ""
 echo "========================================"
 echo "Results: $PASSED passed, $FAILED failed, $SKIPPED skipped"
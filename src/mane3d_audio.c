@@ -0,0 +1,812 @@
+/*
+ * mane3d_audio.c - Lock-free audio streaming (sokol.audio_stream)
+ *
+ * Sets up sokol_audio with a C stream callback that drains a ring of
+ * interleaved float samples. Lua fills the ring from the main thread, so
+ * the audio thread never runs Lua code or waits on the GC:
+ *
+ *   local stream = require("sokol.audio_stream")
+ *   stream.setup({ sample_rate = 44100, num_channels = 1 })
+ *   -- every frame:
+ *   local n = stream.space()
+ *   if n > 0 then stream.push(render(n)) end
+ *
+ * Samples the audio thread needs but Lua has not pushed yet are played as
+ * silence (an underrun); samples pushed while the ring is full are dropped
+ * (an overrun). stream.stats() counts both.
+ *
+ * mane3d.mixer plays sounds on top of the stream: Lua only sends play/stop
+ * commands through a second lock-free queue, and the stream callback
+ * mixes, resamples and clips the voices:
+ *
+ *   local mixer = require("mane3d.mixer")
+ *   local hit = mixer.load_pcm(samples, { sample_rate = 22050 })
+ *   mixer.play(hit, { volume = 0.7, pitch = 1.2 })
+ *   mixer.set_bgm(music, { volume = 0.5 })
+ */
+#include "mane3d_bindings.h"
+
+#include "sokol_audio.h"
+#include "sokol_log.h"
+
+#include <stdlib.h>
+#include <string.h>
+
+/* head/tail are shared between the main and audio thread: publish with
+ * release stores, observe with acquire loads */
+#if defined(_MSC_VER) && !defined(__clang__)
+#include <intrin.h>
+static uint32_t load_acquire(const uint32_t *p)
+{
+    return (uint32_t)_InterlockedOr((volatile long *)p, 0);
+}
+static void store_release(uint32_t *p, uint32_t v)
+{
+    _InterlockedExchange((volatile long *)p, (long)v);
+}
+static void add_relaxed(uint32_t *p, uint32_t v)
+{
+    _InterlockedExchangeAdd((volatile long *)p, (long)v);
+}
+#else
+static uint32_t load_acquire(const uint32_t *p)
+{
+    return __atomic_load_n(p, __ATOMIC_ACQUIRE);
+}
+static void store_release(uint32_t *p, uint32_t v)
+{
+    __atomic_store_n(p, v, __ATOMIC_RELEASE);
+}
+static void add_relaxed(uint32_t *p, uint32_t v)
+{
+    __atomic_fetch_add(p, v, __ATOMIC_RELAXED);
+}
+#endif
+
+int mane3d_ring_init(mane3d_ring *r, uint32_t min_capacity)
+{
+    uint32_t cap = 64;
+    while (cap < min_capacity)
+        cap *= 2;
+    memset(r, 0, sizeof(*r));
+    r->data = (float *)calloc(cap, sizeof(float));
+    if (r->data == NULL)
+        return 0;
+    r->capacity = cap;
+    return 1;
+}
+
+void mane3d_ring_free(mane3d_ring *r)
+{
+    free(r->data);
+    memset(r, 0, sizeof(*r));
+}
+
+/* head and tail run freely and wrap at 2^32; capacity divides 2^32, so
+ * head - tail is the queued count and (i & (capacity - 1)) the slot */
+uint32_t mane3d_ring_count(const mane3d_ring *r)
+{
+    return load_acquire(&r->head) - load_acquire(&r->tail);
+}
+
+uint32_t mane3d_ring_space(const mane3d_ring *r)
+{
+    return r->capacity - mane3d_ring_count(r);
+}
+
+uint32_t mane3d_ring_write(mane3d_ring *r, const float *src, uint32_t n)
+{
+    uint32_t head = r->head;
+    uint32_t space = r->capacity - (head - load_acquire(&r->tail));
+    if (n > space)
+        n = space;
+    uint32_t i = head & (r->capacity - 1);
+    uint32_t first = r->capacity - i < n ? r->capacity - i : n;
+    memcpy(r->data + i, src, first * sizeof(float));
+    memcpy(r->data, src + first, (n - first) * sizeof(float));
+    store_release(&r->head, head + n);
+    return n;
+}
+
+uint32_t mane3d_ring_read(mane3d_ring *r, float *dst, uint32_t n)
+{
+    uint32_t tail = r->tail;
+    uint32_t count = load_acquire(&r->head) - tail;
+    if (n > count)
+        n = count;
+    uint32_t i = tail & (r->capacity - 1);
+    uint32_t first = r->capacity - i < n ? r->capacity - i : n;
+    memcpy(dst, r->data + i, first * sizeof(float));
+    memcpy(dst + first, r->data, (n - first) * sizeof(float));
+    store_release(&r->tail, tail + n);
+    return n;
+}
+
+/*
+ * Mixer
+ *
+ * Sounds are immutable once loaded; the audio thread only reads them.
+ * unload() frees a sound once the audio thread has processed the command
+ * that stopped its voices.
+ */
+#define MIXER_VOICES 32
+#define MIXER_BGM 0 /* voice slot reserved for set_bgm() */
+#define MIXER_COMMANDS 256
+#define FIX_ONE 4294967296.0 /* 32.32 fixed point play positions */
+
+typedef struct mixer_sound {
+    float *data; /* interleaved */
+    uint32_t frames;
+    int channels;
+    int sample_rate;
+    uint32_t unload_seq; /* command that stopped it, 0 while loaded */
+} mixer_sound;
+
+typedef struct mixer_voice {
+    const mixer_sound *sound; /* NULL when idle */
+    uint32_t id;
+    uint64_t pos;
+    float volume;
+    float pitch;
+    int loop;
+} mixer_voice;
+
+enum { CMD_PLAY, CMD_STOP, CMD_STOP_ALL, CMD_SET_BGM, CMD_STOP_SOUND };
+
+typedef struct mixer_cmd {
+    int op;
+    uint32_t seq;
+    uint32_t voice;
+    const mixer_sound *sound;
+    float volume;
+    float pitch;
+    int loop;
+} mixer_cmd;
+
+static struct {
+    /* main thread */
+    mixer_sound **sounds; /* by handle - 1 */
+    int num_sounds;
+    uint32_t next_voice;
+    uint32_t seq;
+    uint32_t dropped;
+    /* queue: cmd_head advanced by the main thread, cmd_tail by the audio thread */
+    mixer_cmd cmds[MIXER_COMMANDS];
+    uint32_t cmd_head;
+    uint32_t cmd_tail;
+    uint32_t done_seq; /* last command applied (audio thread) */
+    uint32_t active;   /* voices playing (audio thread) */
+    /* audio thread */
+    mixer_voice voices[MIXER_VOICES];
+} g_mixer;
+
+static void mixer_stop_sound(const mixer_sound *sound)
+{
+    for (int i = 0; i < MIXER_VOICES; i++) {
+        if (g_mixer.voices[i].sound == sound)
+            g_mixer.voices[i].sound = NULL;
+    }
+}
+
+static void mixer_apply(const mixer_cmd *c)
+{
+    mixer_voice *v = NULL;
+    switch (c->op) {
+    case CMD_PLAY:
+        /* a free voice, or steal the oldest */
+        for (int i = MIXER_BGM + 1; i < MIXER_VOICES; i++) {
+            mixer_voice *cand = &g_mixer.voices[i];
+            if (cand->sound == NULL) {
+                v = cand;
+                break;
+            }
+            if (v == NULL || (int32_t)(cand->id - v->id) < 0)
+                v = cand;
+        }
+        break;
+    case CMD_STOP:
+        /* the music voice has no play() id; only set_bgm() stops it */
+        for (int i = MIXER_BGM + 1; i < MIXER_VOICES; i++) {
+            if (g_mixer.voices[i].sound && g_mixer.voices[i].id == c->voice)
+                g_mixer.voices[i].sound = NULL;
+        }
+        return;
+    case CMD_STOP_ALL:
+        for (int i = 0; i < MIXER_VOICES; i++)
+            g_mixer.voices[i].sound = NULL;
+        return;
+    case CMD_STOP_SOUND:
+        mixer_stop_sound(c->sound);
+        return;
+    case CMD_SET_BGM:
+        v = &g_mixer.voices[MIXER_BGM];
+        if (v->sound == c->sound && v->sound != NULL) {
+            /* already playing: keep the position */
+            v->volume = c->volume;
+            v->pitch = c->pitch;
+            return;
+        }
+        break;
+    }
+    v->sound = c->sound;
+    v->id = c->voice;
+    v->pos = 0;
+    v->volume = c->volume;
+    v->pitch = c->pitch;
+    v->loop = c->loop;
+}
+
+/* Add voice v to out (interleaved, och channels). Returns 0 once it ended. */
+static int mixer_voice_mix(mixer_voice *v, float *out, int frames, int och, int out_rate)
+{
+    const mixer_sound *s = v->sound;
+    const int sch = s->channels;
+    const uint64_t end = (uint64_t)s->frames << 32;
+    const uint64_t step = (uint64_t)((double)v->pitch * s->sample_rate / out_rate * FIX_ONE);
+    const float vol = v->volume;
+    if (s->frames == 0 || step == 0)
+        return 0;
+    int i = 0;
+    while (i < frames) {
+        if (v->pos >= end) {
+            if (!v->loop)
+                return 0;
+            v->pos %= end;
+        }
+        uint32_t idx = (uint32_t)(v->pos >> 32);
+        if (step == (uint64_t)1 << 32 && sch == och) {
+            /* same rate and layout: a straight multiply-add over the run
+             * up to the end of the sound, which the compiler vectorizes */
+            uint32_t run = s->frames - idx;
+            if (run > (uint32_t)(frames - i))
+                run = (uint32_t)(frames - i);
+            const float *src = s->data + (size_t)idx * sch;
+            float *dst = out + (size_t)i * och;
+            for (uint32_t k = 0; k < run * (uint32_t)och; k++)
+                dst[k] += vol * src[k];
+            v->pos += (uint64_t)run << 32;
+            i += (int)run;
+            continue;
+        }
+        /* resample with linear interpolation */
+        uint32_t next = idx + 1 < s->frames ? idx + 1 : (v->loop ? 0 : idx);
+        const float *a = s->data + (size_t)idx * sch;
+        const float *b = s->data + (size_t)next * sch;
+        float t = (float)((uint32_t)v->pos * (1.0 / FIX_ONE));
+        float *dst = out + (size_t)i * och;
+        if (sch == och) {
+            for (int c = 0; c < och; c++)
+                dst[c] += vol * (a[c] + (b[c] - a[c]) * t);
+        } else {
+            /* mono to all channels, anything else downmixed to mono first */
+            float x = 0.0f;
+            for (int c = 0; c < sch; c++)
+                x += a[c] + (b[c] - a[c]) * t;
+            x *= vol / (float)sch;
+            for (int c = 0; c < och; c++)
+                dst[c] += x;
+        }
+        v->pos += step;
+        i++;
+    }
+    return 1;
+}
+
+/* Audio thread: apply queued commands, mix every voice into out and clip */
+static void mixer_run(float *out, int frames, int channels, int out_rate)
+{
+    uint32_t tail = g_mixer.cmd_tail;
+    uint32_t head = load_acquire(&g_mixer.cmd_head);
+    if (tail != head) {
+        uint32_t seq = 0;
+        for (; tail != head; tail++) {
+            const mixer_cmd *c = &g_mixer.cmds[tail & (MIXER_COMMANDS - 1)];
+            mixer_apply(c);
+            seq = c->seq;
+        }
+        store_release(&g_mixer.cmd_tail, tail);
+        store_release(&g_mixer.done_seq, seq);
+    }
+    uint32_t active = 0;
+    int mixed = 0;
+    for (int i = 0; i < MIXER_VOICES; i++) {
+        mixer_voice *v = &g_mixer.voices[i];
+        if (v->sound == NULL)
+            continue;
+        mixed = 1;
+        if (mixer_voice_mix(v, out, frames, channels, out_rate))
+            active++;
+        else
+            v->sound = NULL;
+    }
+    store_release(&g_mixer.active, active);
+    /* voices that ended during this callback still added to out */
+    if (mixed) {
+        int n = frames * channels;
+        for (int i = 0; i < n; i++)
+            out[i] = out[i] > 1.0f ? 1.0f : (out[i] < -1.0f ? -1.0f : out[i]);
+    }
+}
+
+static struct {
+    mane3d_ring ring;
+    int channels;
+    int running;
+    uint32_t sample_rate;    /* of the device, read by the audio thread */
+    uint32_t primed;         /* set by the first push: silence before it is no underrun */
+    uint32_t underruns;      /* callbacks that ran dry (audio thread) */
+    uint32_t underrun_frames;
+    uint32_t overruns;       /* pushes that did not fit (main thread) */
+    uint32_t overrun_frames;
+} g_stream;
+
+/* Audio thread: never blocks, never calls into Lua */
+static void stream_cb(float *buffer, int num_frames, int num_channels)
+{
+    uint32_t n = (uint32_t)(num_frames * num_channels);
+    uint32_t got = mane3d_ring_read(&g_stream.ring, buffer, n);
+    if (got < n) {
+        memset(buffer + got, 0, (n - got) * sizeof(float));
+        if (load_acquire(&g_stream.primed)) {
+            add_relaxed(&g_stream.underruns, 1);
+            add_relaxed(&g_stream.underrun_frames, (n - got) / (uint32_t)num_channels);
+        }
+    }
+    mixer_run(buffer, num_frames, num_channels, (int)load_acquire(&g_stream.sample_rate));
+}
+
+static int field_int(lua_State *L, int idx, const char *name, int def)
+{
+    if (lua_isnoneornil(L, idx))
+        return def;
+    lua_getfield(L, idx, name);
+    int v = (int)luaL_optinteger(L, -1, def);
+    lua_pop(L, 1);
+    return v;
+}
+
+static float field_float(lua_State *L, int idx, const char *name, float def)
+{
+    if (lua_isnoneornil(L, idx))
+        return def;
+    lua_getfield(L, idx, name);
+    float v = (float)luaL_optnumber(L, -1, def);
+    lua_pop(L, 1);
+    return v;
+}
+
+static int field_bool(lua_State *L, int idx, const char *name)
+{
+    if (lua_isnoneornil(L, idx))
+        return 0;
+    lua_getfield(L, idx, name);
+    int v = lua_toboolean(L, -1);
+    lua_pop(L, 1);
+    return v;
+}
+
+static void mixer_reset(void);
+
+static void stream_shutdown(void)
+{
+    if (g_stream.running) {
+        /* joins the audio thread, so the ring is no longer read after this */
+        saudio_shutdown();
+        g_stream.running = 0;
+    }
+    mane3d_ring_free(&g_stream.ring);
+    mixer_reset();
+}
+
+/* stream.setup({ sample_rate, num_channels, buffer_frames, packet_frames,
+ * num_packets, ring_frames }) starts sokol_audio in streaming mode.
+ * ring_frames (default 4 * buffer_frames) bounds how far ahead Lua can
+ * push. Returns saudio_isvalid(). */
+static int l_stream_setup(lua_State *L)
+{
+    lua_settop(L, 1);
+    if (lua_isnil(L, 1)) {
+        lua_newtable(L);
+        lua_replace(L, 1);
+    }
+    luaL_checktype(L, 1, LUA_TTABLE);
+    stream_shutdown();
+
+    saudio_desc desc;
+    memset(&desc, 0, sizeof(desc));
+    desc.sample_rate = field_int(L, 1, "sample_rate", 0);
+    desc.num_channels = field_int(L, 1, "num_channels", 1);
+    desc.buffer_frames = field_int(L, 1, "buffer_frames", 0);
+    desc.packet_frames = field_int(L, 1, "packet_frames", 0);
+    desc.num_packets = field_int(L, 1, "num_packets", 0);
+    int ring_frames = field_int(L, 1, "ring_frames", 4 * (desc.buffer_frames ? desc.buffer_frames : 2048));
+    luaL_argcheck(L, desc.num_channels > 0 && desc.num_channels <= 16, 1, "num_channels must be 1..16");
+    luaL_argcheck(L, ring_frames > 0, 1, "ring_frames must be positive");
+
+    memset(&g_stream, 0, sizeof(g_stream));
+    if (!mane3d_ring_init(&g_stream.ring, (uint32_t)ring_frames * (uint32_t)desc.num_channels))
+        return luaL_error(L, "audio_stream: out of memory");
+    g_stream.channels = desc.num_channels;
+    g_stream.sample_rate = (uint32_t)(desc.sample_rate ? desc.sample_rate : 44100);
+
+    desc.stream_cb = stream_cb;
+    desc.logger.func = slog_func;
+    saudio_setup(&desc);
+    g_stream.running = saudio_isvalid();
+    if (g_stream.running) {
+        g_stream.channels = saudio_channels();
+        store_release(&g_stream.sample_rate, (uint32_t)saudio_sample_rate());
+    }
+    lua_pushboolean(L, g_stream.running);
+    return 1;
+}
+
+static int l_stream_shutdown(lua_State *L)
+{
+    (void)L;
+    stream_shutdown();
+    return 0;
+}
+
+/* Queue as many whole frames of src as fit, returns the samples queued */
+static uint32_t push_samples(const float *src, uint32_t n)
+{
+    uint32_t ch = (uint32_t)g_stream.channels;
+    uint32_t space = mane3d_ring_space(&g_stream.ring);
+    if (n > space)
+        n = space;
+    n -= n % ch;
+    return mane3d_ring_write(&g_stream.ring, src, n);
+}
+
+/* stream.push(samples) queues interleaved samples: an f32 mane3d.buffer,
+ * a string of packed floats or a table of numbers. Returns the frames
+ * queued; the rest did not fit and was dropped. */
+static int l_stream_push(lua_State *L)
+{
+    if (g_stream.ring.data == NULL)
+        return luaL_error(L, "audio_stream: push() before setup()");
+    uint32_t ch = (uint32_t)g_stream.channels;
+    uint32_t total, pushed = 0;
+    float chunk[256];
+    uint32_t step = 256 - 256 % ch; /* whole frames per chunk */
+    size_t count;
+    const float *floats = mane3d_buffer_tofloats(L, 1, &count);
+    if (floats != NULL) {
+        total = (uint32_t)count;
+        pushed = push_samples(floats, total);
+    } else if (lua_type(L, 1) == LUA_TSTRING) {
+        size_t size;
+        const char *s = lua_tolstring(L, 1, &size);
+        luaL_argcheck(L, size % sizeof(float) == 0, 1, "string size is not a multiple of 4");
+        total = (uint32_t)(size / sizeof(float));
+        /* the string is not necessarily float aligned */
+        while (pushed < total) {
+            uint32_t n = total - pushed < step ? total - pushed : step;
+            memcpy(chunk, s + (size_t)pushed * sizeof(float), n * sizeof(float));
+            uint32_t got = push_samples(chunk, n);
+            pushed += got;
+            if (got < n)
+                break;
+        }
+    } else {
+        luaL_checktype(L, 1, LUA_TTABLE);
+        total = (uint32_t)luaL_len(L, 1);
+        while (pushed < total) {
+            uint32_t n = total - pushed < step ? total - pushed : step;
+            for (uint32_t i = 0; i < n; i++) {
+                lua_rawgeti(L, 1, (lua_Integer)(pushed + i + 1));
+                chunk[i] = (float)lua_tonumber(L, -1);
+                lua_pop(L, 1);
+            }
+            uint32_t got = push_samples(chunk, n);
+            pushed += got;
+            if (got < n)
+                break;
+        }
+    }
+    total -= total % ch;
+    if (pushed < total) {
+        g_stream.overruns++;
+        g_stream.overrun_frames += (total - pushed) / ch;
+    }
+    if (pushed > 0)
+        store_release(&g_stream.primed, 1);
+    lua_pushinteger(L, pushed / ch);
+    return 1;
+}
+
+/* Frames that can be pushed without an overrun */
+static int l_stream_space(lua_State *L)
+{
+    uint32_t space = g_stream.ring.data ? mane3d_ring_space(&g_stream.ring) : 0;
+    lua_pushinteger(L, g_stream.channels ? space / (uint32_t)g_stream.channels : 0);
+    return 1;
+}
+
+/* Frames pushed but not played yet */
+static int l_stream_queued(lua_State *L)
+{
+    uint32_t count = g_stream.ring.data ? mane3d_ring_count(&g_stream.ring) : 0;
+    lua_pushinteger(L, g_stream.channels ? count / (uint32_t)g_stream.channels : 0);
+    return 1;
+}
+
+static int l_stream_channels(lua_State *L)
+{
+    lua_pushinteger(L, g_stream.channels);
+    return 1;
+}
+
+/* Returns { underruns, underrun_frames, overruns, overrun_frames } since setup/reset_stats() */
+static int l_stream_stats(lua_State *L)
+{
+    lua_createtable(L, 0, 4);
+    lua_pushinteger(L, load_acquire(&g_stream.underruns));
+    lua_setfield(L, -2, "underruns");
+    lua_pushinteger(L, load_acquire(&g_stream.underrun_frames));
+    lua_setfield(L, -2, "underrun_frames");
+    lua_pushinteger(L, g_stream.overruns);
+    lua_setfield(L, -2, "overruns");
+    lua_pushinteger(L, g_stream.overrun_frames);
+    lua_setfield(L, -2, "overrun_frames");
+    return 1;
+}
+
+static int l_stream_reset_stats(lua_State *L)
+{
+    (void)L;
+    store_release(&g_stream.underruns, 0);
+    store_release(&g_stream.underrun_frames, 0);
+    g_stream.overruns = 0;
+    g_stream.overrun_frames = 0;
+    return 0;
+}
+
+static const luaL_Reg stream_funcs[] = {
+    {"setup", l_stream_setup},
+    {"shutdown", l_stream_shutdown},
+    {"push", l_stream_push},
+    {"space", l_stream_space},
+    {"queued", l_stream_queued},
+    {"channels", l_stream_channels},
+    {"stats", l_stream_stats},
+    {"reset_stats", l_stream_reset_stats},
+    {NULL, NULL}
+};
+
+int luaopen_sokol_audio_stream(lua_State *L)
+{
+    luaL_newlib(L, stream_funcs);
+    return 1;
+}
+
+/* Free the sounds whose unload command the audio thread has processed */
+static void mixer_collect(void)
+{
+    uint32_t done = load_acquire(&g_mixer.done_seq);
+    for (int i = 0; i < g_mixer.num_sounds; i++) {
+        mixer_sound *s = g_mixer.sounds[i];
+        if (s && s->unload_seq && (int32_t)(done - s->unload_seq) >= 0) {
+            free(s->data);
+            free(s);
+            g_mixer.sounds[i] = NULL;
+        }
+    }
+}
+
+/* Main thread, with the audio thread stopped: drop every voice and command */
+static void mixer_reset(void)
+{
+    memset(g_mixer.voices, 0, sizeof(g_mixer.voices));
+    g_mixer.cmd_tail = g_mixer.cmd_head;
+    g_mixer.done_seq = g_mixer.seq;
+    g_mixer.active = 0;
+    mixer_collect();
+}
+
+/* Queue a command for the audio thread; returns its sequence number, 0 if
+ * the queue is full. Without a running stream there is no audio thread and
+ * the command is applied right away. */
+static uint32_t mixer_send(mixer_cmd *c)
+{
+    mixer_collect();
+    uint32_t head = g_mixer.cmd_head;
+    if (head - load_acquire(&g_mixer.cmd_tail) == MIXER_COMMANDS) {
+        g_mixer.dropped++;
+        return 0;
+    }
+    c->seq = ++g_mixer.seq;
+    if (c->seq == 0) /* 0 means "not unloading" */
+        c->seq = ++g_mixer.seq;
+    g_mixer.cmds[head & (MIXER_COMMANDS - 1)] = *c;
+    store_release(&g_mixer.cmd_head, head + 1);
+    if (!g_stream.running) {
+        for (; g_mixer.cmd_tail != g_mixer.cmd_head; g_mixer.cmd_tail++)
+            mixer_apply(&g_mixer.cmds[g_mixer.cmd_tail & (MIXER_COMMANDS - 1)]);
+        g_mixer.done_seq = c->seq;
+    }
+    return c->seq;
+}
+
+static mixer_sound *check_sound(lua_State *L, int idx)
+{
+    lua_Integer h = luaL_checkinteger(L, idx);
+    mixer_sound *s = (h >= 1 && h <= g_mixer.num_sounds) ? g_mixer.sounds[h - 1] : NULL;
+    luaL_argcheck(L, s != NULL && s->unload_seq == 0, idx, "invalid sound handle");
+    return s;
+}
+
+/* mixer.load_pcm(samples, { sample_rate = 44100, channels = 1 }) copies
+ * interleaved samples (f32 or i16 mane3d.buffer, packed floats or a table)
+ * into a sound and returns its handle. i16 samples are converted to float
+ * on load. */
+static int l_mixer_load_pcm(lua_State *L)
+{
+    int rate = field_int(L, 2, "sample_rate", 44100);
+    int channels = field_int(L, 2, "channels", 1);
+    luaL_argcheck(L, rate > 0, 2, "sample_rate must be positive");
+    luaL_argcheck(L, channels > 0 && channels <= 16, 2, "channels must be 1..16");
+
+    size_t count;
+    const float *floats = mane3d_buffer_tofloats(L, 1, &count);
+    const int16_t *shorts = NULL;
+    const char *bytes = NULL;
+    if (floats == NULL && (shorts = mane3d_buffer_toi16(L, 1, &count)) == NULL) {
+        if (lua_type(L, 1) == LUA_TSTRING) {
+            size_t size;
+            bytes = lua_tolstring(L, 1, &size);
+            luaL_argcheck(L, size % sizeof(float) == 0, 1, "string size is not a multiple of 4");
+            count = size / sizeof(float);
+        } else {
+            luaL_checktype(L, 1, LUA_TTABLE);
+            count = (size_t)luaL_len(L, 1);
+        }
+    }
+    count -= count % (size_t)channels;
+
+    mixer_sound *s = (mixer_sound *)calloc(1, sizeof(mixer_sound));
+    float *data = (float *)malloc((count ? count : 1) * sizeof(float));
+    mixer_sound **sounds = (mixer_sound **)realloc(g_mixer.sounds, (size_t)(g_mixer.num_sounds + 1) * sizeof(mixer_sound *));
+    if (sounds)
+        g_mixer.sounds = sounds;
+    if (s == NULL || data == NULL || sounds == NULL) {
+        free(s);
+        free(data);
+        return luaL_error(L, "mixer: out of memory");
+    }
+    if (floats)
+        memcpy(data, floats, count * sizeof(float));
+    else if (shorts) {
+        for (size_t i = 0; i < count; i++)
+            data[i] = (float)shorts[i] * (1.0f / 32768.0f);
+    } else if (bytes)
+        memcpy(data, bytes, count * sizeof(float));
+    else {
+        for (size_t i = 0; i < count; i++) {
+            lua_rawgeti(L, 1, (lua_Integer)i + 1);
+            data[i] = (float)lua_tonumber(L, -1);
+            lua_pop(L, 1);
+        }
+    }
+    s->data = data;
+    s->frames = (uint32_t)(count / (size_t)channels);
+    s->channels = channels;
+    s->sample_rate = rate;
+    g_mixer.sounds[g_mixer.num_sounds++] = s;
+    lua_pushinteger(L, g_mixer.num_sounds);
+    return 1;
+}
+
+/* mixer.info(handle) returns frames, channels, sample_rate */
+static int l_mixer_info(lua_State *L)
+{
+    const mixer_sound *s = check_sound(L, 1);
+    lua_pushinteger(L, s->frames);
+    lua_pushinteger(L, s->channels);
+    lua_pushinteger(L, s->sample_rate);
+    return 3;
+}
+
+/* mixer.unload(handle) stops its voices; the samples are freed once the
+ * audio thread is done with them */
+static int l_mixer_unload(lua_State *L)
+{
+    mixer_sound *s = check_sound(L, 1);
+    mixer_cmd c = { CMD_STOP_SOUND, 0, 0, s, 0.0f, 0.0f, 0 };
+    uint32_t seq = mixer_send(&c);
+    if (seq == 0)
+        return luaL_error(L, "mixer: command queue full");
+    s->unload_seq = seq;
+    mixer_collect();
+    return 0;
+}
+
+/* mixer.play(handle, { volume = 1, pitch = 1, loop = false }) returns a
+ * voice id, or nil if the command queue is full. When every voice is
+ * busy the oldest one is replaced. */
+static int l_mixer_play(lua_State *L)
+{
+    mixer_sound *s = check_sound(L, 1);
+    mixer_cmd c;
+    memset(&c, 0, sizeof(c));
+    c.op = CMD_PLAY;
+    c.sound = s;
+    c.voice = ++g_mixer.next_voice;
+    c.volume = field_float(L, 2, "volume", 1.0f);
+    c.pitch = field_float(L, 2, "pitch", 1.0f);
+    c.loop = field_bool(L, 2, "loop");
+    luaL_argcheck(L, c.pitch > 0.0f, 2, "pitch must be positive");
+    if (mixer_send(&c) == 0)
+        return 0;
+    lua_pushinteger(L, c.voice);
+    return 1;
+}
+
+static int l_mixer_stop(lua_State *L)
+{
+    mixer_cmd c;
+    memset(&c, 0, sizeof(c));
+    c.op = CMD_STOP;
+    c.voice = (uint32_t)luaL_checkinteger(L, 1);
+    mixer_send(&c);
+    return 0;
+}
+
+static int l_mixer_stop_all(lua_State *L)
+{
+    (void)L;
+    mixer_cmd c;
+    memset(&c, 0, sizeof(c));
+    c.op = CMD_STOP_ALL;
+    mixer_send(&c);
+    return 0;
+}
+
+/* mixer.set_bgm(handle|nil, { volume = 1, pitch = 1 }) loops handle on the
+ * music voice. Setting the sound that is already playing only changes its
+ * volume and pitch; nil stops the music. */
+static int l_mixer_set_bgm(lua_State *L)
+{
+    mixer_cmd c;
+    memset(&c, 0, sizeof(c));
+    c.op = CMD_SET_BGM;
+    c.sound = lua_isnoneornil(L, 1) ? NULL : check_sound(L, 1);
+    c.volume = field_float(L, 2, "volume", 1.0f);
+    c.pitch = field_float(L, 2, "pitch", 1.0f);
+    c.loop = 1;
+    luaL_argcheck(L, c.pitch > 0.0f, 2, "pitch must be positive");
+    mixer_send(&c);
+    return 0;
+}
+
+/* Voices playing at the last audio callback, and commands dropped because
+ * the queue was full */
+static int l_mixer_stats(lua_State *L)
+{
+    mixer_collect();
+    lua_createtable(L, 0, 2);
+    lua_pushinteger(L, load_acquire(&g_mixer.active));
+    lua_setfield(L, -2, "voices");
+    lua_pushinteger(L, g_mixer.dropped);
+    lua_setfield(L, -2, "dropped");
+    return 1;
+}
+
+static const luaL_Reg mixer_funcs[] = {
+    {"load_pcm", l_mixer_load_pcm},
+    {"info", l_mixer_info},
+    {"unload", l_mixer_unload},
+    {"play", l_mixer_play},
+    {"stop", l_mixer_stop},
+    {"stop_all", l_mixer_stop_all},
+    {"set_bgm", l_mixer_set_bgm},
+    {"stats", l_mixer_stats},
+    {NULL, NULL}
+};
+
+int luaopen_mane3d_mixer(lua_State *L)
+{
+    luaL_newlib(L, mixer_funcs);
+    return 1;
+}
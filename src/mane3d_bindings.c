@@ -0,0 +1,266 @@
+/*
+ * mane3d_bindings.c - Runtime support for the generated sokol bindings
+ */
+#include "mane3d_bindings.h"
+
+#include <stdlib.h>
+#include <string.h>
+
+void mane3d_metatable_init(lua_State *L, mane3d_metatable *mt, const char *tname)
+{
+    luaL_newmetatable(L, tname);
+    /* Re-opening a module in the same state keeps the ref it already holds */
+    if (mt->ref > 0 && mt->ptr == lua_topointer(L, -1))
+        return;
+    mt->ptr = lua_topointer(L, -1);
+    lua_pushvalue(L, -1);
+    mt->ref = luaL_ref(L, LUA_REGISTRYINDEX);
+}
+
+static mane3d_metatable g_array_view_mt;
+
+/* Push the view cache (user value 1) of the userdata at idx, creating it if
+ * needed. Pushes nil if the userdata has no user value slot. */
+static int push_view_cache(lua_State *L, int idx)
+{
+    int t = lua_getiuservalue(L, idx, 1);
+    if (t == LUA_TTABLE || t == LUA_TNONE)
+        return t == LUA_TTABLE;
+    lua_pop(L, 1);
+    lua_newtable(L);
+    lua_pushvalue(L, -1);
+    lua_setiuservalue(L, idx, 1);
+    return 1;
+}
+
+static void *new_view(lua_State *L, int parent, lua_Integer key, size_t size, const mane3d_metatable *mt)
+{
+    parent = lua_absindex(L, parent);
+    if (push_view_cache(L, parent)) {
+        if (lua_rawgeti(L, -1, key) == LUA_TUSERDATA) {
+            lua_remove(L, -2);
+            return NULL;
+        }
+        lua_pop(L, 1);
+    }
+    void *view = lua_newuserdatauv(L, size, 2);
+    mane3d_setmetatable(L, mt);
+    lua_pushvalue(L, parent);
+    lua_setiuservalue(L, -2, 2);
+    if (lua_istable(L, -2)) {
+        lua_pushvalue(L, -1);
+        lua_rawseti(L, -3, key);
+    }
+    lua_remove(L, -2);
+    return view;
+}
+
+void mane3d_push_view(lua_State *L, int parent, lua_Integer key, void *ptr, const mane3d_metatable *view_mt)
+{
+    mane3d_struct_view *view = (mane3d_struct_view *)new_view(L, parent, key, sizeof(mane3d_struct_view), view_mt);
+    if (view)
+        view->ptr = ptr;
+}
+
+void mane3d_push_array_view(lua_State *L, int parent, lua_Integer key, void *ptr, const mane3d_array_desc *desc)
+{
+    mane3d_array_view *view = (mane3d_array_view *)new_view(L, parent, key, sizeof(mane3d_array_view), &g_array_view_mt);
+    if (view) {
+        view->ptr = ptr;
+        view->desc = desc;
+    }
+}
+
+mane3d_array_view *mane3d_test_array_view(lua_State *L, int idx, const mane3d_array_desc *desc)
+{
+    mane3d_array_view *view = (mane3d_array_view *)mane3d_testudata(L, idx, &g_array_view_mt);
+    return (view && view->desc == desc) ? view : NULL;
+}
+
+static void *array_view_elem(mane3d_array_view *view, lua_Integer i)
+{
+    if (i < 1 || i > view->desc->count)
+        return NULL;
+    return (char *)view->ptr + (size_t)(i - 1) * view->desc->elem_size;
+}
+
+static int l_array_view__index(lua_State *L)
+{
+    mane3d_array_view *view = (mane3d_array_view *)mane3d_checkudata(L, 1, &g_array_view_mt, "mane3d.ArrayView");
+    lua_Integer i = luaL_checkinteger(L, 2);
+    void *elem = array_view_elem(view, i);
+    if (elem == NULL)
+        return 0;
+    view->desc->push(L, elem, i);
+    return 1;
+}
+
+static int l_array_view__newindex(lua_State *L)
+{
+    mane3d_array_view *view = (mane3d_array_view *)mane3d_checkudata(L, 1, &g_array_view_mt, "mane3d.ArrayView");
+    lua_Integer i = luaL_checkinteger(L, 2);
+    void *elem = array_view_elem(view, i);
+    if (elem == NULL)
+        return luaL_error(L, "index %d out of range (1..%d)", (int)i, view->desc->count);
+    lua_settop(L, 3);
+    view->desc->set(L, elem);
+    return 0;
+}
+
+static int l_array_view__len(lua_State *L)
+{
+    mane3d_array_view *view = (mane3d_array_view *)mane3d_checkudata(L, 1, &g_array_view_mt, "mane3d.ArrayView");
+    lua_pushinteger(L, view->desc->count);
+    return 1;
+}
+
+void mane3d_bindings_open(lua_State *L)
+{
+    mane3d_metatable_init(L, &g_array_view_mt, "mane3d.ArrayView");
+    lua_pushcfunction(L, l_array_view__index);
+    lua_setfield(L, -2, "__index");
+    lua_pushcfunction(L, l_array_view__newindex);
+    lua_setfield(L, -2, "__newindex");
+    lua_pushcfunction(L, l_array_view__len);
+    lua_setfield(L, -2, "__len");
+    lua_pop(L, 1);
+}
+
+void *mane3d_cmdbuf_push(lua_State *L, mane3d_cmdbuf *cb, uint32_t op, size_t size)
+{
+    size = MANE3D_CMD_ALIGN(size);
+    if (cb->size + size > cb->capacity) {
+        size_t cap = cb->capacity ? cb->capacity : 256;
+        while (cap < cb->size + size)
+            cap *= 2;
+        unsigned char *data = (unsigned char *)realloc(cb->data, cap);
+        if (data == NULL)
+            luaL_error(L, "CommandBuffer: out of memory (%d bytes)", (int)cap);
+        cb->data = data;
+        cb->capacity = cap;
+    }
+    mane3d_cmd_header *h = (mane3d_cmd_header *)(cb->data + cb->size);
+    memset(h, 0, size);
+    h->op = op;
+    h->size = (uint32_t)size;
+    cb->size += size;
+    cb->count++;
+    return h;
+}
+
+void mane3d_cmdbuf_free(mane3d_cmdbuf *cb)
+{
+    free(cb->data);
+    cb->data = NULL;
+    cb->size = cb->capacity = 0;
+    cb->count = 0;
+}
+
+static struct {
+    int enabled;
+    unsigned int serial; /* bumped for every new lua_State */
+    unsigned int epoch;  /* bumped at every recycle */
+    lua_Integer allocated;
+    lua_Integer reused;
+} g_arena;
+
+void *mane3d_arena_newuserdata(lua_State *L, mane3d_arena_pool *pool, size_t size, int nuvalue)
+{
+    if (!g_arena.enabled)
+        return lua_newuserdatauv(L, size, nuvalue);
+
+    if (pool->ref == LUA_NOREF || pool->serial != g_arena.serial) {
+        lua_newtable(L);
+        pool->ref = luaL_ref(L, LUA_REGISTRYINDEX);
+        pool->serial = g_arena.serial;
+        pool->used = 0;
+    }
+    if (pool->epoch != g_arena.epoch) {
+        pool->epoch = g_arena.epoch;
+        pool->used = 0;
+    }
+
+    lua_rawgeti(L, LUA_REGISTRYINDEX, pool->ref);
+    int slot = ++pool->used;
+    if (lua_rawgeti(L, -1, slot) == LUA_TUSERDATA) {
+        lua_remove(L, -2);
+        for (int i = 1; i <= nuvalue; i++) {
+            lua_pushnil(L);
+            lua_setiuservalue(L, -2, i);
+        }
+        g_arena.reused++;
+        return lua_touserdata(L, -1);
+    }
+    lua_pop(L, 1);
+
+    void *ud = lua_newuserdatauv(L, size, nuvalue);
+    lua_pushvalue(L, -1);
+    lua_rawseti(L, -3, slot);
+    lua_remove(L, -2);
+    g_arena.allocated++;
+    return ud;
+}
+
+void mane3d_arena_recycle(void)
+{
+    g_arena.epoch++;
+}
+
+/* frame_arena.enable([on]) */
+static int l_arena_enable(lua_State *L)
+{
+    g_arena.enabled = lua_isnone(L, 1) ? 1 : lua_toboolean(L, 1);
+    return 0;
+}
+
+static int l_arena_disable(lua_State *L)
+{
+    (void)L;
+    g_arena.enabled = 0;
+    return 0;
+}
+
+static int l_arena_enabled(lua_State *L)
+{
+    lua_pushboolean(L, g_arena.enabled);
+    return 1;
+}
+
+/* Recycle manually, for code that does not go through gfx.commit() */
+static int l_arena_recycle(lua_State *L)
+{
+    (void)L;
+    mane3d_arena_recycle();
+    return 0;
+}
+
+/* Returns { allocated = n, reused = n } counted since startup */
+static int l_arena_stats(lua_State *L)
+{
+    lua_createtable(L, 0, 2);
+    lua_pushinteger(L, g_arena.allocated);
+    lua_setfield(L, -2, "allocated");
+    lua_pushinteger(L, g_arena.reused);
+    lua_setfield(L, -2, "reused");
+    return 1;
+}
+
+static const luaL_Reg arena_funcs[] = {
+    {"enable", l_arena_enable},
+    {"disable", l_arena_disable},
+    {"enabled", l_arena_enabled},
+    {"recycle", l_arena_recycle},
+    {"stats", l_arena_stats},
+    {NULL, NULL}
+};
+
+int luaopen_sokol_frame_arena(lua_State *L)
+{
+    /* Pools created for a previous lua_State hold stale registry refs */
+    g_arena.serial++;
+    g_arena.enabled = 0;
+    g_arena.allocated = 0;
+    g_arena.reused = 0;
+    luaL_newlib(L, arena_funcs);
+    return 1;
+}
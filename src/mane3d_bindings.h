@@ -0,0 +1,339 @@
+/*
+ * mane3d_bindings.h - Runtime support for the generated sokol bindings
+ *
+ * Included by gen/bindings/sokol_*.c (see scripts/gen_lua.py) and by the
+ * C++ ImGui bindings (see scripts/gen_imgui.py).
+ */
+#ifndef MANE3D_BINDINGS_H
+#define MANE3D_BINDINGS_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#include <lua.h>
+#include <lauxlib.h>
+
+/*
+ * Argument checks
+ *
+ * The generated wrappers read scalar arguments through these macros.
+ * Defining MANE3D_UNCHECKED_BINDINGS turns them into plain lua_to*x
+ * reads for shipping builds: no type checks and no error paths, so an
+ * argument of the wrong type yields 0/NULL (or a crash) instead of a Lua
+ * error. Keep it off while developing.
+ */
+#ifdef MANE3D_UNCHECKED_BINDINGS
+#define MANE3D_CHECKINTEGER(L, i) lua_tointegerx((L), (i), NULL)
+#define MANE3D_CHECKNUMBER(L, i) lua_tonumberx((L), (i), NULL)
+#define MANE3D_CHECKSTRING(L, i) lua_tolstring((L), (i), NULL)
+#define MANE3D_CHECKTABLE(L, i) ((void)0)
+#define MANE3D_OPTINTEGER(L, i, d) (lua_isnoneornil((L), (i)) ? (d) : lua_tointegerx((L), (i), NULL))
+#define MANE3D_OPTNUMBER(L, i, d) (lua_isnoneornil((L), (i)) ? (d) : lua_tonumberx((L), (i), NULL))
+#define MANE3D_OPTSTRING(L, i, d) (lua_isnoneornil((L), (i)) ? (d) : lua_tolstring((L), (i), NULL))
+#else
+#define MANE3D_CHECKINTEGER(L, i) luaL_checkinteger((L), (i))
+#define MANE3D_CHECKNUMBER(L, i) luaL_checknumber((L), (i))
+#define MANE3D_CHECKSTRING(L, i) luaL_checkstring((L), (i))
+#define MANE3D_CHECKTABLE(L, i) luaL_checktype((L), (i), LUA_TTABLE)
+#define MANE3D_OPTINTEGER(L, i, d) luaL_optinteger((L), (i), (d))
+#define MANE3D_OPTNUMBER(L, i, d) luaL_optnumber((L), (i), (d))
+#define MANE3D_OPTSTRING(L, i, d) luaL_optstring((L), (i), (d))
+#endif
+
+/*
+ * Struct metatables
+ *
+ * Each generated module caches the metatables it uses when it is opened.
+ * Type checks then compare the metatable pointer directly instead of
+ * looking the type name up in the registry on every call.
+ *
+ * The cache is process-global and supports one lua_State at a time:
+ * opening a module in another state re-points it at that state's
+ * metatables, after which structs from the first state fail the checks.
+ */
+typedef struct mane3d_metatable {
+    int ref;         /* registry ref, for setting the metatable */
+    const void *ptr; /* identity, for type checks */
+} mane3d_metatable;
+
+/* luaL_newmetatable(tname) and cache it in mt; leaves the metatable on the stack */
+void mane3d_metatable_init(lua_State *L, mane3d_metatable *mt, const char *tname);
+
+static inline void mane3d_setmetatable(lua_State *L, const mane3d_metatable *mt)
+{
+    lua_rawgeti(L, LUA_REGISTRYINDEX, mt->ref);
+    lua_setmetatable(L, -2);
+}
+
+/* Userdata at idx if its metatable is mt, NULL otherwise */
+static inline void *mane3d_testudata(lua_State *L, int idx, const mane3d_metatable *mt)
+{
+    void *p = lua_touserdata(L, idx);
+    if (p != NULL && lua_getmetatable(L, idx)) {
+        const void *m = lua_topointer(L, -1);
+        lua_pop(L, 1);
+        if (m == mt->ptr)
+            return p;
+    }
+    return NULL;
+}
+
+static inline void *mane3d_checkudata(lua_State *L, int idx, const mane3d_metatable *mt, const char *tname)
+{
+    void *p = mane3d_testudata(L, idx, mt);
+    if (p == NULL)
+        luaL_typeerror(L, idx, tname);
+    return p;
+}
+
+/*
+ * Views
+ *
+ * Getters of nested struct and array fields return views: small proxies
+ * pointing into the parent's storage, so `desc.colors[1].blend.enabled = true`
+ * writes in place. User value layout:
+ *   struct userdata: 1 = view cache
+ *   struct/array view: 1 = view cache, 2 = parent (keeps the storage alive)
+ * Views are cached per parent, so repeated access allocates nothing.
+ * sg_range has no nested fields and uses its user value 1 to anchor its
+ * source string instead.
+ */
+typedef struct mane3d_struct_view {
+    void *ptr;
+} mane3d_struct_view;
+
+typedef struct mane3d_array_desc {
+    int count;
+    size_t elem_size;
+    void (*push)(lua_State *L, void *elem, lua_Integer i); /* array view at index 1 */
+    void (*set)(lua_State *L, void *elem);                 /* value on top of the stack */
+} mane3d_array_desc;
+
+typedef struct mane3d_array_view {
+    void *ptr;
+    const mane3d_array_desc *desc;
+} mane3d_array_view;
+
+/* Struct at idx: a struct userdata with metatable mt, or a view with view_mt */
+static inline void *mane3d_teststruct(lua_State *L, int idx, const mane3d_metatable *mt, const mane3d_metatable *view_mt)
+{
+    void *p = lua_touserdata(L, idx);
+    if (p != NULL && lua_getmetatable(L, idx)) {
+        const void *m = lua_topointer(L, -1);
+        lua_pop(L, 1);
+        if (m == mt->ptr)
+            return p;
+        if (m == view_mt->ptr)
+            return ((mane3d_struct_view *)p)->ptr;
+    }
+    return NULL;
+}
+
+static inline void *mane3d_checkstruct(lua_State *L, int idx, const mane3d_metatable *mt, const mane3d_metatable *view_mt, const char *tname)
+{
+#ifdef MANE3D_UNCHECKED_BINDINGS
+    /* Trust the caller: anything that is not a view is the struct itself */
+    void *p = lua_touserdata(L, idx);
+    (void)mt;
+    (void)tname;
+    if (p != NULL && lua_getmetatable(L, idx)) {
+        const void *m = lua_topointer(L, -1);
+        lua_pop(L, 1);
+        if (m == view_mt->ptr)
+            return ((mane3d_struct_view *)p)->ptr;
+    }
+    return p;
+#else
+    void *p = mane3d_teststruct(L, idx, mt, view_mt);
+    if (p == NULL)
+        luaL_typeerror(L, idx, tname);
+    return p;
+#endif
+}
+
+/* Push the view of the struct at ptr, owned by the userdata at parent, cached under key */
+void mane3d_push_view(lua_State *L, int parent, lua_Integer key, void *ptr, const mane3d_metatable *view_mt);
+
+/* Push the view of the array at ptr, owned by the userdata at parent, cached under key */
+void mane3d_push_array_view(lua_State *L, int parent, lua_Integer key, void *ptr, const mane3d_array_desc *desc);
+
+/* Array view at idx over elements described by desc, NULL otherwise */
+mane3d_array_view *mane3d_test_array_view(lua_State *L, int idx, const mane3d_array_desc *desc);
+
+/* Per-state setup shared by all generated modules (idempotent) */
+void mane3d_bindings_open(lua_State *L);
+
+/*
+ * Buffers
+ *
+ * mane3d.buffer typed arrays (src/mane3d_buffer.c) are accepted wherever
+ * the bindings take an sg_range; the range points at the buffer's storage.
+ * Growing a buffer may move its storage, so a range built from it is only
+ * valid until the buffer is next resized.
+ */
+
+/* Data and byte size of the buffer at idx, NULL if it is not a buffer */
+const void *mane3d_buffer_todata(lua_State *L, int idx, size_t *size);
+
+/* Elements and element count of the f32 buffer at idx, NULL if it is not
+ * one (an empty buffer returns a dummy pointer and a count of 0) */
+float *mane3d_buffer_tofloats(lua_State *L, int idx, size_t *count);
+
+/* Same for i16 buffers */
+int16_t *mane3d_buffer_toi16(lua_State *L, int idx, size_t *count);
+
+/* Push a new zero-filled buffer of count elements of type ("f32", "u16",
+ * "u32", "u8" or "i16") and return its storage */
+void *mane3d_buffer_new(lua_State *L, const char *type, size_t count);
+
+int luaopen_mane3d_buffer(lua_State *L);
+
+/*
+ * Command buffers
+ *
+ * gfx.CommandBuffer records calls into a flat byte stream of commands,
+ * each starting with a mane3d_cmd_header, and replays them with one call
+ * from Lua. Encoding and replay are generated per command (see
+ * gen_command_buffer in scripts/gen_lua.py); this is just the storage.
+ */
+typedef struct mane3d_cmd_header {
+    uint32_t op;
+    uint32_t size; /* bytes to the next command */
+} mane3d_cmd_header;
+
+typedef struct mane3d_cmdbuf {
+    unsigned char *data;
+    size_t size;
+    size_t capacity;
+    int count;  /* commands recorded */
+    int cached; /* keep the commands after submit */
+} mane3d_cmdbuf;
+
+/* Commands (and payload bytes following them) are padded to this */
+#define MANE3D_CMD_ALIGN(n) (((n) + 7) & ~(size_t)7)
+
+/* Append a zeroed command of 'size' bytes (header included) and return it.
+ * The pointer is only valid until the next push. */
+void *mane3d_cmdbuf_push(lua_State *L, mane3d_cmdbuf *cb, uint32_t op, size_t size);
+
+void mane3d_cmdbuf_free(mane3d_cmdbuf *cb);
+
+/*
+ * Frame arena
+ *
+ * When enabled (sokol.frame_arena.enable()), generated struct constructors
+ * take their userdata from a per-type pool instead of allocating. Every
+ * object handed out is only valid until the next gfx.commit(), which
+ * recycles all pools at once.
+ */
+typedef struct mane3d_arena_pool {
+    int ref;             /* registry ref of the pool table, LUA_NOREF until first use */
+    unsigned int serial; /* lua_State generation the ref belongs to */
+    unsigned int epoch;  /* frame the 'used' count belongs to */
+    int used;            /* userdata handed out during that frame */
+} mane3d_arena_pool;
+
+#define MANE3D_ARENA_POOL_INIT { LUA_NOREF, 0, 0, 0 }
+
+/* Push a userdata of 'size' bytes, reusing a pooled one when the arena is on.
+ * Reused userdata keep their metatable; their user values are reset to nil. */
+void *mane3d_arena_newuserdata(lua_State *L, mane3d_arena_pool *pool, size_t size, int nuvalue);
+
+/* Return every pooled userdata to its pool (called from gfx.commit) */
+void mane3d_arena_recycle(void);
+
+int luaopen_sokol_frame_arena(lua_State *L);
+
+/*
+ * Binding stats
+ *
+ * Building with MANE3D_BINDING_STATS wraps every generated function in a
+ * counter of calls and time spent (measured with stm_now). sokol.stats
+ * (src/mane3d_stats.c) reports them; gfx.commit() closes the per-frame
+ * window. Calls that raise a Lua error are not counted.
+ */
+typedef struct mane3d_binding_stat {
+    const char *name;     /* "gfx.draw" */
+    uint64_t calls;
+    uint64_t ticks;
+    uint64_t mark_calls;  /* totals at the last gfx.commit() */
+    uint64_t mark_ticks;
+    uint64_t frame_calls; /* during the last complete frame */
+    uint64_t frame_ticks;
+} mane3d_binding_stat;
+
+/* Make a module's counters visible to sokol.stats (idempotent) */
+void mane3d_stats_register(mane3d_binding_stat *stats, int count);
+
+uint64_t mane3d_stats_begin(void);
+void mane3d_stats_end(mane3d_binding_stat *stat, uint64_t start);
+
+/* Close the current frame window (called from gfx.commit) */
+void mane3d_stats_end_frame(void);
+
+#ifdef MANE3D_BINDING_STATS
+/* Define fn##_stat: fn wrapped with the counters in stats[i] */
+#define MANE3D_STAT_WRAP(fn, stats, i)                   \
+    static int fn##_stat(lua_State *L)                    \
+    {                                                     \
+        uint64_t start_ = mane3d_stats_begin();           \
+        int n_ = fn(L);                                   \
+        mane3d_stats_end(&(stats)[i], start_);            \
+        return n_;                                        \
+    }
+/* The function to register for fn */
+#define MANE3D_STAT_FN(fn) fn##_stat
+#define MANE3D_STATS_END_FRAME() mane3d_stats_end_frame()
+#else
+#define MANE3D_STAT_FN(fn) fn
+#define MANE3D_STATS_END_FRAME() ((void)0)
+#endif
+
+int luaopen_sokol_stats(lua_State *L);
+
+/*
+ * Audio stream
+ *
+ * sokol.audio_stream (src/mane3d_audio.c) runs sokol_audio with a C
+ * stream callback that only drains a lock-free single-producer,
+ * single-consumer ring of samples. Lua (the producer) pushes from the
+ * main thread; the audio thread (the consumer) never touches the
+ * lua_State.
+ */
+typedef struct mane3d_ring {
+    float *data;
+    uint32_t capacity; /* samples, a power of two */
+    uint32_t head;     /* samples written, only advanced by the producer */
+    uint32_t tail;     /* samples read, only advanced by the consumer */
+} mane3d_ring;
+
+/* Allocate room for at least min_capacity samples; 0 on out of memory */
+int mane3d_ring_init(mane3d_ring *r, uint32_t min_capacity);
+void mane3d_ring_free(mane3d_ring *r);
+
+/* Samples queued / free. Exact for the calling side, conservative for the other */
+uint32_t mane3d_ring_count(const mane3d_ring *r);
+uint32_t mane3d_ring_space(const mane3d_ring *r);
+
+/* Producer: append up to n samples, returns how many fit */
+uint32_t mane3d_ring_write(mane3d_ring *r, const float *src, uint32_t n);
+/* Consumer: take up to n samples, returns how many were queued */
+uint32_t mane3d_ring_read(mane3d_ring *r, float *dst, uint32_t n);
+
+int luaopen_sokol_audio_stream(lua_State *L);
+
+/* mane3d.mixer: voices mixed by the stream callback of sokol.audio_stream */
+int luaopen_mane3d_mixer(lua_State *L);
+
+/* mane3d.wav: WAV files decoded into mane3d.buffer samples (src/mane3d_wav.c) */
+int luaopen_mane3d_wav(lua_State *L);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif /* MANE3D_BINDINGS_H */
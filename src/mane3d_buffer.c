@@ -0,0 +1,512 @@
+/*
+ * mane3d_buffer.c - Typed byte buffers (mane3d.buffer)
+ *
+ * A buffer is a growable block of f32/u16/u32/u8/i16 elements that the
+ * generated bindings accept wherever they take an sg_range, without
+ * copying:
+ *
+ *   local buffer = require("mane3d.buffer")
+ *   local verts = buffer.f32({ -1, -1, 1, -1, 0, 1 })
+ *   gfx.make_buffer(gfx.BufferDesc({ data = verts }))
+ *   uniforms:set(1, { t, aspect })
+ *   gfx.apply_uniforms(0, uniforms)
+ *
+ * buf:view(type) returns another typed buffer over the same bytes. Views
+ * see later writes and resizes of the buffer they were made from.
+ */
+#include "mane3d_bindings.h"
+
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+enum {
+    BUFFER_F32,
+    BUFFER_U16,
+    BUFFER_U32,
+    BUFFER_U8,
+    BUFFER_I16,
+};
+
+static const char *const buffer_type_names[] = { "f32", "u16", "u32", "u8", "i16", NULL };
+static const size_t buffer_type_sizes[] = { 4, 2, 4, 1, 2 };
+
+typedef struct buffer_storage {
+    unsigned char *data;
+    size_t size;     /* bytes in use */
+    size_t capacity; /* bytes allocated */
+} buffer_storage;
+
+/* Userdata layout. The buffer returned by new() embeds its storage;
+ * views point at the storage of the buffer they were made from and keep
+ * it alive through user value 1. */
+typedef struct mane3d_buffer {
+    buffer_storage *store;
+    int type;
+    buffer_storage own;
+} mane3d_buffer;
+
+static mane3d_metatable g_buffer_mt;
+
+static mane3d_buffer *check_buffer(lua_State *L, int idx)
+{
+    return (mane3d_buffer *)mane3d_checkudata(L, idx, &g_buffer_mt, "mane3d.buffer");
+}
+
+static size_t elem_size(const mane3d_buffer *b)
+{
+    return buffer_type_sizes[b->type];
+}
+
+static lua_Integer buffer_count(const mane3d_buffer *b)
+{
+    return (lua_Integer)(b->store->size / elem_size(b));
+}
+
+/* Largest element count whose byte size fits in a size_t and whose index fits in a lua_Integer */
+static lua_Integer max_count(const mane3d_buffer *b)
+{
+    size_t n = SIZE_MAX / elem_size(b);
+    return n < (size_t)LUA_MAXINTEGER ? (lua_Integer)n : LUA_MAXINTEGER;
+}
+
+static void reserve_bytes(lua_State *L, buffer_storage *s, size_t size)
+{
+    if (size <= s->capacity)
+        return;
+    size_t cap = s->capacity ? s->capacity : 64;
+    while (cap < size)
+        cap = cap > SIZE_MAX / 2 ? size : cap * 2;
+    unsigned char *data = (unsigned char *)realloc(s->data, cap);
+    if (data == NULL)
+        luaL_error(L, "mane3d.buffer: out of memory (%I bytes)", (lua_Integer)cap);
+    s->data = data;
+    s->capacity = cap;
+}
+
+/* Grow (zero-filling) or shrink to count elements; arg is the Lua argument count came from */
+static void resize(lua_State *L, mane3d_buffer *b, lua_Integer count, int arg)
+{
+    buffer_storage *s = b->store;
+    if (count > max_count(b))
+        luaL_argerror(L, arg, "size too large");
+    size_t size = (size_t)count * elem_size(b);
+    reserve_bytes(L, s, size);
+    if (size > s->size)
+        memset(s->data + s->size, 0, size - s->size);
+    s->size = size;
+}
+
+/* Make room for elements first..last (1-based), growing the buffer if needed */
+static void ensure(lua_State *L, mane3d_buffer *b, lua_Integer last, int arg)
+{
+    if (last > buffer_count(b))
+        resize(L, b, last, arg);
+}
+
+static void store_value(lua_State *L, mane3d_buffer *b, lua_Integer i, int idx)
+{
+    unsigned char *p = b->store->data + (size_t)(i - 1) * elem_size(b);
+    switch (b->type) {
+    case BUFFER_F32: {
+        float v = (float)lua_tonumber(L, idx);
+        memcpy(p, &v, sizeof(v));
+        break;
+    }
+    case BUFFER_U16: {
+        uint16_t v = (uint16_t)lua_tointeger(L, idx);
+        memcpy(p, &v, sizeof(v));
+        break;
+    }
+    case BUFFER_U32: {
+        uint32_t v = (uint32_t)lua_tointeger(L, idx);
+        memcpy(p, &v, sizeof(v));
+        break;
+    }
+    case BUFFER_I16: {
+        int16_t v = (int16_t)lua_tointeger(L, idx);
+        memcpy(p, &v, sizeof(v));
+        break;
+    }
+    default:
+        *p = (unsigned char)lua_tointeger(L, idx);
+        break;
+    }
+}
+
+static void push_value(lua_State *L, const mane3d_buffer *b, lua_Integer i)
+{
+    const unsigned char *p = b->store->data + (size_t)(i - 1) * elem_size(b);
+    switch (b->type) {
+    case BUFFER_F32: {
+        float v;
+        memcpy(&v, p, sizeof(v));
+        lua_pushnumber(L, v);
+        break;
+    }
+    case BUFFER_U16: {
+        uint16_t v;
+        memcpy(&v, p, sizeof(v));
+        lua_pushinteger(L, v);
+        break;
+    }
+    case BUFFER_U32: {
+        uint32_t v;
+        memcpy(&v, p, sizeof(v));
+        lua_pushinteger(L, v);
+        break;
+    }
+    case BUFFER_I16: {
+        int16_t v;
+        memcpy(&v, p, sizeof(v));
+        lua_pushinteger(L, v);
+        break;
+    }
+    default:
+        lua_pushinteger(L, *p);
+        break;
+    }
+}
+
+/* Write the array part of the table at idx starting at element first (from argument arg) */
+static void set_from_table(lua_State *L, mane3d_buffer *b, lua_Integer first, int idx, int arg)
+{
+    lua_Integer n = (lua_Integer)lua_rawlen(L, idx);
+    if (first - 1 > max_count(b) - n)
+        luaL_argerror(L, arg, "size too large");
+    ensure(L, b, first + n - 1, arg);
+    for (lua_Integer i = 1; i <= n; i++) {
+        lua_rawgeti(L, idx, i);
+        store_value(L, b, first + i - 1, -1);
+        lua_pop(L, 1);
+    }
+}
+
+/* Copy raw bytes to element first (from argument arg), growing to cover them (rounded up to whole elements) */
+static void copy_bytes(lua_State *L, mane3d_buffer *b, lua_Integer first, int arg, const void *src, size_t size)
+{
+    size_t es = elem_size(b);
+    size_t count = size / es + (size % es != 0);
+    if (count > (size_t)max_count(b) || first - 1 > max_count(b) - (lua_Integer)count)
+        luaL_argerror(L, arg, "size too large");
+    size_t offset = (size_t)(first - 1) * es;
+    /* src may point into this storage (a self copy or a view), which growing can move */
+    uintptr_t data = (uintptr_t)b->store->data;
+    int shared = data && (uintptr_t)src >= data && (uintptr_t)src < data + b->store->capacity;
+    size_t src_offset = shared ? (size_t)((uintptr_t)src - data) : 0;
+    ensure(L, b, first - 1 + (lua_Integer)count, arg);
+    if (shared)
+        src = b->store->data + src_offset;
+    if (size)
+        memmove(b->store->data + offset, src, size);
+}
+
+static mane3d_buffer *push_buffer(lua_State *L, int type)
+{
+    mane3d_buffer *b = (mane3d_buffer *)lua_newuserdatauv(L, sizeof(mane3d_buffer), 1);
+    memset(b, 0, sizeof(*b));
+    b->store = &b->own;
+    b->type = type;
+    mane3d_setmetatable(L, &g_buffer_mt);
+    return b;
+}
+
+/* Fill a new buffer from the optional initializer at idx: a count, a table of values, a string of bytes or another buffer */
+static int new_buffer(lua_State *L, int type, int idx)
+{
+    mane3d_buffer *b = push_buffer(L, type);
+    switch (lua_type(L, idx)) {
+    case LUA_TNONE:
+    case LUA_TNIL:
+        break;
+    case LUA_TNUMBER: {
+        lua_Integer n = luaL_checkinteger(L, idx);
+        luaL_argcheck(L, n >= 0, idx, "negative size");
+        resize(L, b, n, idx);
+        break;
+    }
+    case LUA_TTABLE:
+        set_from_table(L, b, 1, idx, idx);
+        break;
+    case LUA_TSTRING: {
+        size_t len;
+        const char *s = lua_tolstring(L, idx, &len);
+        copy_bytes(L, b, 1, idx, s, len);
+        break;
+    }
+    default: {
+        mane3d_buffer *src = check_buffer(L, idx);
+        copy_bytes(L, b, 1, idx, src->store->data, src->store->size);
+        break;
+    }
+    }
+    return 1;
+}
+
+/* buffer.new(type, init?) */
+static int l_new(lua_State *L)
+{
+    int type = luaL_checkoption(L, 1, NULL, buffer_type_names);
+    return new_buffer(L, type, 2);
+}
+
+static int l_f32(lua_State *L) { return new_buffer(L, BUFFER_F32, 1); }
+static int l_u16(lua_State *L) { return new_buffer(L, BUFFER_U16, 1); }
+static int l_u32(lua_State *L) { return new_buffer(L, BUFFER_U32, 1); }
+static int l_u8(lua_State *L) { return new_buffer(L, BUFFER_U8, 1); }
+static int l_i16(lua_State *L) { return new_buffer(L, BUFFER_I16, 1); }
+
+static int l_is_buffer(lua_State *L)
+{
+    lua_pushboolean(L, mane3d_testudata(L, 1, &g_buffer_mt) != NULL);
+    return 1;
+}
+
+/* buf:set(first, values) writes a table of values starting at element first */
+static int l_buffer_set(lua_State *L)
+{
+    mane3d_buffer *b = check_buffer(L, 1);
+    lua_Integer first = luaL_checkinteger(L, 2);
+    luaL_argcheck(L, first >= 1, 2, "index out of range");
+    luaL_checktype(L, 3, LUA_TTABLE);
+    set_from_table(L, b, first, 3, 2);
+    lua_settop(L, 1);
+    return 1;
+}
+
+/* buf:push(v, ...) appends values */
+static int l_buffer_push(lua_State *L)
+{
+    mane3d_buffer *b = check_buffer(L, 1);
+    int n = lua_gettop(L) - 1;
+    lua_Integer first = buffer_count(b) + 1;
+    ensure(L, b, first + n - 1, 2);
+    for (int i = 0; i < n; i++)
+        store_value(L, b, first + i, i + 2);
+    lua_settop(L, 1);
+    return 1;
+}
+
+/* buf:fill(v, first?, last?) */
+static int l_buffer_fill(lua_State *L)
+{
+    mane3d_buffer *b = check_buffer(L, 1);
+    luaL_checkany(L, 2);
+    lua_Integer first = luaL_optinteger(L, 3, 1);
+    lua_Integer last = luaL_optinteger(L, 4, buffer_count(b));
+    luaL_argcheck(L, first >= 1, 3, "index out of range");
+    if (last >= first) {
+        ensure(L, b, last, 4);
+        store_value(L, b, first, 2);
+        /* Replicate the first element by doubling */
+        size_t es = elem_size(b);
+        unsigned char *base = b->store->data + (size_t)(first - 1) * es;
+        size_t total = (size_t)(last - first + 1) * es;
+        for (size_t done = es; done < total; done *= 2)
+            memcpy(base + done, base, done < total - done ? done : total - done);
+    }
+    lua_settop(L, 1);
+    return 1;
+}
+
+/* buf:copy_from(src, first?) copies the bytes of a buffer or string to element first */
+static int l_buffer_copy_from(lua_State *L)
+{
+    mane3d_buffer *b = check_buffer(L, 1);
+    lua_Integer first = luaL_optinteger(L, 3, 1);
+    luaL_argcheck(L, first >= 1, 3, "index out of range");
+    if (lua_type(L, 2) == LUA_TSTRING) {
+        size_t len;
+        const char *s = lua_tolstring(L, 2, &len);
+        copy_bytes(L, b, first, 3, s, len);
+    } else {
+        mane3d_buffer *src = check_buffer(L, 2);
+        copy_bytes(L, b, first, 3, src->store->data, src->store->size);
+    }
+    lua_settop(L, 1);
+    return 1;
+}
+
+/* buf:resize(count) grows (zero-filled) or shrinks the buffer */
+static int l_buffer_resize(lua_State *L)
+{
+    mane3d_buffer *b = check_buffer(L, 1);
+    lua_Integer n = luaL_checkinteger(L, 2);
+    luaL_argcheck(L, n >= 0, 2, "negative size");
+    resize(L, b, n, 2);
+    lua_settop(L, 1);
+    return 1;
+}
+
+/* buf:clear() empties the buffer, keeping its capacity */
+static int l_buffer_clear(lua_State *L)
+{
+    mane3d_buffer *b = check_buffer(L, 1);
+    b->store->size = 0;
+    lua_settop(L, 1);
+    return 1;
+}
+
+/* buf:view(type) is a buffer of another element type over the same bytes */
+static int l_buffer_view(lua_State *L)
+{
+    mane3d_buffer *b = check_buffer(L, 1);
+    int type = luaL_checkoption(L, 2, NULL, buffer_type_names);
+    mane3d_buffer *v = push_buffer(L, type);
+    v->store = b->store;
+    /* Anchor the owner of the storage (a view's own owner, if b is a view) */
+    if (b->store == &b->own)
+        lua_pushvalue(L, 1);
+    else
+        lua_getiuservalue(L, 1, 1);
+    lua_setiuservalue(L, -2, 1);
+    return 1;
+}
+
+static int l_buffer_type(lua_State *L)
+{
+    mane3d_buffer *b = check_buffer(L, 1);
+    lua_pushstring(L, buffer_type_names[b->type]);
+    return 1;
+}
+
+static int l_buffer_bytes(lua_State *L)
+{
+    mane3d_buffer *b = check_buffer(L, 1);
+    lua_pushinteger(L, (lua_Integer)b->store->size);
+    return 1;
+}
+
+/* buf:tostring() copies the bytes into a Lua string */
+static int l_buffer_tostring(lua_State *L)
+{
+    mane3d_buffer *b = check_buffer(L, 1);
+    lua_pushlstring(L, (const char *)b->store->data, b->store->size);
+    return 1;
+}
+
+static int l_buffer_index(lua_State *L)
+{
+    mane3d_buffer *b = check_buffer(L, 1);
+    lua_Integer i;
+    int isnum;
+    i = lua_tointegerx(L, 2, &isnum);
+    if (isnum) {
+        if (i >= 1 && i <= buffer_count(b))
+            push_value(L, b, i);
+        else
+            lua_pushnil(L);
+        return 1;
+    }
+    lua_pushvalue(L, 2);
+    lua_rawget(L, lua_upvalueindex(1));
+    return 1;
+}
+
+static int l_buffer_newindex(lua_State *L)
+{
+    mane3d_buffer *b = check_buffer(L, 1);
+    lua_Integer i = luaL_checkinteger(L, 2);
+    lua_Integer n = buffer_count(b);
+    if (i < 1 || i > n)
+        return luaL_error(L, "index %d out of range (1..%d)", (int)i, (int)n);
+    store_value(L, b, i, 3);
+    return 0;
+}
+
+static int l_buffer_len(lua_State *L)
+{
+    lua_pushinteger(L, buffer_count(check_buffer(L, 1)));
+    return 1;
+}
+
+static int l_buffer_gc(lua_State *L)
+{
+    mane3d_buffer *b = (mane3d_buffer *)lua_touserdata(L, 1);
+    free(b->own.data);
+    b->own.data = NULL;
+    b->own.size = b->own.capacity = 0;
+    return 0;
+}
+
+static const luaL_Reg buffer_methods[] = {
+    {"set", l_buffer_set},
+    {"push", l_buffer_push},
+    {"fill", l_buffer_fill},
+    {"copy_from", l_buffer_copy_from},
+    {"resize", l_buffer_resize},
+    {"clear", l_buffer_clear},
+    {"view", l_buffer_view},
+    {"type", l_buffer_type},
+    {"bytes", l_buffer_bytes},
+    {"tostring", l_buffer_tostring},
+    {NULL, NULL}
+};
+
+static const luaL_Reg buffer_funcs[] = {
+    {"new", l_new},
+    {"f32", l_f32},
+    {"u16", l_u16},
+    {"u32", l_u32},
+    {"u8", l_u8},
+    {"i16", l_i16},
+    {"is_buffer", l_is_buffer},
+    {NULL, NULL}
+};
+
+const void *mane3d_buffer_todata(lua_State *L, int idx, size_t *size)
+{
+    mane3d_buffer *b = (mane3d_buffer *)mane3d_testudata(L, idx, &g_buffer_mt);
+    if (b == NULL)
+        return NULL;
+    *size = b->store->size;
+    /* sokol rejects ranges with a NULL ptr, even empty ones */
+    return b->store->data ? (const void *)b->store->data : (const void *)b;
+}
+
+float *mane3d_buffer_tofloats(lua_State *L, int idx, size_t *count)
+{
+    mane3d_buffer *b = (mane3d_buffer *)mane3d_testudata(L, idx, &g_buffer_mt);
+    if (b == NULL || b->type != BUFFER_F32)
+        return NULL;
+    *count = (size_t)buffer_count(b);
+    return b->store->data ? (float *)b->store->data : (float *)(void *)b;
+}
+
+int16_t *mane3d_buffer_toi16(lua_State *L, int idx, size_t *count)
+{
+    mane3d_buffer *b = (mane3d_buffer *)mane3d_testudata(L, idx, &g_buffer_mt);
+    if (b == NULL || b->type != BUFFER_I16)
+        return NULL;
+    *count = (size_t)buffer_count(b);
+    return b->store->data ? (int16_t *)b->store->data : (int16_t *)(void *)b;
+}
+
+void *mane3d_buffer_new(lua_State *L, const char *type, size_t count)
+{
+    int t = 0;
+    while (strcmp(buffer_type_names[t], type) != 0)
+        t++;
+    mane3d_buffer *b = push_buffer(L, t);
+    if (count > (size_t)max_count(b))
+        luaL_error(L, "mane3d.buffer: size too large");
+    resize(L, b, (lua_Integer)count, 0);
+    return b->store->data ? (void *)b->store->data : (void *)b;
+}
+
+int luaopen_mane3d_buffer(lua_State *L)
+{
+    mane3d_metatable_init(L, &g_buffer_mt, "mane3d.buffer");
+    luaL_newlib(L, buffer_methods);
+    lua_pushcclosure(L, l_buffer_index, 1);
+    lua_setfield(L, -2, "__index");
+    lua_pushcfunction(L, l_buffer_newindex);
+    lua_setfield(L, -2, "__newindex");
+    lua_pushcfunction(L, l_buffer_len);
+    lua_setfield(L, -2, "__len");
+    lua_pushcfunction(L, l_buffer_gc);
+    lua_setfield(L, -2, "__gc");
+    lua_pop(L, 1);
+    luaL_newlib(L, buffer_funcs);
+    return 1;
+}
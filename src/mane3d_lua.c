@@ -17,6 +17,12 @@ extern int luaopen_sokol_gl(lua_State *L);
 extern int luaopen_sokol_debugtext(lua_State *L);
 extern int luaopen_sokol_audio(lua_State *L);
 extern int luaopen_sokol_shape(lua_State *L);
+extern int luaopen_sokol_frame_arena(lua_State *L);
+extern int luaopen_mane3d_buffer(lua_State *L);
+extern int luaopen_sokol_stats(lua_State *L);
+extern int luaopen_sokol_audio_stream(lua_State *L);
+extern int luaopen_mane3d_mixer(lua_State *L);
+extern int luaopen_mane3d_wav(lua_State *L);
 extern int luaopen_mane3d_licenses(lua_State *L);
 extern int luaopen_stb_image(lua_State *L);
 
@@ -112,6 +118,18 @@ void mane3d_lua_register_all(lua_State *L)
     lua_pop(L, 1);
     luaL_requiref(L, "sokol.shape", luaopen_sokol_shape, 0);
     lua_pop(L, 1);
+    luaL_requiref(L, "sokol.frame_arena", luaopen_sokol_frame_arena, 0);
+    lua_pop(L, 1);
+    luaL_requiref(L, "mane3d.buffer", luaopen_mane3d_buffer, 0);
+    lua_pop(L, 1);
+    luaL_requiref(L, "sokol.stats", luaopen_sokol_stats, 0);
+    lua_pop(L, 1);
+    luaL_requiref(L, "sokol.audio_stream", luaopen_sokol_audio_stream, 0);
+    lua_pop(L, 1);
+    luaL_requiref(L, "mane3d.mixer", luaopen_mane3d_mixer, 0);
+    lua_pop(L, 1);
+    luaL_requiref(L, "mane3d.wav", luaopen_mane3d_wav, 0);
+    lua_pop(L, 1);
     luaL_requiref(L, "mane3d.licenses", luaopen_mane3d_licenses, 0);
     lua_pop(L, 1);
     luaL_requiref(L, "stb.image", luaopen_stb_image, 0);
@@ -0,0 +1,130 @@
+/*
+ * mane3d_stats.c - Per-binding call counters (sokol.stats)
+ *
+ * The counters themselves live in the generated modules and only exist
+ * when they are built with MANE3D_BINDING_STATS; without it every query
+ * returns an empty table.
+ *
+ *   local stats = require("sokol.stats")
+ *   for name, s in pairs(stats.snapshot("frame")) do
+ *       print(name, s.calls, s.ms)
+ *   end
+ */
+#include "mane3d_bindings.h"
+
+#include "sokol_time.h"
+
+#include <string.h>
+
+#define MAX_STAT_MODULES 32
+
+static struct {
+    mane3d_binding_stat *stats;
+    int count;
+} g_modules[MAX_STAT_MODULES];
+static int g_num_modules;
+
+void mane3d_stats_register(mane3d_binding_stat *stats, int count)
+{
+    for (int i = 0; i < g_num_modules; i++) {
+        if (g_modules[i].stats == stats)
+            return;
+    }
+    if (g_num_modules < MAX_STAT_MODULES) {
+        g_modules[g_num_modules].stats = stats;
+        g_modules[g_num_modules].count = count;
+        g_num_modules++;
+    }
+}
+
+uint64_t mane3d_stats_begin(void)
+{
+    return stm_now();
+}
+
+void mane3d_stats_end(mane3d_binding_stat *stat, uint64_t start)
+{
+    stat->calls++;
+    stat->ticks += stm_now() - start;
+}
+
+void mane3d_stats_end_frame(void)
+{
+    for (int m = 0; m < g_num_modules; m++) {
+        for (int i = 0; i < g_modules[m].count; i++) {
+            mane3d_binding_stat *s = &g_modules[m].stats[i];
+            s->frame_calls = s->calls - s->mark_calls;
+            s->frame_ticks = s->ticks - s->mark_ticks;
+            s->mark_calls = s->calls;
+            s->mark_ticks = s->ticks;
+        }
+    }
+}
+
+/* stats.enabled() is true when the bindings were built with counters */
+static int l_stats_enabled(lua_State *L)
+{
+#ifdef MANE3D_BINDING_STATS
+    lua_pushboolean(L, 1);
+#else
+    lua_pushboolean(L, 0);
+#endif
+    return 1;
+}
+
+/* stats.snapshot([mode]) returns { [name] = { calls = n, ms = t } } for every
+ * binding called at least once: since startup/reset() by default, or during
+ * the last complete frame (up to the latest gfx.commit()) with mode "frame" */
+static int l_stats_snapshot(lua_State *L)
+{
+    static const char *const modes[] = { "total", "frame", NULL };
+    int frame = luaL_checkoption(L, 1, "total", modes) == 1;
+    lua_newtable(L);
+    for (int m = 0; m < g_num_modules; m++) {
+        for (int i = 0; i < g_modules[m].count; i++) {
+            const mane3d_binding_stat *s = &g_modules[m].stats[i];
+            uint64_t calls = frame ? s->frame_calls : s->calls;
+            uint64_t ticks = frame ? s->frame_ticks : s->ticks;
+            if (calls == 0)
+                continue;
+            lua_createtable(L, 0, 2);
+            lua_pushinteger(L, (lua_Integer)calls);
+            lua_setfield(L, -2, "calls");
+            lua_pushnumber(L, stm_ms(ticks));
+            lua_setfield(L, -2, "ms");
+            lua_setfield(L, -2, s->name);
+        }
+    }
+    return 1;
+}
+
+/* stats.reset() zeroes every counter */
+static int l_stats_reset(lua_State *L)
+{
+    (void)L;
+    for (int m = 0; m < g_num_modules; m++) {
+        for (int i = 0; i < g_modules[m].count; i++) {
+            mane3d_binding_stat *s = &g_modules[m].stats[i];
+            const char *name = s->name;
+            memset(s, 0, sizeof(*s));
+            s->name = name;
+        }
+    }
+    return 0;
+}
+
+static const luaL_Reg stats_funcs[] = {
+    {"enabled", l_stats_enabled},
+    {"snapshot", l_stats_snapshot},
+    {"reset", l_stats_reset},
+    {NULL, NULL}
+};
+
+int luaopen_sokol_stats(lua_State *L)
+{
+#ifdef MANE3D_BINDING_STATS
+    stm_setup();
+#endif
+    luaL_newlib(L, stats_funcs);
+    return 1;
+}
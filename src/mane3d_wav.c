@@ -0,0 +1,312 @@
+/*
+ * mane3d_wav.c - WAV decoding into native sample buffers (mane3d.wav)
+ *
+ * Parses RIFF/WAVE files (8/16/24/32-bit integer PCM, 32/64-bit float,
+ * WAVE_FORMAT_EXTENSIBLE) straight into a mane3d.buffer of interleaved
+ * samples, optionally downmixed to mono and resampled to the device rate:
+ *
+ *   local wav = require("mane3d.wav")
+ *   local samples, info = wav.load("hit.wav", { mono = true, sample_rate = 44100 })
+ *   local hit = mixer.load_pcm(samples, { sample_rate = info.sample_rate })
+ *
+ * Samples are f32 in -1..1 by default, or i16 with format = "i16" for half
+ * the memory on the Lua side (mixer.load_pcm converts them to float).
+ * Resampling is linear interpolation, meant for sound effects and music
+ * loaded once at startup.
+ */
+#include "mane3d_bindings.h"
+
+#include <stdint.h>
+#include <stdio.h>
+#include <string.h>
+
+enum {
+    WAV_FORMAT_PCM = 1,
+    WAV_FORMAT_FLOAT = 3,
+    WAV_FORMAT_EXTENSIBLE = 0xFFFE,
+};
+
+typedef struct wav_info {
+    int format;   /* WAV_FORMAT_PCM or WAV_FORMAT_FLOAT */
+    int channels;
+    int rate;
+    int bits;
+    int block_align;
+    const unsigned char *data;
+    size_t frames;
+} wav_info;
+
+static uint32_t read_u16(const unsigned char *p)
+{
+    return (uint32_t)p[0] | ((uint32_t)p[1] << 8);
+}
+
+static uint32_t read_u32(const unsigned char *p)
+{
+    return read_u16(p) | (read_u16(p + 2) << 16);
+}
+
+/* Find the fmt and data chunks; returns an error message or NULL */
+static const char *wav_parse(const unsigned char *p, size_t len, wav_info *info)
+{
+    memset(info, 0, sizeof(*info));
+    if (len < 12 || memcmp(p, "RIFF", 4) != 0 || memcmp(p + 8, "WAVE", 4) != 0)
+        return "not a RIFF/WAVE file";
+    size_t data_size = 0;
+    size_t pos = 12;
+    while (pos + 8 <= len) {
+        const unsigned char *chunk = p + pos;
+        size_t size = read_u32(chunk + 4);
+        /* Tolerate a truncated last chunk (unfinished recordings) */
+        if (size > len - pos - 8)
+            size = len - pos - 8;
+        if (memcmp(chunk, "fmt ", 4) == 0) {
+            if (size < 16)
+                return "fmt chunk too small";
+            info->format = (int)read_u16(chunk + 8);
+            info->channels = (int)read_u16(chunk + 10);
+            info->rate = (int)read_u32(chunk + 12);
+            info->block_align = (int)read_u16(chunk + 20);
+            info->bits = (int)read_u16(chunk + 22);
+            /* The sub-format GUID starts with the plain format tag */
+            if (info->format == WAV_FORMAT_EXTENSIBLE && size >= 40)
+                info->format = (int)read_u16(chunk + 32);
+        } else if (memcmp(chunk, "data", 4) == 0) {
+            info->data = chunk + 8;
+            data_size = size;
+        }
+        pos += 8 + size + (size & 1);
+    }
+    if (info->format == 0)
+        return "no fmt chunk";
+    if (info->data == NULL)
+        return "no data chunk";
+    if (info->format == WAV_FORMAT_PCM) {
+        if (info->bits != 8 && info->bits != 16 && info->bits != 24 && info->bits != 32)
+            return "unsupported PCM sample size";
+    } else if (info->format == WAV_FORMAT_FLOAT) {
+        if (info->bits != 32 && info->bits != 64)
+            return "unsupported float sample size";
+    } else {
+        return "unsupported sample format (only PCM and float)";
+    }
+    if (info->channels < 1 || info->rate < 1)
+        return "invalid fmt chunk";
+    if (info->block_align != info->channels * (info->bits / 8))
+        return "invalid block alignment";
+    info->frames = data_size / (size_t)info->block_align;
+    return NULL;
+}
+
+static float read_sample(const unsigned char *p, int format, int bits)
+{
+    if (format == WAV_FORMAT_FLOAT) {
+        if (bits == 32) {
+            uint32_t u = read_u32(p);
+            float v;
+            memcpy(&v, &u, sizeof(v));
+            return v;
+        }
+        uint64_t u = (uint64_t)read_u32(p) | ((uint64_t)read_u32(p + 4) << 32);
+        double v;
+        memcpy(&v, &u, sizeof(v));
+        return (float)v;
+    }
+    switch (bits) {
+    case 8:
+        return (float)((int)p[0] - 128) * (1.0f / 128.0f);
+    case 16:
+        return (float)(int16_t)read_u16(p) * (1.0f / 32768.0f);
+    case 24:
+        return (float)((int32_t)(((uint32_t)p[0] << 8) | ((uint32_t)p[1] << 16) | ((uint32_t)p[2] << 24)) >> 8) * (1.0f / 8388608.0f);
+    default:
+        return (float)((double)(int32_t)read_u32(p) * (1.0 / 2147483648.0));
+    }
+}
+
+/* Decode every frame into dst (channels samples per frame, or 1 when downmixing) */
+static void wav_decode(const wav_info *info, int mono, float *dst)
+{
+    const int bytes = info->bits / 8;
+    const int ch = info->channels;
+    const unsigned char *p = info->data;
+    /* The common case: a plain loop the compiler can vectorize */
+    if (info->format == WAV_FORMAT_PCM && info->bits == 16 && (!mono || ch == 1)) {
+        size_t n = info->frames * (size_t)ch;
+        for (size_t i = 0; i < n; i++)
+            dst[i] = (float)(int16_t)read_u16(p + i * 2) * (1.0f / 32768.0f);
+        return;
+    }
+    for (size_t f = 0; f < info->frames; f++, p += info->block_align) {
+        if (mono) {
+            float sum = 0.0f;
+            for (int c = 0; c < ch; c++)
+                sum += read_sample(p + c * bytes, info->format, info->bits);
+            dst[f] = sum / (float)ch;
+        } else {
+            for (int c = 0; c < ch; c++)
+                dst[f * (size_t)ch + (size_t)c] = read_sample(p + c * bytes, info->format, info->bits);
+        }
+    }
+}
+
+/* Linear interpolation of frames at src_rate to out_frames at dst_rate */
+static void wav_resample(const float *src, size_t frames, int ch, int src_rate, int dst_rate, float *dst, size_t out_frames)
+{
+    const double step = (double)src_rate / (double)dst_rate;
+    for (size_t f = 0; f < out_frames; f++) {
+        double pos = (double)f * step;
+        size_t i = (size_t)pos;
+        float t = (float)(pos - (double)i);
+        size_t j = i + 1 < frames ? i + 1 : frames - 1;
+        if (i >= frames)
+            i = j = frames - 1;
+        for (int c = 0; c < ch; c++) {
+            float a = src[i * (size_t)ch + (size_t)c];
+            float b = src[j * (size_t)ch + (size_t)c];
+            dst[f * (size_t)ch + (size_t)c] = a + (b - a) * t;
+        }
+    }
+}
+
+static void to_i16(const float *src, size_t n, int16_t *dst)
+{
+    for (size_t i = 0; i < n; i++) {
+        float v = src[i] * 32768.0f;
+        v = v < -32768.0f ? -32768.0f : (v > 32767.0f ? 32767.0f : v);
+        dst[i] = (int16_t)(v < 0.0f ? v - 0.5f : v + 0.5f);
+    }
+}
+
+static int opt_field_int(lua_State *L, int idx, const char *name, int def)
+{
+    if (lua_isnoneornil(L, idx))
+        return def;
+    lua_getfield(L, idx, name);
+    int v = lua_isnil(L, -1) ? def : (int)luaL_checkinteger(L, -1);
+    lua_pop(L, 1);
+    return v;
+}
+
+/* Decode the WAV bytes p[0..len) according to the options at opts_idx and
+ * push samples, info (or nil, message) */
+static int push_wav(lua_State *L, const unsigned char *p, size_t len, int opts_idx)
+{
+    int as_i16 = 0;
+    int mono = 0;
+    if (!lua_isnoneornil(L, opts_idx)) {
+        luaL_checktype(L, opts_idx, LUA_TTABLE);
+        if (lua_getfield(L, opts_idx, "format") != LUA_TNIL) {
+            const char *format = lua_tostring(L, -1);
+            as_i16 = format != NULL && strcmp(format, "i16") == 0;
+            luaL_argcheck(L, as_i16 || (format != NULL && strcmp(format, "f32") == 0), opts_idx,
+                          "format must be \"f32\" or \"i16\"");
+        }
+        lua_getfield(L, opts_idx, "mono");
+        mono = lua_toboolean(L, -1);
+        lua_pop(L, 2);
+    }
+
+    wav_info info;
+    const char *err = wav_parse(p, len, &info);
+    if (err) {
+        lua_pushnil(L);
+        lua_pushstring(L, err);
+        return 2;
+    }
+    int rate = opt_field_int(L, opts_idx, "sample_rate", info.rate);
+    luaL_argcheck(L, rate > 0, opts_idx, "sample_rate must be positive");
+    int ch = mono ? 1 : info.channels;
+    size_t frames = info.frames;
+    if (rate != info.rate && frames > 0) {
+        frames = (size_t)((uint64_t)info.frames * (uint64_t)rate / (uint64_t)info.rate);
+        if (frames == 0)
+            frames = 1;
+    }
+    size_t count = frames * (size_t)ch;
+
+    /* Decode straight into the result when no conversion follows;
+     * otherwise go through scratch userdata the GC reclaims on error */
+    if (!as_i16 && frames == info.frames) {
+        wav_decode(&info, mono, (float *)mane3d_buffer_new(L, "f32", count));
+    } else {
+        size_t decoded = info.frames * (size_t)ch;
+        float *tmp = (float *)lua_newuserdatauv(L, (decoded ? decoded : 1) * sizeof(float), 0);
+        wav_decode(&info, mono, tmp);
+        if (frames != info.frames) {
+            float *out = (float *)lua_newuserdatauv(L, (count ? count : 1) * sizeof(float), 0);
+            wav_resample(tmp, info.frames, ch, info.rate, rate, out, frames);
+            lua_remove(L, -2);
+            tmp = out;
+        }
+        if (as_i16) {
+            to_i16(tmp, count, (int16_t *)mane3d_buffer_new(L, "i16", count));
+        } else {
+            memcpy(mane3d_buffer_new(L, "f32", count), tmp, count * sizeof(float));
+        }
+        lua_remove(L, -2);
+    }
+
+    lua_createtable(L, 0, 6);
+    lua_pushinteger(L, (lua_Integer)frames);
+    lua_setfield(L, -2, "frames");
+    lua_pushinteger(L, ch);
+    lua_setfield(L, -2, "channels");
+    lua_pushinteger(L, rate);
+    lua_setfield(L, -2, "sample_rate");
+    lua_pushinteger(L, info.channels);
+    lua_setfield(L, -2, "source_channels");
+    lua_pushinteger(L, info.rate);
+    lua_setfield(L, -2, "source_sample_rate");
+    lua_pushinteger(L, info.bits);
+    lua_setfield(L, -2, "source_bits");
+    return 2;
+}
+
+/* wav.load(path, opts?) returns samples, info or nil, error_message */
+static int l_load(lua_State *L)
+{
+    const char *filename = luaL_checkstring(L, 1);
+    lua_settop(L, 2);
+    FILE *f = fopen(filename, "rb");
+    if (f == NULL) {
+        lua_pushnil(L);
+        lua_pushfstring(L, "cannot open %s", filename);
+        return 2;
+    }
+    long size = -1;
+    if (fseek(f, 0, SEEK_END) == 0)
+        size = ftell(f);
+    if (size < 0 || fseek(f, 0, SEEK_SET) != 0) {
+        fclose(f);
+        lua_pushnil(L);
+        lua_pushfstring(L, "cannot read %s", filename);
+        return 2;
+    }
+    unsigned char *data = (unsigned char *)lua_newuserdatauv(L, size ? (size_t)size : 1, 0);
+    size_t len = fread(data, 1, (size_t)size, f);
+    fclose(f);
+    int n = push_wav(L, data, len, 2);
+    lua_remove(L, -n - 1);
+    return n;
+}
+
+/* wav.load_from_memory(data, opts?) decodes WAV bytes held in a string */
+static int l_load_from_memory(lua_State *L)
+{
+    size_t len;
+    const char *data = luaL_checklstring(L, 1, &len);
+    return push_wav(L, (const unsigned char *)data, len, 2);
+}
+
+static const luaL_Reg wav_funcs[] = {
+    {"load", l_load},
+    {"load_from_memory", l_load_from_memory},
+    {NULL, NULL}
+};
+
+int luaopen_mane3d_wav(lua_State *L)
+{
+    luaL_newlib(L, wav_funcs);
+    return 1;
+}
@@ -0,0 +1,74 @@
+-- Binding call-rate benchmark
+--
+-- Measures calls/sec through the generated wrappers. Run it with the
+-- headless test runner, once from a normal build and once from a build
+-- configured with -DMANE3D_UNCHECKED_BINDINGS=ON, and compare:
+--
+--   mane3d-test tests/bench_bindings.lua 0
+--
+-- The gfx cases run inside a pass with a valid pipeline and bindings, so
+-- they go through sokol's full draw path instead of its early return.
+local gfx = require("sokol.gfx")
+local glue = require("sokol.glue")
+local stm = require("sokol.time")
+
+local ITERATIONS = 2000000
+
+local color = gfx.Color({ r = 1, g = 1, b = 1, a = 1 })
+
+local cases = {
+    { "stm.diff(a, b)", function(n)
+        for i = 1, n do stm.diff(i + 1, i) end
+    end },
+    { "gfx.apply_viewport(x, y, w, h, b)", function(n)
+        for _ = 1, n do gfx.apply_viewport(0, 0, 640, 480, false) end
+    end },
+    { "gfx.draw(base, count, instances)", function(n)
+        for _ = 1, n do gfx.draw(0, 3, 1) end
+    end },
+    { "color.r = v", function(n)
+        for i = 1, n do color.r = i end
+    end },
+    { "color.r", function(n)
+        local c = color
+        for _ = 1, n do local _ = c.r end
+    end },
+}
+
+-- Begin a pass with a one-triangle pipeline applied
+local function begin_draw()
+    -- mane3d-test runs the dummy backend, which needs no shader code
+    local shd = gfx.make_shader(gfx.ShaderDesc({}))
+    local pip = gfx.make_pipeline(gfx.PipelineDesc({
+        shader = shd,
+        layout = {
+            attrs = {
+                { format = gfx.VertexFormat.FLOAT2 },  -- position
+            },
+        },
+    }))
+    if gfx.query_pipeline_state(pip) ~= gfx.ResourceState.VALID then
+        error("bench_bindings: pipeline creation failed")
+    end
+    local vbuf = gfx.make_buffer(gfx.BufferDesc({
+        data = gfx.Range(string.pack("ffffff", 0, 0.5, 0.5, -0.5, -0.5, -0.5)),
+    }))
+    gfx.begin_pass(gfx.Pass({ swapchain = glue.swapchain() }))
+    gfx.apply_pipeline(pip)
+    gfx.apply_bindings(gfx.Bindings({ vertex_buffers = { vbuf } }))
+end
+
+function init()
+    print(string.format("%-36s %14s %10s", "call", "calls/sec", "ns/call"))
+    begin_draw()
+    for _, case in ipairs(cases) do
+        local name, run = case[1], case[2]
+        run(ITERATIONS // 10) -- warm up
+        local start = stm.now()
+        run(ITERATIONS)
+        local sec = stm.sec(stm.since(start))
+        print(string.format("%-36s %14.0f %10.1f", name, ITERATIONS / sec, sec * 1e9 / ITERATIONS))
+    end
+    gfx.end_pass()
+    gfx.commit()
+end
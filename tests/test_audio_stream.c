@@ -0,0 +1,203 @@
+// Tests for sokol.audio_stream and mane3d.mixer (src/mane3d_audio.c), mane3d.buffer
+// and mane3d.wav
+//
+// - mane3d_ring with a producer and a consumer thread
+// - Lua test scripts, run against a fake sokol_audio whose stream callback
+//   the test calls in place of the audio thread
+//
+// Usage: mane3d-test-audio tests/test_buffer.lua tests/test_audio_stream.lua tests/test_mixer.lua
+//                          tests/test_wav.lua
+#include "mane3d_bindings.h"
+#include "sokol_audio.h"
+#include "sokol_log.h"
+
+#include <lua.h>
+#include <lualib.h>
+#include <lauxlib.h>
+#include <stdio.h>
+
+#ifdef _WIN32
+#include <windows.h>
+#define yield_thread() SwitchToThread()
+#else
+#include <pthread.h>
+#include <sched.h>
+#define yield_thread() sched_yield()
+#endif
+
+// Fake sokol_audio: records the desc and never starts a device
+
+static saudio_desc g_desc;
+static bool g_valid;
+
+void saudio_setup(const saudio_desc *desc)
+{
+    g_desc = *desc;
+    g_valid = true;
+}
+
+void saudio_shutdown(void)
+{
+    g_valid = false;
+}
+
+bool saudio_isvalid(void)
+{
+    return g_valid;
+}
+
+int saudio_sample_rate(void)
+{
+    return g_desc.sample_rate ? g_desc.sample_rate : 44100;
+}
+
+int saudio_channels(void)
+{
+    return g_desc.num_channels ? g_desc.num_channels : 1;
+}
+
+void slog_func(const char *tag, uint32_t log_level, uint32_t log_item, const char *message,
+               uint32_t line_nr, const char *filename, void *user_data)
+{
+    (void)tag; (void)log_level; (void)log_item; (void)line_nr; (void)filename; (void)user_data;
+    printf("[saudio] %s\n", message ? message : "");
+}
+
+// Ring test
+
+#define RING_TEST_SAMPLES 2000000u
+
+static mane3d_ring g_ring;
+static int g_ring_ok;
+
+static void ring_consume(void)
+{
+    float buf[97];
+    uint32_t expect = 0;
+    int ok = 1;
+    // Keep draining after a mismatch so the producer never blocks on a full ring
+    while (expect < RING_TEST_SAMPLES) {
+        uint32_t n = mane3d_ring_read(&g_ring, buf, 97);
+        if (n == 0)
+            yield_thread();
+        for (uint32_t i = 0; i < n; i++, expect++) {
+            if (ok && buf[i] != (float)(expect % 1000000u)) {
+                printf("ring: sample %u is %g\n", expect, buf[i]);
+                ok = 0;
+            }
+        }
+    }
+    g_ring_ok = ok;
+}
+
+#ifdef _WIN32
+static DWORD WINAPI ring_consumer(LPVOID arg)
+{
+    (void)arg;
+    ring_consume();
+    return 0;
+}
+#else
+static void *ring_consumer(void *arg)
+{
+    (void)arg;
+    ring_consume();
+    return NULL;
+}
+#endif
+
+static int test_ring(void)
+{
+    // Odd read/write sizes against a capacity of 1024 exercise the wraparound
+    if (!mane3d_ring_init(&g_ring, 1000))
+        return 0;
+#ifdef _WIN32
+    HANDLE thread = CreateThread(NULL, 0, ring_consumer, NULL, 0, NULL);
+#else
+    pthread_t thread;
+    pthread_create(&thread, NULL, ring_consumer, NULL);
+#endif
+    float buf[61];
+    uint32_t sent = 0;
+    while (sent < RING_TEST_SAMPLES) {
+        uint32_t n = RING_TEST_SAMPLES - sent < 61 ? RING_TEST_SAMPLES - sent : 61;
+        for (uint32_t i = 0; i < n; i++)
+            buf[i] = (float)((sent + i) % 1000000u);
+        uint32_t written = mane3d_ring_write(&g_ring, buf, n);
+        sent += written;
+        if (written < n)
+            yield_thread();
+    }
+#ifdef _WIN32
+    WaitForSingleObject(thread, INFINITE);
+    CloseHandle(thread);
+#else
+    pthread_join(thread, NULL);
+#endif
+    mane3d_ring_free(&g_ring);
+    printf("ring: %s\n", g_ring_ok ? "OK" : "FAILED");
+    return g_ring_ok;
+}
+
+// Lua test helpers (the "test" module)
+
+// test.stream(frames): run the stream callback, return the samples as a table
+static int l_test_stream(lua_State *L)
+{
+    static float buf[8192];
+    int frames = (int)luaL_checkinteger(L, 1);
+    int channels = saudio_channels();
+    luaL_argcheck(L, frames > 0 && frames * channels <= 8192, 1, "too many frames");
+    if (g_desc.stream_cb)
+        g_desc.stream_cb(buf, frames, channels);
+    else if (g_desc.stream_userdata_cb)
+        g_desc.stream_userdata_cb(buf, frames, channels, g_desc.user_data);
+    else
+        return luaL_error(L, "saudio_setup was not called with a stream callback");
+    lua_createtable(L, frames * channels, 0);
+    for (int i = 0; i < frames * channels; i++) {
+        lua_pushnumber(L, buf[i]);
+        lua_rawseti(L, -2, i + 1);
+    }
+    return 1;
+}
+
+static int luaopen_test(lua_State *L)
+{
+    static const luaL_Reg funcs[] = {
+        {"stream", l_test_stream},
+        {NULL, NULL},
+    };
+    luaL_newlib(L, funcs);
+    return 1;
+}
+
+static int test_lua(const char *script)
+{
+    lua_State *L = luaL_newstate();
+    luaL_openlibs(L);
+    luaL_requiref(L, "sokol.audio_stream", luaopen_sokol_audio_stream, 0);
+    luaL_requiref(L, "mane3d.buffer", luaopen_mane3d_buffer, 0);
+    luaL_requiref(L, "mane3d.mixer", luaopen_mane3d_mixer, 0);
+    luaL_requiref(L, "mane3d.wav", luaopen_mane3d_wav, 0);
+    luaL_requiref(L, "test", luaopen_test, 0);
+    lua_settop(L, 0);
+    int ok = luaL_dofile(L, script) == LUA_OK;
+    if (!ok)
+        printf("%s\n", lua_tostring(L, -1));
+    lua_close(L);
+    printf("%s: %s\n", script, ok ? "OK" : "FAILED");
+    return ok;
+}
+
+int main(int argc, char **argv)
+{
+    if (argc < 2) {
+        printf("Usage: mane3d-test-audio <script.lua>...\n");
+        return 1;
+    }
+    int ok = test_ring();
+    for (int i = 1; i < argc; i++)
+        ok = test_lua(argv[i]) && ok;
+    return ok ? 0 : 1;
+}
@@ -0,0 +1,56 @@
+-- tests/test_audio_stream.lua
+-- sokol.audio_stream push/space/queued/stats, run by tests/test_audio_stream.c
+-- test.stream(frames) calls the stream callback like the audio thread would
+local stream = require("sokol.audio_stream")
+local buffer = require("mane3d.buffer")
+local test = require("test")
+
+assert(stream.setup({ sample_rate = 44100, num_channels = 2, buffer_frames = 64, ring_frames = 100 }))
+assert(stream.channels() == 2)
+-- 100 frames * 2 channels round up to a 256 sample ring
+assert(stream.space() == 128, stream.space())
+
+-- Silence before the first push is not an underrun
+local out = test.stream(4)
+assert(#out == 8 and out[1] == 0)
+assert(stream.stats().underruns == 0)
+
+-- push() takes tables, packed floats and f32 buffers; partial frames are dropped
+assert(stream.push({ 1, 2, 3, 4, 5 }) == 2)
+assert(stream.queued() == 2)
+assert(stream.push(string.pack("<ffff", 6, 7, 8, 9)) == 2)
+assert(stream.push(buffer.f32({ 10, 11 })) == 1)
+assert(stream.queued() == 5)
+
+-- A short read plays silence and counts an underrun
+out = test.stream(6)
+assert(out[1] == 1 and out[4] == 4 and out[5] == 6 and out[8] == 9)
+assert(out[9] == 10 and out[10] == 11 and out[11] == 0 and out[12] == 0)
+local s = stream.stats()
+assert(s.underruns == 1 and s.underrun_frames == 1, s.underrun_frames)
+
+-- A push that does not fit is truncated and counts an overrun
+assert(stream.push(buffer.f32(300)) == 128)
+s = stream.stats()
+assert(s.overruns == 1 and s.overrun_frames == 22, s.overrun_frames)
+assert(stream.space() == 0)
+
+-- Wraparound: refill whatever the callback drained
+for round = 1, 50 do
+    test.stream(37)
+    local n = stream.space()
+    local t = {}
+    for i = 1, n * 2 do
+        t[i] = round
+    end
+    assert(stream.push(t) == n)
+end
+
+stream.reset_stats()
+assert(stream.stats().overruns == 0)
+assert(not pcall(stream.push, "abc"))
+
+stream.shutdown()
+assert(stream.space() == 0)
+assert(not pcall(stream.push, { 1 }))
+print("test_audio_stream OK")
@@ -0,0 +1,59 @@
+-- tests/test_buffer.lua
+-- mane3d.buffer construction, copies and views, run by tests/test_audio_stream.c
+local buffer = require("mane3d.buffer")
+
+-- Initializers: count, table, bytes and another buffer
+local b = buffer.f32({ 1, 2, 3 })
+assert(#b == 3 and b[1] == 1 and b[3] == 3 and b[4] == nil)
+assert(#buffer.u16(5) == 5 and buffer.u16(5)[5] == 0)
+assert(#buffer.u8(string.pack("<I4", 0x04030201)) == 4)
+local c = buffer.f32(b)
+c[1] = 9
+assert(b[1] == 1 and c[1] == 9)
+
+-- push/set/fill grow the buffer
+b:push(4, 5)
+assert(#b == 5 and b[5] == 5)
+b:set(7, { 7 })
+assert(#b == 7 and b[6] == 0 and b[7] == 7)
+b:fill(2, 2, 4)
+assert(b[1] == 1 and b[2] == 2 and b[4] == 2 and b[5] == 5)
+
+-- copy_from a string or buffer, growing to whole elements
+local u = buffer.u16()
+u:copy_from(string.pack("<HHB", 1, 2, 3))
+assert(#u == 3 and u[2] == 2 and u[3] == 3)
+
+-- Self copies grow the storage the source points into
+local s = buffer.f32(16)
+for i = 1, 16 do
+    s[i] = i
+end
+s:copy_from(s, #s + 1)
+assert(#s == 32)
+for i = 1, 16 do
+    assert(s[i] == i and s[16 + i] == i)
+end
+
+-- So do copies from a view of the same storage
+local v = s:view("u8")
+s:copy_from(v, #s + 1)
+assert(#s == 64 and s[33] == 1 and s[64] == 16)
+
+-- Overlapping copy inside the buffer
+local o = buffer.u8({ 1, 2, 3, 4, 5 })
+o:copy_from(o, 3)
+assert(#o == 7 and o[3] == 1 and o[7] == 5)
+
+-- Sizes whose byte count overflows, or that cannot be allocated, fail cleanly
+assert(not pcall(buffer.f32, 2 ^ 62))
+assert(not pcall(buffer.u16, math.maxinteger))
+assert(not pcall(buffer.u8, math.maxinteger))
+assert(not pcall(o.set, o, math.maxinteger, { 1 }))
+assert(not pcall(o.set, o, math.maxinteger, { 1, 2 }))
+assert(not pcall(u.resize, u, math.maxinteger))
+assert(not pcall(u.copy_from, u, "abc", math.maxinteger))
+assert(not pcall(u.fill, u, 0, 1, math.maxinteger))
+assert(#o == 7 and #u == 3)
+
+print("test_buffer OK")
@@ -0,0 +1,112 @@
+-- tests/test_mixer.lua
+-- mane3d.mixer commands, mixing and unloading, run by tests/test_audio_stream.c
+-- test.stream(frames) runs the stream callback, which applies the queued
+-- commands and mixes the voices like the audio thread would
+local stream = require("sokol.audio_stream")
+local mixer = require("mane3d.mixer")
+local test = require("test")
+
+-- Compare a callback's output with the expected samples
+local function check(out, expected, what)
+    assert(#out == #expected, what)
+    for i = 1, #expected do
+        if math.abs(out[i] - expected[i]) > 1e-5 then
+            error(string.format("%s: sample %d is %g, expected %g", what, i, out[i], expected[i]), 2)
+        end
+    end
+end
+
+-- Mono device at 100 Hz: one sample per frame and easy resampling ratios
+assert(stream.setup({ sample_rate = 100, num_channels = 1, buffer_frames = 64 }))
+
+-- Same rate and layout
+local ramp = mixer.load_pcm({ 0.1, 0.2, 0.3, 0.4 }, { sample_rate = 100 })
+assert(mixer.info(ramp) == 4)
+assert(mixer.play(ramp))
+check(test.stream(6), { 0.1, 0.2, 0.3, 0.4, 0, 0 }, "same rate")
+assert(mixer.stats().voices == 0)
+
+-- Resampled: a 50 Hz sound plays every sample twice, interpolated
+local step = mixer.load_pcm({ 0, 1 }, { sample_rate = 50 })
+mixer.play(step)
+check(test.stream(5), { 0, 0.5, 1, 1, 0 }, "resampled")
+
+-- Pitch 2 skips every other sample
+mixer.play(ramp, { pitch = 2 })
+check(test.stream(3), { 0.1, 0.3, 0 }, "pitch")
+
+-- Stereo sounds are downmixed to a mono device
+local stereo = mixer.load_pcm({ 0.2, 0.4, 0.6, 0.8 }, { channels = 2, sample_rate = 100 })
+mixer.play(stereo, { volume = 0.5 })
+check(test.stream(3), { 0.15, 0.35, 0 }, "downmix")
+
+-- Loop until stopped
+local pair = mixer.load_pcm({ 0.1, 0.2 }, { sample_rate = 100 })
+local looped = mixer.play(pair, { loop = true })
+check(test.stream(5), { 0.1, 0.2, 0.1, 0.2, 0.1 }, "loop")
+assert(mixer.stats().voices == 1)
+mixer.stop(looped)
+check(test.stream(2), { 0, 0 }, "stop")
+assert(mixer.stats().voices == 0)
+
+-- Voices add up and the sum is clipped
+local loud = mixer.load_pcm({ 0.8, -0.8 }, { sample_rate = 100 })
+mixer.play(loud)
+mixer.play(loud)
+check(test.stream(3), { 1, -1, 0 }, "clip")
+
+-- set_bgm with the sound already playing keeps its position
+mixer.set_bgm(ramp)
+check(test.stream(2), { 0.1, 0.2 }, "bgm")
+mixer.set_bgm(ramp, { volume = 0.5 })
+check(test.stream(3), { 0.15, 0.2, 0.05 }, "bgm volume")
+mixer.set_bgm(pair)
+check(test.stream(3), { 0.1, 0.2, 0.1 }, "bgm switch")
+mixer.stop(0) -- not a voice id; the music keeps playing
+check(test.stream(1), { 0.2 }, "bgm stop(0)")
+mixer.set_bgm(nil)
+check(test.stream(1), { 0 }, "bgm stop")
+
+-- With every voice busy the oldest is replaced; the music voice is separate
+local quiet = mixer.load_pcm({ 0.01 }, { sample_rate = 100 })
+local first = nil
+for i = 1, 31 do
+    local v = mixer.play(quiet, { loop = true })
+    first = first or v
+end
+mixer.set_bgm(quiet)
+check(test.stream(1), { 0.32 }, "all voices")
+assert(mixer.stats().voices == 32)
+mixer.play(loud, { loop = true, volume = 0.5 })
+check(test.stream(1), { 0.71 }, "steal")
+mixer.stop(first) -- already replaced
+check(test.stream(1), { 0.31 - 0.4 }, "stolen voice")
+mixer.stop_all()
+check(test.stream(1), { 0 }, "stop_all")
+
+-- Unloading during playback stops the voices; the handle is invalid at once
+-- and the samples are only freed after the callback applied the command
+local doomed = mixer.load_pcm({ 0.5, 0.5 }, { sample_rate = 100 })
+mixer.play(doomed, { loop = true })
+check(test.stream(1), { 0.5 }, "before unload")
+mixer.unload(doomed)
+assert(not pcall(mixer.info, doomed))
+assert(not pcall(mixer.play, doomed))
+check(test.stream(2), { 0, 0 }, "after unload")
+assert(mixer.stats().voices == 0)
+
+-- A full command queue drops commands until the callback drains it
+local dropped = mixer.stats().dropped
+for _ = 1, 300 do
+    mixer.stop(12345)
+end
+assert(mixer.stats().dropped == dropped + 44)
+assert(mixer.play(ramp) == nil)
+assert(not pcall(mixer.unload, ramp))
+assert(mixer.stats().dropped == dropped + 46)
+test.stream(1)
+assert(mixer.play(ramp))
+check(test.stream(2), { 0.1, 0.2 }, "after drain")
+
+stream.shutdown()
+print("test_mixer OK")
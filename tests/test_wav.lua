@@ -0,0 +1,89 @@
+-- tests/test_wav.lua
+-- mane3d.wav parsing and conversion from memory, run by tests/test_audio_stream.c
+local wav = require("mane3d.wav")
+local stream = require("sokol.audio_stream")
+local mixer = require("mane3d.mixer")
+local test = require("test")
+
+local WAV_FORMAT_PCM = 1
+
+-- Build a RIFF/WAVE file from raw chunks
+local function chunk(id, body)
+    local pad = #body % 2 == 1 and "\0" or ""
+    return id .. string.pack("<I4", #body) .. body .. pad
+end
+
+local function riff(...)
+    local body = "WAVE" .. table.concat({ ... })
+    return "RIFF" .. string.pack("<I4", #body) .. body
+end
+
+local function fmt(channels, rate, bits)
+    local align = channels * bits // 8
+    return chunk("fmt ", string.pack("<I2I2I4I4I2I2", WAV_FORMAT_PCM, channels, rate, rate * align, align, bits))
+end
+
+local function pcm16(samples)
+    return chunk("data", string.pack("<" .. string.rep("i2", #samples), table.unpack(samples)))
+end
+
+local function near(a, b)
+    return math.abs(a - b) < 1e-5
+end
+
+-- Malformed headers come back as nil, message
+local function fails(data, message)
+    local samples, err = wav.load_from_memory(data)
+    assert(samples == nil, message)
+    assert(err == message, err)
+end
+
+fails("RIFF", "not a RIFF/WAVE file")
+fails(riff(chunk("fmt ", string.rep("\0", 12)), pcm16({ 0 })), "fmt chunk too small")
+fails(riff(pcm16({ 0 })), "no fmt chunk")
+fails(riff(fmt(1, 100, 16)), "no data chunk")
+fails(riff(fmt(0, 100, 16), pcm16({ 0 })), "invalid fmt chunk")
+fails(riff(fmt(1, 100, 12), pcm16({ 0 })), "unsupported PCM sample size")
+local bad_align = chunk("fmt ", string.pack("<I2I2I4I4I2I2", WAV_FORMAT_PCM, 2, 100, 400, 2, 16))
+fails(riff(bad_align, pcm16({ 0, 0 })), "invalid block alignment")
+
+-- A truncated data chunk keeps the whole frames it has
+local truncated = riff(fmt(1, 100, 16), pcm16({ 1, 2, 3 }))
+local samples, info = wav.load_from_memory(truncated:sub(1, -3))
+assert(samples and info.frames == 2 and #samples == 2)
+
+-- 24-bit stereo, downmixed to mono
+local data24 = chunk("data", string.pack("<i3i3i3i3", 4194304, -2097152, 2097152, 2097152))
+samples, info = wav.load_from_memory(riff(fmt(2, 100, 24), data24), { mono = true })
+assert(info.frames == 2 and info.channels == 1 and info.source_channels == 2 and info.source_bits == 24)
+assert(#samples == 2 and near(samples[1], 0.125) and near(samples[2], 0.25))
+samples = wav.load_from_memory(riff(fmt(2, 100, 24), data24))
+assert(#samples == 4 and near(samples[1], 0.5) and near(samples[2], -0.25))
+
+-- Resampling scales the frame count and interpolates, holding the last frame
+local ramp = riff(fmt(1, 100, 16), pcm16({ 0, 16384 }))
+samples, info = wav.load_from_memory(ramp, { sample_rate = 200 })
+assert(info.frames == 4 and info.sample_rate == 200 and info.source_sample_rate == 100)
+assert(near(samples[1], 0) and near(samples[2], 0.25) and near(samples[3], 0.5) and near(samples[4], 0.5))
+samples, info = wav.load_from_memory(riff(fmt(1, 44100, 16), pcm16({ 0, 0, 0 })), { sample_rate = 48000 })
+assert(info.frames == 3 and #samples == 3)
+samples, info = wav.load_from_memory(riff(fmt(1, 100, 16), pcm16({ 0 })), { sample_rate = 10 })
+assert(info.frames == 1 and #samples == 1)
+
+-- i16 keeps 16-bit samples exact and plays through the mixer as float
+local ints = { 0, 16384, -32768, 32767 }
+samples, info = wav.load_from_memory(riff(fmt(1, 100, 16), pcm16(ints)), { format = "i16" })
+for i = 1, #ints do
+    assert(samples[i] == ints[i], samples[i])
+end
+assert(stream.setup({ sample_rate = 100, num_channels = 1, buffer_frames = 64 }))
+mixer.play(mixer.load_pcm(samples, { sample_rate = info.sample_rate }))
+local out = test.stream(5)
+for i = 1, #ints do
+    assert(near(out[i], ints[i] / 32768), out[i])
+end
+assert(out[5] == 0)
+stream.shutdown()
+
+assert(not pcall(wav.load_from_memory, ramp, { format = "u8" }))
+print("test_wav OK")
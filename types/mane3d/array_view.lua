@@ -0,0 +1,10 @@
+---@meta
+-- LuaCATS type definitions for mane3d.ArrayView
+--
+-- Reading an array field of a generated struct (desc.colors, bindings.vertex_buffers, ...)
+-- returns a view that indexes the parent's storage in place. Views are
+-- fixed-size and 1-based; writes go straight to the struct.
+
+---@class mane3d.ArrayView
+---@operator len: integer
+---@field [integer] any
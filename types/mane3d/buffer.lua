@@ -0,0 +1,102 @@
+---@meta
+-- LuaCATS type definitions for mane3d.buffer
+--
+-- Growable typed arrays that the sokol bindings accept wherever they take
+-- a gfx.Range (vertex/index data, uniforms, update_buffer, ...), without
+-- copying into a string first. Indices are 1-based.
+-- Growing a buffer may move its storage: a gfx.Range built from it is only
+-- valid until the next resize.
+
+---@alias mane3d.buffer.Type "f32"|"u16"|"u32"|"u8"|"i16"
+
+---@class mane3d.buffer
+---@operator len: integer
+---@field [integer] number
+local Buffer = {}
+
+---Write values starting at element first, growing the buffer if needed
+---@param first integer
+---@param values number[]
+---@return mane3d.buffer
+function Buffer:set(first, values) end
+
+---Append values
+---@param ... number
+---@return mane3d.buffer
+function Buffer:push(...) end
+
+---Set elements first..last (default: all) to v, growing the buffer if needed
+---@param v number
+---@param first? integer
+---@param last? integer
+---@return mane3d.buffer
+function Buffer:fill(v, first, last) end
+
+---Copy the bytes of another buffer or a string to element first (default 1)
+---@param src mane3d.buffer|string
+---@param first? integer
+---@return mane3d.buffer
+function Buffer:copy_from(src, first) end
+
+---Grow (zero-filled) or shrink to count elements
+---@param count integer
+---@return mane3d.buffer
+function Buffer:resize(count) end
+
+---Empty the buffer, keeping its allocation
+---@return mane3d.buffer
+function Buffer:clear() end
+
+---A buffer of another element type over the same bytes
+---@param type mane3d.buffer.Type
+---@return mane3d.buffer
+function Buffer:view(type) end
+
+---@return mane3d.buffer.Type
+function Buffer:type() end
+
+---Size in bytes
+---@return integer
+function Buffer:bytes() end
+
+---Copy the bytes into a string
+---@return string
+function Buffer:tostring() end
+
+---@alias mane3d.buffer.Init integer|number[]|string|mane3d.buffer
+
+---@class mane3d.buffer.module
+local buffer = {}
+
+---New buffer of the given element type. init is an element count
+---(zero-filled), a table of values, or bytes to copy (string or buffer).
+---@param type mane3d.buffer.Type
+---@param init? mane3d.buffer.Init
+---@return mane3d.buffer
+function buffer.new(type, init) end
+
+---@param init? mane3d.buffer.Init
+---@return mane3d.buffer
+function buffer.f32(init) end
+
+---@param init? mane3d.buffer.Init
+---@return mane3d.buffer
+function buffer.u16(init) end
+
+---@param init? mane3d.buffer.Init
+---@return mane3d.buffer
+function buffer.u32(init) end
+
+---@param init? mane3d.buffer.Init
+---@return mane3d.buffer
+function buffer.u8(init) end
+
+---@param init? mane3d.buffer.Init
+---@return mane3d.buffer
+function buffer.i16(init) end
+
+---@param v any
+---@return boolean
+function buffer.is_buffer(v) end
+
+return buffer
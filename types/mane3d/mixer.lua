@@ -0,0 +1,69 @@
+---@meta
+-- LuaCATS type definitions for mane3d.mixer
+--
+-- Native voice mixer. Voices are mixed, resampled and clipped in the
+-- stream callback of sokol.audio_stream, so stream.setup() must run first;
+-- Lua only sends commands.
+
+---@alias mane3d.mixer.Sound integer
+---@alias mane3d.mixer.Voice integer
+
+---@class mane3d.mixer.PcmOptions
+---@field sample_rate? integer default 44100
+---@field channels? integer interleaved channels, default 1
+
+---@class mane3d.mixer.PlayOptions
+---@field volume? number default 1
+---@field pitch? number playback speed, default 1
+---@field loop? boolean
+
+---@class mane3d.mixer.BgmOptions
+---@field volume? number default 1
+---@field pitch? number default 1
+
+---@class mane3d.mixer.Stats
+---@field voices integer voices playing at the last audio callback
+---@field dropped integer commands dropped because the queue was full
+
+---@class mane3d.mixer
+local mixer = {}
+
+---Copy interleaved samples into a new sound
+---@param samples mane3d.buffer|string|number[] f32 or i16 buffer (i16 is converted to float), packed floats or numbers
+---@param opts? mane3d.mixer.PcmOptions
+---@return mane3d.mixer.Sound
+function mixer.load_pcm(samples, opts) end
+
+---@param sound mane3d.mixer.Sound
+---@return integer frames
+---@return integer channels
+---@return integer sample_rate
+function mixer.info(sound) end
+
+---Stop the sound's voices and free it once the audio thread is done with it
+---@param sound mane3d.mixer.Sound
+function mixer.unload(sound) end
+
+---Start a voice (replacing the oldest one when all are busy);
+---nil if the command queue is full
+---@param sound mane3d.mixer.Sound
+---@param opts? mane3d.mixer.PlayOptions
+---@return mane3d.mixer.Voice?
+function mixer.play(sound, opts) end
+
+---@param voice mane3d.mixer.Voice
+function mixer.stop(voice) end
+
+---Stop every voice, music included
+function mixer.stop_all() end
+
+---Loop sound on the music voice. The sound already playing keeps its
+---position and only takes the new volume/pitch; nil stops the music.
+---@param sound mane3d.mixer.Sound?
+---@param opts? mane3d.mixer.BgmOptions
+function mixer.set_bgm(sound, opts) end
+
+---@return mane3d.mixer.Stats
+function mixer.stats() end
+
+return mixer
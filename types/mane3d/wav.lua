@@ -0,0 +1,35 @@
+---@meta
+-- LuaCATS type definitions for mane3d.wav
+--
+-- WAV decoding into mane3d.buffer samples (8/16/24/32-bit PCM, 32/64-bit
+-- float). Samples are interleaved; failures return nil and a message.
+
+---@class mane3d.wav.Options
+---@field format? "f32"|"i16" sample type of the result, default "f32" (-1..1)
+---@field mono? boolean average all channels into one
+---@field sample_rate? integer resample (linear) to this rate
+
+---@class mane3d.wav.Info
+---@field frames integer
+---@field channels integer channels of the result
+---@field sample_rate integer rate of the result
+---@field source_channels integer
+---@field source_sample_rate integer
+---@field source_bits integer
+
+---@class mane3d.wav
+local wav = {}
+
+---@param path string
+---@param opts? mane3d.wav.Options
+---@return mane3d.buffer? samples
+---@return mane3d.wav.Info|string info_or_error
+function wav.load(path, opts) end
+
+---@param data string WAV file contents
+---@param opts? mane3d.wav.Options
+---@return mane3d.buffer? samples
+---@return mane3d.wav.Info|string info_or_error
+function wav.load_from_memory(data, opts) end
+
+return wav
@@ -0,0 +1,56 @@
+---@meta
+-- LuaCATS type definitions for sokol.audio_stream
+--
+-- sokol_audio in streaming mode: a C callback drains a lock-free ring of
+-- interleaved samples that Lua fills from the main thread. Use it instead
+-- of audio.setup() with a Lua stream_cb, which would run Lua on the audio
+-- thread.
+
+---@class sokol.audio_stream
+local stream = {}
+
+---@class sokol.audio_stream.Desc
+---@field sample_rate? integer
+---@field num_channels? integer default 1
+---@field buffer_frames? integer
+---@field packet_frames? integer
+---@field num_packets? integer
+---@field ring_frames? integer frames Lua can push ahead (default 4 * buffer_frames)
+
+---@class sokol.audio_stream.Stats
+---@field underruns integer callbacks that found the ring short (played silence)
+---@field underrun_frames integer frames of silence played
+---@field overruns integer pushes that did not fit entirely
+---@field overrun_frames integer frames dropped
+
+---Start sokol_audio with the ring as its stream callback (shuts down a previous stream)
+---@param desc? sokol.audio_stream.Desc
+---@return boolean # saudio_isvalid()
+function stream.setup(desc) end
+
+---Stop sokol_audio and free the ring
+function stream.shutdown() end
+
+---Queue interleaved samples; returns the frames queued, the rest is dropped
+---@param samples mane3d.buffer|string|number[] f32 buffer, packed floats or numbers
+---@return integer
+function stream.push(samples) end
+
+---Frames that can be pushed without an overrun
+---@return integer
+function stream.space() end
+
+---Frames pushed but not played yet
+---@return integer
+function stream.queued() end
+
+---@return integer
+function stream.channels() end
+
+---Counters since setup() or reset_stats()
+---@return sokol.audio_stream.Stats
+function stream.stats() end
+
+function stream.reset_stats() end
+
+return stream
@@ -0,0 +1,31 @@
+---@meta
+-- LuaCATS type definitions for sokol.frame_arena
+--
+-- While enabled, struct constructors (gfx.Bindings{}, gfx.Pass{}, gfx.Range{}, ...)
+-- hand out pooled userdata that are recycled at the next gfx.commit().
+-- Objects built while the arena is on must not be kept past the frame.
+
+---@class sokol.frame_arena
+local frame_arena = {}
+
+---Enable (default) or disable pooling of struct userdata
+---@param on? boolean
+function frame_arena.enable(on) end
+
+---Disable pooling; later constructors allocate normally
+function frame_arena.disable() end
+
+---@return boolean
+function frame_arena.enabled() end
+
+---Recycle all pools now (gfx.commit() does this automatically)
+function frame_arena.recycle() end
+
+---@class sokol.frame_arena.Stats
+---@field allocated integer userdata allocated into pools
+---@field reused integer userdata handed out again from pools
+
+---@return sokol.frame_arena.Stats
+function frame_arena.stats() end
+
+return frame_arena
@@ -0,0 +1,27 @@
+---@meta
+-- LuaCATS type definitions for sokol.stats
+--
+-- Per-binding call counters. They are only collected when mane3d is built
+-- with MANE3D_BINDING_STATS; otherwise every snapshot is empty.
+
+---@class sokol.stats
+local stats = {}
+
+---@class sokol.stats.Entry
+---@field calls integer calls of the binding
+---@field ms number time spent in it, in milliseconds
+
+---@return boolean # true when built with MANE3D_BINDING_STATS
+function stats.enabled() end
+
+---Counters of every binding called at least once, keyed by name ("gfx.draw").
+---"total" (default) counts since startup or reset(); "frame" covers the last
+---frame ended by gfx.commit().
+---@param mode? "total"|"frame"
+---@return table<string, sokol.stats.Entry>
+function stats.snapshot(mode) end
+
+---Zero every counter
+function stats.reset() end
+
+return stats